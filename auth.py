@@ -3,40 +3,279 @@ Authentication module for Faculty Housing Management System
 نظام المصادقة لنظام إدارة إسكان أعضاء هيئة التدريس
 """
 
+import base64
+import hashlib
+import hmac
+import json
+import os
 import secrets
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from functools import wraps
-from flask import request, jsonify, session
+from flask import request, jsonify, session, g, current_app, has_app_context
 import database
+import data_cache
 
 # Session configuration
 SESSION_TIMEOUT_HOURS = 24
 
+# Token mode: 'database' stores sessions in the sessions table,
+# 'signed' issues HMAC-signed stateless tokens verified without database access
+# نمط الرموز: جلسات مخزنة في قاعدة البيانات أو رموز موقعة
+AUTH_TOKEN_MODE = os.environ.get('AUTH_TOKEN_MODE', 'database').lower()
+SIGNED_TOKEN_PREFIX = 'v1.'
+
+# In-process cache of validated sessions (per worker)
+# ذاكرة مؤقتة للجلسات التي تم التحقق منها
+SESSION_CACHE_SIZE = int(os.environ.get('SESSION_CACHE_SIZE', 1024))
+SESSION_CACHE_TTL_SECONDS = float(os.environ.get('SESSION_CACHE_TTL_SECONDS', 30))
+
+
+class SessionCache:
+    """
+    Bounded LRU cache of validated sessions with a TTL
+    ذاكرة مؤقتة محدودة الحجم للجلسات مع مدة صلاحية
+    
+    Entries expire after ``ttl`` seconds or when the session itself expires,
+    whichever comes first, so a revoked session is trusted for at most ``ttl``
+    seconds by workers that did not perform the revocation.
+    """
+    
+    def __init__(self, max_size=SESSION_CACHE_SIZE, ttl=SESSION_CACHE_TTL_SECONDS):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, session_token):
+        with self._lock:
+            entry = self._entries.get(session_token)
+            if entry is None:
+                return None
+            user, deadline = entry
+            if deadline <= time.monotonic():
+                del self._entries[session_token]
+                return None
+            self._entries.move_to_end(session_token)
+            return dict(user)
+    
+    def put(self, session_token, user):
+        if self.max_size <= 0 or self.ttl <= 0:
+            return
+        deadline = time.monotonic() + self.ttl
+        seconds_left = _seconds_until(user.get('expires_at'))
+        if seconds_left is not None:
+            deadline = min(deadline, time.monotonic() + seconds_left)
+        with self._lock:
+            self._entries[session_token] = (dict(user), deadline)
+            self._entries.move_to_end(session_token)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def invalidate(self, session_token):
+        with self._lock:
+            self._entries.pop(session_token, None)
+    
+    def invalidate_user(self, user_id):
+        with self._lock:
+            for token in [t for t, (user, _) in self._entries.items() if user.get('id') == user_id]:
+                del self._entries[token]
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def _seconds_until(expires_at):
+    """Seconds until a session expiry value, or None if it cannot be parsed"""
+    if not expires_at:
+        return None
+    try:
+        if not isinstance(expires_at, datetime):
+            expires_at = datetime.fromisoformat(str(expires_at))
+        return (expires_at - datetime.now()).total_seconds()
+    except (ValueError, TypeError):
+        return None
+
+
+_session_cache = SessionCache()
+
+
+def invalidate_user_sessions(user_id):
+    """
+    Drop cached sessions for a user (e.g. after a password change)
+    حذف الجلسات المخزنة مؤقتاً لمستخدم
+    """
+    _session_cache.invalidate_user(user_id)
+
 def generate_session_token():
     """Generate a secure random session token"""
     return secrets.token_urlsafe(32)
 
-def create_session(user_id, ip_address=None, user_agent=None):
-    """Create a new session for user"""
-    conn = database.get_db_connection()
-    cursor = conn.cursor()
+# ==================== Signed Stateless Tokens ====================
+
+def _get_secret_key():
+    """Signing key: the Flask SECRET_KEY, or the SECRET_KEY environment variable outside an app"""
+    if has_app_context():
+        secret = current_app.config.get('SECRET_KEY')
+    else:
+        secret = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
+    return secret.encode('utf-8') if isinstance(secret, str) else secret
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+def _b64decode(data):
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+def _sign(payload_segment):
+    """Signature of an ASCII payload segment; raises UnicodeEncodeError for anything else"""
+    digest = hmac.new(_get_secret_key(), payload_segment.encode('ascii'), hashlib.sha256).digest()
+    return _b64encode(digest)
+
+def is_signed_token(session_token):
+    """Check whether a token is a signed stateless token (opaque tokens never contain '.')"""
+    return bool(session_token) and session_token.startswith(SIGNED_TOKEN_PREFIX)
+
+def create_signed_token(user, expires_at):
+    """
+    Issue an HMAC-signed token carrying the user's id, role, token version and expiry
+    إصدار رمز موقع يحمل معرف المستخدم ودوره وتاريخ انتهاء الصلاحية
     
-    # Clean up old sessions for this user
-    cursor.execute('DELETE FROM sessions WHERE user_id = ? AND expires_at < ?',
-                  (user_id, datetime.now()))
+    The token version is bumped on password changes, which invalidates every
+    token issued before (see is_token_revoked()).
+    """
+    payload = {
+        'uid': user['id'],
+        'role': user['role'],
+        'username': user.get('username'),
+        'name': user.get('name'),
+        'email': user.get('email'),
+        'exp': int(expires_at.timestamp()),
+        'ver': user.get('token_version') or 0,
+        'jti': secrets.token_urlsafe(12)
+    }
+    payload_segment = _b64encode(json.dumps(payload, separators=(',', ':')).encode('utf-8'))
+    return f'{SIGNED_TOKEN_PREFIX}{payload_segment}.{_sign(payload_segment)}'
+
+def verify_signed_token(session_token):
+    """
+    Verify a signed token's signature and expiry without touching the database
+    التحقق من الرمز الموقع دون الوصول إلى قاعدة البيانات
     
-    # Create new session
-    session_token = generate_session_token()
-    expires_at = datetime.now() + timedelta(hours=SESSION_TIMEOUT_HOURS)
+    Returns a user dict shaped like validate_session's, or None for any
+    malformed, forged or expired token.
+    Revocation and password changes are not checked here; see is_token_revoked().
+    """
+    try:
+        payload_segment, signature = session_token[len(SIGNED_TOKEN_PREFIX):].split('.', 1)
+        # Cookies may carry any characters; only ASCII tokens can be genuine
+        if not hmac.compare_digest(signature.encode('ascii'), _sign(payload_segment).encode('ascii')):
+            return None
+        payload = json.loads(_b64decode(payload_segment))
+    except (UnicodeEncodeError, ValueError, TypeError):
+        return None
     
-    cursor.execute('''
-        INSERT INTO sessions (user_id, session_token, expires_at, ip_address, user_agent)
-        VALUES (?, ?, ?, ?, ?)
-    ''', (user_id, session_token, expires_at, ip_address, user_agent))
+    if not isinstance(payload, dict) or 'uid' not in payload or 'role' not in payload:
+        return None
+    if not isinstance(payload.get('exp'), int) or payload['exp'] <= time.time():
+        return None
+    if payload.get('jti') in _revoked_jtis:
+        return None
     
-    conn.commit()
-    conn.close()
+    return {
+        'id': payload['uid'],
+        'user_id': payload['uid'],
+        'role': payload['role'],
+        'username': payload.get('username'),
+        'name': payload.get('name'),
+        'email': payload.get('email'),
+        'is_active': 1,
+        'expires_at': datetime.fromtimestamp(payload['exp']),
+        'token_version': payload.get('ver', 0),
+        'jti': payload.get('jti')
+    }
+
+# Token ids revoked by this worker; other workers consult the revoked_tokens table
+_revoked_jtis = set()
+
+def revoke_signed_token(session_token):
+    """
+    Add a signed token to the revocation list
+    إضافة رمز موقع إلى قائمة الإلغاء
+    """
+    user = verify_signed_token(session_token)
+    if not user or not user.get('jti'):
+        return
+    
+    _revoked_jtis.add(user['jti'])
+    
+    with database.pooled_connection() as conn:
+        cursor = conn.cursor()
+        database._execute_query(cursor, 'DELETE FROM revoked_tokens WHERE jti = ?', (user['jti'],))
+        database._execute_query(cursor, 'INSERT INTO revoked_tokens (jti, expires_at) VALUES (?, ?)',
+                                (user['jti'], user['expires_at']))
+
+def is_token_revoked(user):
+    """
+    Check whether a signed-token user was revoked, deactivated or changed password
+    التحقق من إلغاء الرمز أو تعطيل المستخدم أو تغيير كلمة المرور
     
+    Consults the revoked_tokens table and the user's current token_version.
+    validate_session() caches a passing result in the session cache, so
+    another worker's revocation is honoured within SESSION_CACHE_TTL_SECONDS.
+    """
+    jti = user.get('jti')
+    if jti in _revoked_jtis:
+        return True
+    
+    with database.pooled_connection() as conn:
+        cursor = conn.cursor()
+        database._execute_query(cursor, 'SELECT token_version, is_active FROM users WHERE id = ?', (user['id'],))
+        current = cursor.fetchone()
+        revoked = False
+        if jti:
+            database._execute_query(cursor, 'SELECT 1 FROM revoked_tokens WHERE jti = ?', (jti,))
+            revoked = cursor.fetchone() is not None
+    
+    if revoked:
+        _revoked_jtis.add(jti)
+        return True
+    if not current or not current['is_active']:
+        return True
+    return (current['token_version'] or 0) != user.get('token_version', 0)
+
+# ==================== Sessions ====================
+
+def create_session(user_id, ip_address=None, user_agent=None, user=None):
+    """
+    Create a new session for user
+    
+    In AUTH_TOKEN_MODE=signed a stateless signed token is returned and nothing is
+    written to the sessions table; pass ``user`` to avoid reloading the user row.
+    """
+    if AUTH_TOKEN_MODE == 'signed':
+        if user is None:
+            user = database.get_user_by_id(user_id)
+        expires_at = datetime.now() + timedelta(hours=SESSION_TIMEOUT_HOURS)
+        return create_signed_token(user, expires_at), expires_at
+    
+    # Expired sessions are removed by the background reaper, not on login
+    with database.pooled_connection() as conn:
+        cursor = conn.cursor()
+
+        # Create new session
+        session_token = generate_session_token()
+        expires_at = datetime.now() + timedelta(hours=SESSION_TIMEOUT_HOURS)
+
+        cursor.execute('''
+            INSERT INTO sessions (user_id, session_token, expires_at, ip_address, user_agent)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (user_id, session_token, expires_at, ip_address, user_agent))
+    
+    data_cache.mark_tables_changed('sessions')
     return session_token, expires_at
 
 def validate_session(session_token):
@@ -44,57 +283,193 @@ def validate_session(session_token):
     if not session_token:
         return None
     
-    conn = database.get_db_connection()
-    cursor = conn.cursor()
+    if is_signed_token(session_token):
+        user = verify_signed_token(session_token)
+        if user is None:
+            return None
+        cached = _session_cache.get(session_token)
+        if cached is not None:
+            return cached
+        if is_token_revoked(user):
+            return None
+        _session_cache.put(session_token, user)
+        return user
     
-    cursor.execute('''
-        SELECT s.*, u.* FROM sessions s
-        JOIN users u ON s.user_id = u.id
-        WHERE s.session_token = ? AND s.expires_at > ? AND u.is_active = 1
-    ''', (session_token, datetime.now()))
+    user = _session_cache.get(session_token)
+    if user is not None:
+        return user
     
-    result = cursor.fetchone()
-    conn.close()
+    with database.pooled_connection() as conn:
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            SELECT s.*, u.* FROM sessions s
+            JOIN users u ON s.user_id = u.id
+            WHERE s.session_token = ? AND s.expires_at > ? AND u.is_active = 1
+        ''', (session_token, datetime.now()))
+
+        result = cursor.fetchone()
     
     if result:
-        return dict(result)
+        user = dict(result)
+        _session_cache.put(session_token, user)
+        return user
     return None
 
 def destroy_session(session_token):
     """Destroy a session"""
-    conn = database.get_db_connection()
-    cursor = conn.cursor()
+    _session_cache.invalidate(session_token)
     
-    cursor.execute('DELETE FROM sessions WHERE session_token = ?', (session_token,))
+    if is_signed_token(session_token):
+        revoke_signed_token(session_token)
+        return
     
-    conn.commit()
-    conn.close()
+    with database.pooled_connection() as conn:
+        cursor = conn.cursor()
+
+        cursor.execute('DELETE FROM sessions WHERE session_token = ?', (session_token,))
+    
+    data_cache.mark_tables_changed('sessions')
 
 def cleanup_expired_sessions():
     """Remove all expired sessions"""
-    conn = database.get_db_connection()
-    cursor = conn.cursor()
+    return reap_expired_sessions()
+
+# ==================== Expired Session Reaper ====================
+
+SESSION_REAPER_INTERVAL_SECONDS = float(os.environ.get('SESSION_REAPER_INTERVAL_SECONDS', 900))
+SESSION_REAPER_BATCH_SIZE = int(os.environ.get('SESSION_REAPER_BATCH_SIZE', 500))
+
+_reaper_stats = {
+    'runs': 0,
+    'errors': 0,
+    'deleted_total': 0,
+    'last_deleted': 0,
+    'last_run': None,
+    'last_duration_ms': 0.0
+}
+_reaper_thread = None
+_reaper_stop = threading.Event()
+
+def reap_expired_sessions(batch_size=None):
+    """
+    Delete expired sessions and revoked tokens in small batches
+    حذف الجلسات المنتهية على دفعات صغيرة
     
-    cursor.execute('DELETE FROM sessions WHERE expires_at < ?', (datetime.now(),))
+    Each batch is its own short transaction so logins are never blocked for long.
+    Returns the number of expired sessions deleted.
+    """
+    batch_size = batch_size or SESSION_REAPER_BATCH_SIZE
+    started = time.monotonic()
+    now = datetime.now()
+    deleted = 0
+    
+    while True:
+        with database.pooled_connection() as conn:
+            cursor = conn.cursor()
+            database._execute_query(cursor, '''
+                DELETE FROM sessions WHERE id IN (
+                    SELECT id FROM sessions WHERE expires_at < ? LIMIT ?
+                )
+            ''', (now, batch_size))
+            batch_deleted = cursor.rowcount
+        
+        deleted += max(batch_deleted, 0)
+        if batch_deleted < batch_size:
+            break
     
-    deleted = cursor.rowcount
-    conn.commit()
-    conn.close()
+    with database.pooled_connection() as conn:
+        cursor = conn.cursor()
+        # Revocations only matter until the token would have expired anyway
+        database._execute_query(cursor, 'DELETE FROM revoked_tokens WHERE expires_at < ?', (now,))
+    
+    _reaper_stats['runs'] += 1
+    _reaper_stats['deleted_total'] += deleted
+    _reaper_stats['last_deleted'] = deleted
+    _reaper_stats['last_run'] = now.isoformat()
+    _reaper_stats['last_duration_ms'] = round((time.monotonic() - started) * 1000, 2)
     
     return deleted
 
+def get_reaper_stats():
+    """
+    Get metrics of the expired session reaper
+    الحصول على إحصائيات حذف الجلسات المنتهية
+    """
+    return dict(_reaper_stats, interval_seconds=SESSION_REAPER_INTERVAL_SECONDS,
+                running=_reaper_thread is not None and _reaper_thread.is_alive())
+
+def _reaper_loop(interval):
+    # Spread workers out so they do not all reap at the same moment
+    if _reaper_stop.wait(secrets.SystemRandom().uniform(0, min(interval, 60))):
+        return
+    while True:
+        try:
+            deleted = reap_expired_sessions()
+            if deleted:
+                print(f"🧹 Session reaper removed {deleted} expired sessions "
+                      f"in {_reaper_stats['last_duration_ms']} ms")
+        except Exception as e:
+            _reaper_stats['errors'] += 1
+            print(f"⚠️  Session reaper error: {e}")
+        if _reaper_stop.wait(interval):
+            return
+
+def start_session_reaper(interval=None):
+    """
+    Start the background expired-session reaper thread for this process
+    بدء خيط حذف الجلسات المنتهية في الخلفية
+    
+    Safe to call more than once. Set SESSION_REAPER_INTERVAL_SECONDS=0 to disable.
+    """
+    global _reaper_thread
+    interval = SESSION_REAPER_INTERVAL_SECONDS if interval is None else interval
+    if interval <= 0 or (_reaper_thread is not None and _reaper_thread.is_alive()):
+        return _reaper_thread
+    
+    _reaper_stop.clear()
+    _reaper_thread = threading.Thread(target=_reaper_loop, args=(interval,),
+                                      name='session-reaper', daemon=True)
+    _reaper_thread.start()
+    return _reaper_thread
+
+def stop_session_reaper():
+    """Stop the background reaper thread"""
+    _reaper_stop.set()
+
+def _authenticate_request():
+    """
+    Resolve the user for the current request, at most once per request
+    تحديد مستخدم الطلب الحالي مرة واحدة فقط لكل طلب
+    
+    Returns (user, None) on success or (None, error_response) on failure.
+    Stacked auth decorators share the result through flask.g. Signed tokens
+    are checked against revocations and password changes here, on every request.
+    """
+    session_token = request.cookies.get('session_token')
+    
+    if not session_token:
+        return None, (jsonify({'error': 'Authentication required', 'error_ar': 'المصادقة مطلوبة'}), 401)
+    
+    if g.get('auth_session_token') == session_token:
+        user = g.auth_user
+    else:
+        user = validate_session(session_token)
+        g.auth_session_token = session_token
+        g.auth_user = user
+    
+    if not user:
+        return None, (jsonify({'error': 'Invalid or expired session', 'error_ar': 'جلسة غير صالحة أو منتهية'}), 401)
+    
+    return user, None
+
 def require_auth(f):
     """Decorator to require authentication for routes"""
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        session_token = request.cookies.get('session_token')
-        
-        if not session_token:
-            return jsonify({'error': 'Authentication required', 'error_ar': 'المصادقة مطلوبة'}), 401
-        
-        user = validate_session(session_token)
-        if not user:
-            return jsonify({'error': 'Invalid or expired session', 'error_ar': 'جلسة غير صالحة أو منتهية'}), 401
+        user, error = _authenticate_request()
+        if error:
+            return error
         
         # Add user to request context
         request.user = user
@@ -107,16 +482,12 @@ def require_role(*roles):
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            session_token = request.cookies.get('session_token')
-            
-            if not session_token:
-                return jsonify({'error': 'Authentication required', 'error_ar': 'المصادقة مطلوبة'}), 401
+            user, error = _authenticate_request()
+            if error:
+                return error
             
-            user = validate_session(session_token)
-            if not user:
-                return jsonify({'error': 'Invalid or expired session', 'error_ar': 'جلسة غير صالحة أو منتهية'}), 401
-            
-            if user['role'] not in roles and 'admin' not in roles:
+            # Admins may use every role-restricted route
+            if user['role'] not in roles and user['role'] != 'admin':
                 return jsonify({'error': 'Insufficient permissions', 'error_ar': 'صلاحيات غير كافية'}), 403
             
             # Add user to request context
@@ -130,14 +501,9 @@ def require_write_permission(f):
     """Decorator to prevent viewer role from modifying data"""
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        session_token = request.cookies.get('session_token')
-        
-        if not session_token:
-            return jsonify({'error': 'Authentication required', 'error_ar': 'المصادقة مطلوبة'}), 401
-        
-        user = validate_session(session_token)
-        if not user:
-            return jsonify({'error': 'Invalid or expired session', 'error_ar': 'جلسة غير صالحة أو منتهية'}), 401
+        user, error = _authenticate_request()
+        if error:
+            return error
         
         # Check if user is viewer (read-only)
         if user['role'] == 'viewer':
@@ -0,0 +1,75 @@
+"""
+Short-lived cache for computed dashboard data
+ذاكرة تخزين مؤقت قصيرة الأمد لبيانات لوحة التحكم
+
+Each entry records the tables it was computed from. Code that writes to a
+table calls mark_tables_changed() so dependent entries are dropped right away;
+the TTL bounds staleness for writes made by other worker processes.
+"""
+
+import os
+import threading
+import time
+
+import table_versions
+
+DATA_CACHE_TTL_SECONDS = float(os.environ.get('DATA_CACHE_TTL_SECONDS', '10'))
+
+_entries = {}  # key -> (expires_at, tables, value)
+_lock = threading.Lock()
+
+
+def get(key):
+    """Get a cached value, or None if missing or expired"""
+    with _lock:
+        entry = _entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del _entries[key]
+            return None
+        return entry[2]
+
+
+def put(key, value, tables, ttl=None):
+    """Cache a value computed from the given tables"""
+    if ttl is None:
+        ttl = DATA_CACHE_TTL_SECONDS
+    if ttl <= 0:
+        return
+    with _lock:
+        _entries[key] = (time.monotonic() + ttl, frozenset(tables), value)
+
+
+def get_or_compute(key, tables, compute, ttl=None):
+    """
+    Return the cached value for key, computing and caching it on a miss
+    إرجاع القيمة المخزنة أو حسابها وتخزينها
+    """
+    value = get(key)
+    if value is None:
+        value = compute()
+        put(key, value, tables, ttl)
+    return value
+
+
+def mark_tables_changed(*tables):
+    """
+    Drop every cached entry computed from any of the given tables
+    حذف البيانات المخزنة المعتمدة على الجداول المعدلة
+
+    Versioned tables also have their change versions re-read on next use, so
+    this worker's ETags and cached responses move on at once.
+    """
+    changed = frozenset(tables)
+    with _lock:
+        for key in [k for k, entry in _entries.items() if entry[1] & changed]:
+            del _entries[key]
+    if changed & frozenset(table_versions.VERSIONED_TABLES):
+        table_versions.invalidate()
+
+
+def clear():
+    """Drop all cached entries"""
+    with _lock:
+        _entries.clear()
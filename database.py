@@ -4,13 +4,24 @@ Database module for Faculty Housing Management System
 """
 
 import sqlite3
-from datetime import datetime
+import atexit
+import threading
+from datetime import datetime, timezone
 from werkzeug.security import generate_password_hash, check_password_hash
 import os
 import database_adapter
+import migrations
+import data_cache
 
 DATABASE_PATH = os.path.join(os.path.dirname(__file__), 'housing.db')
 
+# Buffered audit log configuration
+# إعدادات الكتابة المجمعة لسجل المراجعة
+AUDIT_ASYNC = os.environ.get('AUDIT_ASYNC', 'true').lower() == 'true'
+AUDIT_BATCH_SIZE = int(os.environ.get('AUDIT_BATCH_SIZE', 50))
+AUDIT_FLUSH_INTERVAL_SECONDS = float(os.environ.get('AUDIT_FLUSH_INTERVAL_SECONDS', 2))
+AUDIT_MAX_BUFFER = int(os.environ.get('AUDIT_MAX_BUFFER', 10000))
+
 def get_db_connection():
     """Create and return a database connection"""
     return database_adapter.get_db_connection()
@@ -21,12 +32,15 @@ def get_db():
     return get_db_connection()
 
 
+def pooled_connection():
+    """Borrow a pooled connection; use as ``with database.pooled_connection() as conn:``"""
+    return database_adapter.pooled_connection()
+
+
 def _execute_query(cursor, query, params=None):
     """Execute query with appropriate placeholder for database type"""
-    placeholder = database_adapter.get_placeholder()
-    if placeholder == '%s' and '?' in query:
-        # Replace ? with %s for PostgreSQL
-        query = query.replace('?', '%s')
+    # Replace ? with %s for PostgreSQL (cached per query text)
+    query = database_adapter.adapt_placeholders(query)
     if params:
         cursor.execute(query, params)
     else:
@@ -34,8 +48,19 @@ def _execute_query(cursor, query, params=None):
     return cursor
 
 def init_database():
-    """Initialize the database with required tables"""
+    """
+    Initialize the database with required tables
+    
+    Once every migration has been applied this is a single version check:
+    the table DDL and seed-data checks only run on a new or outdated database.
+    """
     conn = get_db_connection()
+    
+    if migrations.is_up_to_date(conn):
+        conn.close()
+        print(f"✅ Database schema is up to date (version {migrations.LATEST_VERSION})")
+        return
+    
     cursor = conn.cursor()
     
     # Get placeholder for SQL queries
@@ -72,6 +97,15 @@ def init_database():
     )
     '''))
     
+    # Revoked signed session tokens (checked by auth.is_token_revoked)
+    cursor.execute(database_adapter.adapt_sql('''
+    CREATE TABLE IF NOT EXISTS revoked_tokens (
+        jti TEXT PRIMARY KEY,
+        expires_at TIMESTAMP NOT NULL,
+        revoked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    '''))
+    
     # Buildings table
     cursor.execute(database_adapter.adapt_sql('''
     CREATE TABLE IF NOT EXISTS buildings (
@@ -352,6 +386,9 @@ def init_database():
     
     conn.commit()
     
+    # Indexes and later schema changes are applied as versioned migrations
+    migrations.run_migrations(conn)
+    
     # Check if default users exist
     _execute_query(cursor, 'SELECT COUNT(*) FROM users')
     user_count = cursor.fetchone()[0]
@@ -505,6 +542,7 @@ def create_user(username, password, name, role, email=None):
         conn.commit()
         user_id = cursor.lastrowid
         conn.close()
+        data_cache.mark_tables_changed('users')
         return user_id
     except Exception as e:
         # Handle IntegrityError for both SQLite and PostgreSQL
@@ -542,13 +580,14 @@ def get_user_by_id(user_id):
     return dict(user) if user else None
 
 def update_user_password(user_id, new_password):
-    """Update user password"""
+    """Update user password and invalidate the user's signed session tokens"""
     conn = get_db_connection()
     cursor = conn.cursor()
     
     password_hash = generate_password_hash(new_password)
     _execute_query(cursor, '''
-        UPDATE users SET password_hash = ?, updated_at = ? WHERE id = ?
+        UPDATE users SET password_hash = ?, token_version = COALESCE(token_version, 0) + 1, updated_at = ?
+        WHERE id = ?
     ''', (password_hash, datetime.now(), user_id))
     
     conn.commit()
@@ -557,18 +596,130 @@ def update_user_password(user_id, new_password):
     
     return affected > 0
 
+_AUDIT_INSERT_SQL = '''
+    INSERT INTO audit_log (user_id, action, table_name, record_id, old_values, new_values, ip_address, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+
+class AuditWriter:
+    """
+    Buffered audit log writer
+    كاتب مجمع لسجل المراجعة
+    
+    Entries are queued in memory and written with a single executemany once
+    AUDIT_BATCH_SIZE entries are waiting or AUDIT_FLUSH_INTERVAL_SECONDS have
+    passed. Failed batches are put back at the head of the queue and retried.
+    """
+    
+    def __init__(self, batch_size=AUDIT_BATCH_SIZE, flush_interval=AUDIT_FLUSH_INTERVAL_SECONDS,
+                 max_buffer=AUDIT_MAX_BUFFER):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._pid = os.getpid()
+    
+    def _check_fork(self):
+        # Entries buffered before a fork belong to the parent, which flushes them itself
+        if self._pid != os.getpid():
+            self._buffer = []
+            self._thread = None
+            self._lock = threading.Lock()
+            self._flush_lock = threading.Lock()
+            self._wake = threading.Event()
+            self._pid = os.getpid()
+    
+    def add(self, entry):
+        """Queue an entry; returns False when the buffer is full and the caller should write directly"""
+        self._check_fork()
+        with self._lock:
+            if len(self._buffer) >= self.max_buffer:
+                return False
+            self._buffer.append(entry)
+            pending = len(self._buffer)
+        
+        if self._thread is None or not self._thread.is_alive():
+            self._start()
+        if pending >= self.batch_size:
+            self._wake.set()
+        return True
+    
+    def _start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+            self._thread.start()
+    
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"⚠️  Audit log flush failed, will retry: {e}")
+    
+    def flush(self):
+        """Write every queued entry; returns the number of rows written"""
+        self._check_fork()
+        with self._flush_lock:
+            with self._lock:
+                batch, self._buffer = self._buffer, []
+            if not batch:
+                return 0
+            
+            try:
+                with pooled_connection() as conn:
+                    cursor = conn.cursor()
+                    cursor.executemany(database_adapter.adapt_placeholders(_AUDIT_INSERT_SQL), batch)
+            except Exception:
+                with self._lock:
+                    self._buffer[:0] = batch
+                raise
+            
+            return len(batch)
+    
+    def pending(self):
+        """Number of entries waiting to be written"""
+        with self._lock:
+            return len(self._buffer)
+
+
+_audit_writer = AuditWriter()
+
 def log_audit(user_id, action, table_name=None, record_id=None, old_values=None, new_values=None, ip_address=None):
-    """Log an audit entry"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    """Log an audit entry (buffered unless AUDIT_ASYNC=false)"""
+    # Timestamp at call time in UTC, matching CURRENT_TIMESTAMP, not at flush time
+    created_at = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+    entry = (user_id, action, table_name, record_id, old_values, new_values, ip_address, created_at)
     
-    _execute_query(cursor, '''
-        INSERT INTO audit_log (user_id, action, table_name, record_id, old_values, new_values, ip_address)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    ''', (user_id, action, table_name, record_id, old_values, new_values, ip_address))
+    if AUDIT_ASYNC and _audit_writer.add(entry):
+        return
     
-    conn.commit()
-    conn.close()
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        _execute_query(cursor, _AUDIT_INSERT_SQL, entry)
+
+def flush_audit_log():
+    """
+    Write all buffered audit entries now
+    كتابة جميع إدخالات سجل المراجعة المعلقة
+    
+    Called on worker shutdown and at interpreter exit.
+    """
+    try:
+        return _audit_writer.flush()
+    except Exception as e:
+        print(f"❌ Failed to flush {_audit_writer.pending()} audit log entries: {e}")
+        return 0
+
+atexit.register(flush_audit_log)
 
 if __name__ == '__main__':
     # Initialize database when run directly
@@ -7,9 +7,25 @@ This module provides compatibility between SQLite (development) and PostgreSQL (
 """
 
 import os
+import secrets
 import sys
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from functools import lru_cache
 from urllib.parse import urlparse
 
+# Connection pool configuration
+# إعدادات مجمع الاتصالات
+POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+POOL_HEALTHCHECK_SECONDS = float(os.environ.get('DB_POOL_HEALTHCHECK_SECONDS', 30))
+
+# SQLite performance profile applied to every new connection
+# إعدادات أداء SQLite المطبقة على كل اتصال جديد
+# 'performance' enables WAL and relaxed syncing; 'default' keeps SQLite's built-in settings
+SQLITE_PROFILE = os.environ.get('SQLITE_PROFILE', 'performance').lower()
+
 def get_database_type():
     """
     Determine which database to use based on environment
@@ -49,20 +65,44 @@ def get_connection_params():
         'path': os.path.join(os.path.dirname(__file__), 'housing.db')
     }
 
-def get_db_connection():
+# Resolved database settings; built once per process by get_dialect()
+Dialect = namedtuple('Dialect', ['type', 'url', 'path', 'placeholder'])
+
+@lru_cache(maxsize=1)
+def get_dialect():
     """
-    Create and return a database connection based on environment
-    إنشاء وإرجاع اتصال قاعدة البيانات بناءً على البيئة
+    Resolve the database dialect once per process
+    تحديد نوع قاعدة البيانات مرة واحدة لكل عملية
+    
+    Returns an immutable Dialect so the hot path never re-reads the environment.
+    Call reset_dialect() after changing DATABASE_URL at runtime.
     """
     params = get_connection_params()
+    sqlite_path = os.path.join(os.path.dirname(__file__), 'housing.db')
     
     if params['type'] == 'postgresql':
+        return Dialect('postgresql', params['url'], sqlite_path, '%s')
+    return Dialect('sqlite', None, params['path'], '?')
+
+def reset_dialect():
+    """Forget the cached dialect and SQL translations"""
+    get_dialect.cache_clear()
+    get_sqlite_pragmas.cache_clear()
+    _adapt_sql.cache_clear()
+    _adapt_placeholders.cache_clear()
+
+def _connect(dialect):
+    """
+    Open a new raw connection for the given dialect
+    فتح اتصال جديد بقاعدة البيانات
+    """
+    if dialect.type == 'postgresql':
         try:
             import psycopg2
             import psycopg2.extras
             
             # Enable dict-like row access by setting cursor_factory during connection
-            conn = psycopg2.connect(params['url'], cursor_factory=psycopg2.extras.RealDictCursor)
+            conn = psycopg2.connect(dialect.url, cursor_factory=psycopg2.extras.RealDictCursor)
             return conn
         except ImportError:
             print("⚠️  Warning: psycopg2 not installed. Falling back to SQLite.")
@@ -73,10 +113,219 @@ def get_db_connection():
     
     # Fall back to SQLite
     import sqlite3
-    conn = sqlite3.connect(params['path'])
+    # Pooled connections are handed between threads, but only ever used by one at a time
+    conn = sqlite3.connect(dialect.path, check_same_thread=False)
     conn.row_factory = sqlite3.Row
+    _apply_sqlite_profile(conn)
     return conn
 
+@lru_cache(maxsize=1)
+def get_sqlite_pragmas():
+    """
+    Get the PRAGMA settings of the configured SQLite profile
+    الحصول على إعدادات PRAGMA لملف أداء SQLite
+    
+    Returns a tuple of (pragma, value) pairs in the order they are applied.
+    Individual values can be overridden with SQLITE_* environment variables.
+    """
+    if SQLITE_PROFILE != 'performance':
+        return ()
+    
+    return (
+        # Writers no longer block readers, and gunicorn workers wait instead of failing on locks
+        ('journal_mode', os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')),
+        ('busy_timeout', int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))),
+        # Safe with WAL: a power loss may roll back the last commits but never corrupts
+        ('synchronous', os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')),
+        ('mmap_size', int(os.environ.get('SQLITE_MMAP_SIZE', 128 * 1024 * 1024))),
+        # Negative values are KiB rather than pages
+        ('cache_size', -int(os.environ.get('SQLITE_CACHE_SIZE_KB', 16 * 1024))),
+        ('temp_store', os.environ.get('SQLITE_TEMP_STORE', 'MEMORY')),
+    )
+
+def _apply_sqlite_profile(conn):
+    for pragma, value in get_sqlite_pragmas():
+        try:
+            conn.execute(f'PRAGMA {pragma} = {value}')
+        except Exception as e:
+            print(f"⚠️  Warning: Could not apply PRAGMA {pragma} = {value}: {e}")
+
+def get_db_connection():
+    """
+    Create and return a database connection based on environment
+    إنشاء وإرجاع اتصال قاعدة البيانات بناءً على البيئة
+    """
+    return _connect(get_dialect())
+
+
+class ConnectionPool:
+    """
+    Small thread-safe pool of reusable database connections
+    مجمع اتصالات قابلة لإعادة الاستخدام
+    
+    Idle connections are kept up to ``size``; extra connections are closed on
+    release. Connections idle for longer than ``healthcheck_seconds`` are
+    probed with ``SELECT 1`` before being handed out again.
+    """
+    
+    def __init__(self, size=POOL_SIZE, healthcheck_seconds=POOL_HEALTHCHECK_SECONDS):
+        self.size = size
+        self.healthcheck_seconds = healthcheck_seconds
+        self._idle = []
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self.stats = {'created': 0, 'reused': 0, 'discarded': 0}
+    
+    def _check_fork(self):
+        # Connections inherited from the gunicorn master must not be shared with workers;
+        # drop the references without closing them so the parent's sockets stay intact
+        if self._pid != os.getpid():
+            self._idle = []
+            self._pid = os.getpid()
+    
+    def _is_healthy(self, conn):
+        if getattr(conn, 'closed', 0):
+            return False
+        try:
+            cursor = conn.cursor()
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+            cursor.close()
+            return True
+        except Exception:
+            return False
+    
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+    
+    def get_stats(self):
+        """Snapshot of the created/reused/discarded counters and the idle count"""
+        with self._lock:
+            return dict(self.stats, idle=len(self._idle))
+    
+    def acquire(self):
+        """Take an idle connection from the pool or open a new one"""
+        while True:
+            with self._lock:
+                self._check_fork()
+                if not self._idle:
+                    break
+                conn, released_at = self._idle.pop()
+            
+            if time.monotonic() - released_at < self.healthcheck_seconds or self._is_healthy(conn):
+                self._count('reused')
+                return conn
+            
+            self._count('discarded')
+            _safe_close(conn)
+        
+        self._count('created')
+        return get_db_connection()
+    
+    def release(self, conn):
+        """Return a connection to the pool, closing it if the pool is full or it is broken"""
+        try:
+            # Never hand out a connection with a half-finished transaction
+            conn.rollback()
+        except Exception:
+            self._count('discarded')
+            _safe_close(conn)
+            return
+        
+        with self._lock:
+            self._check_fork()
+            if len(self._idle) < self.size and not getattr(conn, 'closed', 0):
+                self._idle.append((conn, time.monotonic()))
+                return
+        
+        _safe_close(conn)
+    
+    def close_all(self):
+        """Close every idle connection held by the pool"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            _safe_close(conn)
+
+
+def _safe_close(conn):
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """
+    Get the process-wide connection pool
+    الحصول على مجمع الاتصالات الخاص بالعملية
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool()
+    return _pool
+
+@contextmanager
+def pooled_connection():
+    """
+    Borrow a pooled connection for the duration of a ``with`` block
+    استعارة اتصال من المجمع خلال كتلة with
+    
+    Commits when the block succeeds, rolls back when it raises, and always
+    returns the connection to the pool. Set DB_POOL_SIZE=0 to disable pooling.
+    
+    Usage:
+        with database_adapter.pooled_connection() as conn:
+            cursor = conn.cursor()
+            ...
+    """
+    if POOL_SIZE <= 0:
+        conn = get_db_connection()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        return
+    
+    pool = get_pool()
+    conn = pool.acquire()
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        raise
+    finally:
+        pool.release(conn)
+
+def streaming_cursor(conn, itersize=1000):
+    """
+    Get a cursor that fetches rows incrementally
+    الحصول على مؤشر يجلب الصفوف تدريجياً
+    
+    psycopg2 cursors load the whole result into memory on execute(), so on
+    PostgreSQL a named (server-side) cursor is used; it must be consumed
+    inside the connection's transaction. SQLite cursors already step lazily.
+    """
+    if type(conn).__module__.startswith('psycopg2'):
+        cursor = conn.cursor(name=f'stream_{secrets.token_hex(8)}')
+        cursor.itersize = itersize
+        return cursor
+    return conn.cursor()
+
 def get_placeholder():
     """
     Get the appropriate placeholder for SQL queries
@@ -84,19 +333,21 @@ def get_placeholder():
     
     SQLite uses ? while PostgreSQL uses %s
     """
-    params = get_connection_params()
-    return '%s' if params['type'] == 'postgresql' else '?'
+    return get_dialect().placeholder
 
 def adapt_sql(sql_query):
     """
     Adapt SQL query for the current database type
     تكييف استعلام SQL لنوع قاعدة البيانات الحالي
     
-    Converts SQLite-specific syntax to PostgreSQL-compatible syntax
+    Converts SQLite-specific syntax to PostgreSQL-compatible syntax.
+    Translations are memoized per query text.
     """
-    params = get_connection_params()
-    
-    if params['type'] == 'postgresql':
+    return _adapt_sql(sql_query, get_dialect().type)
+
+@lru_cache(maxsize=1024)
+def _adapt_sql(sql_query, db_type):
+    if db_type == 'postgresql':
         # Convert AUTOINCREMENT to SERIAL
         sql_query = sql_query.replace('INTEGER PRIMARY KEY AUTOINCREMENT', 'SERIAL PRIMARY KEY')
         sql_query = sql_query.replace('AUTOINCREMENT', '')
@@ -108,19 +359,32 @@ def adapt_sql(sql_query):
         # Both work in PostgreSQL, so no change needed
         
         # Replace ? placeholders with %s
-        count = sql_query.count('?')
-        for i in range(count):
-            sql_query = sql_query.replace('?', '%s', 1)
+        sql_query = sql_query.replace('?', '%s')
     
     return sql_query
 
+def adapt_placeholders(sql_query):
+    """
+    Rewrite ? placeholders for the current database type
+    تحويل العناصر النائبة لنوع قاعدة البيانات الحالي
+    
+    Memoized per query text; a no-op on SQLite.
+    """
+    return _adapt_placeholders(sql_query, get_dialect().placeholder)
+
+@lru_cache(maxsize=1024)
+def _adapt_placeholders(sql_query, placeholder):
+    if placeholder == '?' or '?' not in sql_query:
+        return sql_query
+    return sql_query.replace('?', placeholder)
+
 def print_database_info():
     """
     Print current database configuration
     طباعة معلومات قاعدة البيانات الحالية
     """
-    params = get_connection_params()
-    db_type = params['type']
+    dialect = get_dialect()
+    db_type = dialect.type
     
     print("\n" + "="*60)
     print("📊 Database Configuration / تكوين قاعدة البيانات")
@@ -132,7 +396,7 @@ def print_database_info():
         # Safely display connection info without exposing credentials
         from urllib.parse import urlparse
         try:
-            parsed = urlparse(params['url'])
+            parsed = urlparse(dialect.url)
             safe_url = f"{parsed.scheme}://*****:*****@{parsed.hostname}:{parsed.port or 5432}/{parsed.path.lstrip('/')}"
             print(f"🔗 Connection: {safe_url}")
         except:
@@ -140,7 +404,18 @@ def print_database_info():
     else:
         print("✅ Database Type: SQLite")
         print("💻 Environment: Development (Local)")
-        print(f"📁 Database Path: {params['path']}")
+        print(f"📁 Database Path: {dialect.path}")
+        pragmas = get_sqlite_pragmas()
+        if pragmas:
+            settings = ', '.join(f'{pragma}={value}' for pragma, value in pragmas)
+            print(f"⚙️  SQLite Profile: {SQLITE_PROFILE} ({settings})")
+        else:
+            print(f"⚙️  SQLite Profile: {SQLITE_PROFILE} (SQLite defaults)")
+    
+    if POOL_SIZE > 0:
+        print(f"🔁 Connection Pool: {POOL_SIZE} idle connections, health check after {POOL_HEALTHCHECK_SECONDS:g}s idle")
+    else:
+        print("🔁 Connection Pool: disabled")
     
     print("="*60 + "\n")
 
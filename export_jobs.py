@@ -0,0 +1,229 @@
+"""
+Background export jobs
+مهام التصدير في الخلفية
+
+Large exports can take minutes, which would tie up a sync gunicorn worker
+(with one worker, the whole system). submit() hands the rendering to a
+small thread pool and returns straight away with a job id. The job's state
+is a JSON file under EXPORT_FOLDER/jobs, so any worker can answer the status
+and download requests, and the rendered file is kept next to it until
+EXPORT_JOB_TTL_SECONDS after it finished. Synchronous exports are rendered
+under EXPORT_FOLDER/tmp (see scratch_path) and removed once sent.
+"""
+
+import json
+import os
+import secrets
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+EXPORT_WORKERS = int(os.environ.get('EXPORT_WORKERS', 2))
+EXPORT_JOB_TTL_SECONDS = int(os.environ.get('EXPORT_JOB_TTL_SECONDS', 3600))
+EXPORT_CLEANUP_INTERVAL_SECONDS = 60
+
+_state = {'folder': None, 'executor': None, 'pid': None, 'last_cleanup': 0.0}
+_lock = threading.Lock()
+
+
+class ExportError(Exception):
+    """An export that cannot be produced (e.g. nothing to export)"""
+
+    def __init__(self, message, message_ar, status=400):
+        super().__init__(message)
+        self.message_ar = message_ar
+        self.status = status
+
+
+def init(export_folder):
+    """Set the folder exports are written to"""
+    _state['folder'] = export_folder
+    os.makedirs(_jobs_folder(), exist_ok=True)
+    os.makedirs(_scratch_folder(), exist_ok=True)
+
+
+def _jobs_folder():
+    return os.path.join(_state['folder'], 'jobs')
+
+
+def _scratch_folder():
+    return os.path.join(_state['folder'], 'tmp')
+
+
+def scratch_path(filename):
+    """
+    Unique path for a synchronous export; remove it with discard() once sent
+    مسار مؤقت لملف تصدير مباشر
+    """
+    return os.path.join(_scratch_folder(), f'{secrets.token_hex(8)}_{filename}')
+
+
+def discard(path):
+    """Remove an export file, ignoring files that are already gone"""
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _state_path(job_id):
+    return os.path.join(_jobs_folder(), f'{job_id}.json')
+
+
+def artifact_path(job):
+    """Path of the rendered file of a job"""
+    extension = os.path.splitext(job['filename'])[1]
+    return os.path.join(_jobs_folder(), f"{job['id']}{extension}")
+
+
+def _now():
+    return datetime.now().isoformat(timespec='seconds')
+
+
+def _save(job):
+    # Write then rename so readers never see a half-written file
+    fd, tmp_path = tempfile.mkstemp(dir=_jobs_folder(), suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(job, f, ensure_ascii=False)
+    os.replace(tmp_path, _state_path(job['id']))
+
+
+def _valid_job_id(job_id):
+    return bool(job_id) and all(c.isalnum() or c in '-_' for c in job_id)
+
+
+def get_job(job_id):
+    """
+    Get a job's state
+    الحصول على حالة مهمة التصدير
+
+    Returns None for unknown or expired jobs.
+    """
+    if not _valid_job_id(job_id):
+        return None
+    try:
+        with open(_state_path(job_id), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _executor():
+    with _lock:
+        # A pool created in another process (before a fork) has no threads here
+        if _state['executor'] is None or _state['pid'] != os.getpid():
+            _state['executor'] = ThreadPoolExecutor(max_workers=EXPORT_WORKERS,
+                                                    thread_name_prefix='export')
+            _state['pid'] = os.getpid()
+        return _state['executor']
+
+
+def _run(job, render, on_done):
+    job.update(status='running', started_at=_now())
+    _save(job)
+
+    def progress(percent):
+        percent = max(0, min(99, int(percent)))
+        if percent != job['progress']:
+            job['progress'] = percent
+            _save(job)
+
+    try:
+        result = render(artifact_path(job), progress)
+        job.update(status='done', progress=100, size=os.path.getsize(artifact_path(job)))
+        if on_done:
+            on_done(result)
+    except ExportError as e:
+        job.update(status='failed', error=str(e), error_ar=e.message_ar)
+    except Exception as e:
+        print(f"⚠️  Export job {job['id']} ({job['kind']}) failed: {e}")
+        job.update(status='failed', error='Export failed', error_ar='فشل التصدير')
+    job['finished_at'] = _now()
+    _save(job)
+
+
+def submit(kind, filename, mimetype, render, user_id=None, on_done=None):
+    """
+    Queue an export
+    إضافة مهمة تصدير إلى قائمة الانتظار
+
+    Args:
+        kind: Export type, for display and logs
+        filename: Download name of the result
+        mimetype: Content type of the result
+        render: fn(output_path, progress) writing the file; progress(percent)
+                may be called to report progress. Raise ExportError for
+                user-facing failures.
+        user_id: Owner of the job
+        on_done: Optional fn(render result) called after a successful
+                 render (e.g. to write the audit entry)
+
+    Returns:
+        The job state dict
+    """
+    cleanup_expired()
+    job = {
+        'id': secrets.token_urlsafe(16),
+        'kind': kind,
+        'status': 'queued',
+        'progress': 0,
+        'filename': filename,
+        'mimetype': mimetype,
+        'user_id': user_id,
+        'created_at': _now(),
+        'started_at': None,
+        'finished_at': None,
+        'size': None,
+        'error': None,
+        'error_ar': None,
+    }
+    _save(job)
+    _executor().submit(_run, job, render, on_done)
+    return job
+
+
+def cleanup_expired(force=False):
+    """
+    Delete expired jobs and export files
+    حذف مهام وملفات التصدير المنتهية
+
+    Jobs expire EXPORT_JOB_TTL_SECONDS after their last update (finished,
+    or lost with a restarted worker); synchronous export files left behind
+    (e.g. by a crashed worker) expire the same time after they were written.
+    Only the jobs and tmp folders this module owns are swept. Runs at most
+    once per EXPORT_CLEANUP_INTERVAL_SECONDS unless forced.
+    """
+    now = time.time()
+    with _lock:
+        if not force and now - _state['last_cleanup'] < EXPORT_CLEANUP_INTERVAL_SECONDS:
+            return 0
+        _state['last_cleanup'] = now
+
+    cutoff = now - EXPORT_JOB_TTL_SECONDS
+    removed = 0
+    for folder in (_jobs_folder(), _scratch_folder()):
+        try:
+            entries = list(os.scandir(folder))
+        except OSError:
+            continue
+        for entry in entries:
+            if not entry.is_file():
+                continue
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    removed += 1
+            except OSError:
+                pass
+    return removed
+
+
+def job_json(job):
+    """Public view of a job for API responses"""
+    body = {key: job[key] for key in ('id', 'kind', 'status', 'progress', 'filename', 'size',
+                                      'created_at', 'started_at', 'finished_at', 'error', 'error_ar')}
+    body['status_url'] = f"/api/exports/{job['id']}"
+    body['download_url'] = f"/api/exports/{job['id']}/download" if job['status'] == 'done' else None
+    return body
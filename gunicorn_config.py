@@ -55,6 +55,20 @@ def when_ready(server):
     print(f"   Workers: {workers}")
     print(f"   Binding: {bind}")
 
+def post_fork(server, worker):
+    """Called in each worker just after it has been forked."""
+    # Threads do not survive fork, so the reaper is started per worker
+    import auth
+    auth.start_session_reaper()
+
+def worker_exit(server, worker):
+    """Called in the worker just after it has exited."""
+    # Audit entries are buffered per worker; write them before the process goes away
+    import database
+    database.flush_audit_log()
+
 def on_exit(server):
     """Called just before exiting Gunicorn."""
+    import database
+    database.flush_audit_log()
     print("👋 Shutting down Housing Management System...")
@@ -17,6 +17,7 @@ from docx.enum.text import WD_ALIGN_PARAGRAPH
 from io import BytesIO
 from datetime import datetime
 import database
+import rollups
 
 
 def get_report_data():
@@ -41,15 +42,15 @@ def get_report_data():
             'complaints': {}
         }
         
-        # Overview Statistics
-        cursor.execute('SELECT COUNT(*) FROM buildings')
-        report_data['overview']['total_buildings'] = cursor.fetchone()[0] or 0
-        
-        cursor.execute('SELECT COUNT(*) FROM apartments')
-        report_data['overview']['total_units'] = cursor.fetchone()[0] or 0
+        # Headline counters are maintained by triggers in rollup_counts
+        counts = rollups.read_counts(cursor, [
+            'buildings', 'apartments', 'residents', 'parking_spots', 'traffic_violations', 'complaints'
+        ])
         
-        cursor.execute('SELECT COUNT(*) FROM residents WHERE is_active = 1')
-        report_data['overview']['total_residents'] = cursor.fetchone()[0] or 0
+        # Overview Statistics
+        report_data['overview']['total_buildings'] = rollups.count(counts, 'buildings')
+        report_data['overview']['total_units'] = rollups.count(counts, 'apartments')
+        report_data['overview']['total_residents'] = rollups.count(counts, 'residents', 'is_active', (1,))
         
         # Calculate occupancy rate
         total_units = report_data['overview']['total_units']
@@ -79,11 +80,8 @@ def get_report_data():
         report_data['buildings']['new_building_count'] = cursor.fetchone()[0] or 0
         
         # Parking Statistics
-        cursor.execute('SELECT COUNT(*) FROM apartment_parking')
-        report_data['parking']['total_parking'] = cursor.fetchone()[0] or 0
-        
-        cursor.execute("SELECT COUNT(*) FROM apartment_parking WHERE status = 'مشغول'")
-        report_data['parking']['occupied_parking'] = cursor.fetchone()[0] or 0
+        report_data['parking']['total_parking'] = rollups.count(counts, 'parking_spots')
+        report_data['parking']['occupied_parking'] = rollups.count(counts, 'parking_spots', 'is_occupied', (1,))
         
         report_data['parking']['vacant_parking'] = (
             report_data['parking']['total_parking'] - 
@@ -99,20 +97,11 @@ def get_report_data():
             report_data['parking']['utilization'] = 0
         
         # Violations Statistics
-        cursor.execute('SELECT COUNT(*) FROM traffic_violations')
-        report_data['violations']['total_violations'] = cursor.fetchone()[0] or 0
-        
-        cursor.execute("""
-            SELECT COUNT(*) FROM traffic_violations 
-            WHERE status IN ('pending', 'open', 'مفتوحة', 'معلقة')
-        """)
-        report_data['violations']['open_violations'] = cursor.fetchone()[0] or 0
-        
-        cursor.execute("""
-            SELECT COUNT(*) FROM traffic_violations 
-            WHERE status IN ('resolved', 'closed', 'محلولة', 'مغلقة')
-        """)
-        report_data['violations']['closed_violations'] = cursor.fetchone()[0] or 0
+        report_data['violations']['total_violations'] = rollups.count(counts, 'traffic_violations')
+        report_data['violations']['open_violations'] = rollups.count(
+            counts, 'traffic_violations', 'status', ('pending', 'open', 'مفتوحة', 'معلقة'))
+        report_data['violations']['closed_violations'] = rollups.count(
+            counts, 'traffic_violations', 'status', ('resolved', 'closed', 'محلولة', 'مغلقة'))
         
         if report_data['violations']['total_violations'] > 0:
             report_data['violations']['closure_rate'] = round(
@@ -142,20 +131,11 @@ def get_report_data():
             report_data['visitors']['month_visitors'] = 0
         
         # Complaints Statistics
-        cursor.execute('SELECT COUNT(*) FROM complaints')
-        report_data['complaints']['total_complaints'] = cursor.fetchone()[0] or 0
-        
-        cursor.execute("""
-            SELECT COUNT(*) FROM complaints 
-            WHERE status IN ('open', 'مفتوحة')
-        """)
-        report_data['complaints']['open_complaints'] = cursor.fetchone()[0] or 0
-        
-        cursor.execute("""
-            SELECT COUNT(*) FROM complaints 
-            WHERE status IN ('resolved', 'محلولة', 'closed', 'مغلقة')
-        """)
-        report_data['complaints']['closed_complaints'] = cursor.fetchone()[0] or 0
+        report_data['complaints']['total_complaints'] = rollups.count(counts, 'complaints')
+        report_data['complaints']['open_complaints'] = rollups.count(
+            counts, 'complaints', 'status', ('open', 'مفتوحة'))
+        report_data['complaints']['closed_complaints'] = rollups.count(
+            counts, 'complaints', 'status', ('resolved', 'محلولة', 'closed', 'مغلقة'))
         
         if report_data['complaints']['total_complaints'] > 0:
             report_data['complaints']['resolution_rate'] = round(
@@ -0,0 +1,243 @@
+"""
+Shared HTTP client for external APIs (Plate Recognizer, ParkPow)
+عميل HTTP مشترك لخدمات التمييز الخارجية
+
+One pooled requests.Session per process, so recognitions reuse kept-alive
+TLS connections instead of paying a new handshake each time. Every call
+goes through request(), which adds:
+- bounded retries with jittered exponential backoff for connection errors
+  and 429/502/503/504 responses (Retry-After is honoured)
+- a circuit breaker per endpoint: after repeated failures calls fail fast
+  for HTTP_CIRCUIT_RESET_SECONDS instead of waiting on a dead service
+- per-endpoint call, error, retry and latency metrics (get_metrics())
+
+Read timeouts are only retried for GET: a POSTed image may already have
+been processed (and billed) by the time the response is lost.
+"""
+
+import os
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+HTTP_POOL_SIZE = int(os.environ.get('HTTP_POOL_SIZE', 10))
+HTTP_MAX_RETRIES = int(os.environ.get('HTTP_MAX_RETRIES', 2))
+HTTP_RETRY_BACKOFF_SECONDS = float(os.environ.get('HTTP_RETRY_BACKOFF_SECONDS', '0.5'))
+HTTP_RETRY_MAX_DELAY_SECONDS = float(os.environ.get('HTTP_RETRY_MAX_DELAY_SECONDS', '8'))
+HTTP_CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get('HTTP_CIRCUIT_FAILURE_THRESHOLD', 5))
+HTTP_CIRCUIT_RESET_SECONDS = float(os.environ.get('HTTP_CIRCUIT_RESET_SECONDS', '30'))
+
+RETRY_STATUSES = {429, 502, 503, 504}
+
+# Latencies kept per endpoint for percentiles
+LATENCY_SAMPLES = 200
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised without calling the service while its circuit is open"""
+
+
+_session_state = {'session': None, 'pid': None}
+_lock = threading.Lock()
+_circuits = {}  # endpoint -> {'failures', 'opened_at', 'trial'}
+_metrics = {}   # endpoint -> counters and recent latencies
+
+
+def get_session():
+    """
+    Get this process's pooled session
+    الحصول على جلسة HTTP المشتركة لهذه العملية
+
+    Created lazily and re-created after a fork, since pooled sockets must
+    not be shared between processes.
+    """
+    with _lock:
+        if _session_state['session'] is None or _session_state['pid'] != os.getpid():
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_SIZE, max_retries=0)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _session_state['session'] = session
+            _session_state['pid'] = os.getpid()
+        return _session_state['session']
+
+
+# ==================== Circuit breaker ====================
+
+def _circuit(endpoint):
+    return _circuits.setdefault(endpoint, {'failures': 0, 'opened_at': None, 'trial': False})
+
+
+def _allow_call(endpoint):
+    """Closed: allow. Open: reject until the reset time, then let one trial call through"""
+    with _lock:
+        circuit = _circuit(endpoint)
+        if circuit['opened_at'] is None:
+            return True
+        if time.monotonic() - circuit['opened_at'] < HTTP_CIRCUIT_RESET_SECONDS or circuit['trial']:
+            return False
+        circuit['trial'] = True
+        return True
+
+
+def _record_outcome(endpoint, failed):
+    with _lock:
+        circuit = _circuit(endpoint)
+        circuit['trial'] = False
+        if not failed:
+            circuit['failures'] = 0
+            circuit['opened_at'] = None
+            return
+        circuit['failures'] += 1
+        if circuit['failures'] >= HTTP_CIRCUIT_FAILURE_THRESHOLD or circuit['opened_at'] is not None:
+            if circuit['opened_at'] is None:
+                print(f"⚠️  Circuit opened for {endpoint} after {circuit['failures']} failures")
+            circuit['opened_at'] = time.monotonic()
+
+
+# ==================== Metrics ====================
+
+def _metric(endpoint):
+    return _metrics.setdefault(endpoint, {
+        'calls': 0, 'errors': 0, 'retries': 0, 'rejected': 0,
+        'total_ms': 0.0, 'max_ms': 0.0, 'latencies': deque(maxlen=LATENCY_SAMPLES),
+    })
+
+
+def _record_latency(endpoint, elapsed_ms, failed):
+    with _lock:
+        metric = _metric(endpoint)
+        metric['calls'] += 1
+        metric['errors'] += 1 if failed else 0
+        metric['total_ms'] += elapsed_ms
+        metric['max_ms'] = max(metric['max_ms'], elapsed_ms)
+        metric['latencies'].append(elapsed_ms)
+
+
+def _count(endpoint, counter):
+    with _lock:
+        _metric(endpoint)[counter] += 1
+
+
+def get_metrics():
+    """
+    Per-endpoint call counts, latency and circuit state for this process
+    إحصائيات الاتصال بالخدمات الخارجية
+    """
+    with _lock:
+        report = {}
+        for endpoint, metric in _metrics.items():
+            latencies = sorted(metric['latencies'])
+
+            def percentile(fraction):
+                return round(latencies[min(len(latencies) - 1, int(len(latencies) * fraction))], 1) if latencies else None
+
+            circuit = _circuits.get(endpoint, {})
+            report[endpoint] = {
+                'calls': metric['calls'],
+                'errors': metric['errors'],
+                'retries': metric['retries'],
+                'rejected': metric['rejected'],
+                'avg_ms': round(metric['total_ms'] / metric['calls'], 1) if metric['calls'] else None,
+                'p50_ms': percentile(0.5),
+                'p95_ms': percentile(0.95),
+                'max_ms': round(metric['max_ms'], 1),
+                'circuit': 'open' if circuit.get('opened_at') is not None else 'closed',
+            }
+        return report
+
+
+# ==================== Requests ====================
+
+def _retry_after_seconds(response):
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _backoff(attempt, retry_after=None):
+    # Full jitter: a random delay up to the exponential bound spreads retries out
+    delay = random.uniform(0, HTTP_RETRY_BACKOFF_SECONDS * (2 ** attempt))
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return min(delay, HTTP_RETRY_MAX_DELAY_SECONDS)
+
+
+def request(method, url, endpoint=None, timeout=30, retries=None, **kwargs):
+    """
+    Send a request through the shared session
+    إرسال طلب عبر الجلسة المشتركة
+
+    Args:
+        method: HTTP method
+        url: Request URL
+        endpoint: Name used for metrics and the circuit breaker (defaults to the URL)
+        timeout: Seconds, as for requests
+        retries: Retries after the first attempt (default HTTP_MAX_RETRIES)
+        **kwargs: headers, data, files, json, params... as for requests
+
+    Returns:
+        The last requests.Response (status codes are left to the caller)
+
+    Raises:
+        requests.exceptions.RequestException, including CircuitOpenError
+    """
+    endpoint = endpoint or url
+    retries = HTTP_MAX_RETRIES if retries is None else retries
+    session = get_session()
+
+    # Prepared once so the (multipart) body can be re-sent on retry
+    prepared = session.prepare_request(requests.Request(method.upper(), url, **kwargs))
+    settings = session.merge_environment_settings(prepared.url, {}, None, None, None)
+
+    attempt = 0
+    while True:
+        if not _allow_call(endpoint):
+            _count(endpoint, 'rejected')
+            raise CircuitOpenError(f'Circuit open for {endpoint}; not calling the service')
+
+        started = time.perf_counter()
+        try:
+            response = session.send(prepared, timeout=timeout, **settings)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            _record_latency(endpoint, (time.perf_counter() - started) * 1000, True)
+            _record_outcome(endpoint, True)
+            read_timeout = isinstance(e, requests.exceptions.ReadTimeout)
+            if attempt >= retries or (read_timeout and prepared.method != 'GET'):
+                raise
+            time.sleep(_backoff(attempt))
+        else:
+            failed = response.status_code >= 500
+            _record_latency(endpoint, (time.perf_counter() - started) * 1000, failed)
+            _record_outcome(endpoint, failed)
+            if response.status_code not in RETRY_STATUSES or attempt >= retries:
+                return response
+            delay = _backoff(attempt, _retry_after_seconds(response))
+            response.close()
+            time.sleep(delay)
+
+        attempt += 1
+        _count(endpoint, 'retries')
+
+
+def get(url, endpoint=None, timeout=10, **kwargs):
+    """GET through the shared session"""
+    return request('GET', url, endpoint=endpoint, timeout=timeout, **kwargs)
+
+
+def post(url, endpoint=None, timeout=30, **kwargs):
+    """POST through the shared session"""
+    return request('POST', url, endpoint=endpoint, timeout=timeout, **kwargs)
@@ -13,52 +13,10 @@ DATABASE_PATH = os.path.join(os.path.dirname(__file__), 'housing.db')
 
 def create_tables():
     """Create apartments and parking_spots tables if they don't exist"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
-    
-    # Create apartments table
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS apartments (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        building_id INTEGER NOT NULL,
-        unit_number TEXT NOT NULL,
-        floor_number INTEGER,
-        unit_type TEXT DEFAULT 'شقة',
-        is_occupied INTEGER DEFAULT 0,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY (building_id) REFERENCES buildings (id),
-        UNIQUE(building_id, unit_number)
-    )
-    ''')
-    
-    # Create parking_spots table with special_needs field
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS parking_spots (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        spot_number TEXT UNIQUE NOT NULL,
-        parking_area TEXT NOT NULL,
-        building_id INTEGER,
-        apartment_id INTEGER,
-        is_occupied INTEGER DEFAULT 0,
-        special_needs INTEGER DEFAULT 0,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY (building_id) REFERENCES buildings (id),
-        FOREIGN KEY (apartment_id) REFERENCES apartments (id)
-    )
-    ''')
-    
-    # Add special_needs column if it doesn't exist (for existing databases)
-    try:
-        cursor.execute('ALTER TABLE parking_spots ADD COLUMN special_needs INTEGER DEFAULT 0')
-        print("✅ Added special_needs column to parking_spots table")
-    except sqlite3.OperationalError:
-        # Column already exists
-        pass
-    
-    conn.commit()
-    conn.close()
+    # The schema, including the parking_spots.special_needs column, is owned by
+    # the versioned migrations run from database.init_database()
+    import database
+    database.init_database()
     print("✅ Tables created successfully")
 
 def get_building_id(cursor, building_number):
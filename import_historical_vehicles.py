@@ -7,6 +7,7 @@ This module imports historical vehicle and violation data from Excel files.
 
 import pandas as pd
 import database
+import data_cache
 from datetime import datetime
 import os
 
@@ -185,6 +186,7 @@ def import_vehicles_from_excel(file_path: str, merge_mode: bool = True) -> dict:
         
         conn.commit()
         conn.close()
+        data_cache.mark_tables_changed('residents', 'vehicles')
         
         return stats
         
@@ -309,6 +311,7 @@ def import_violations_from_excel(file_path: str) -> dict:
         
         conn.commit()
         conn.close()
+        data_cache.mark_tables_changed('traffic_violations')
         
         return stats
         
@@ -0,0 +1,120 @@
+"""
+Lazy module loading and import timing for Faculty Housing Management System
+التحميل المؤجل للوحدات وقياس زمن الاستيراد
+
+Heavy subsystems (Excel/PDF/Word exports, image analysis, pandas imports) are
+only needed by a handful of endpoints. Wrapping them in a LazyModule keeps
+them out of every worker until the first request that actually uses them.
+"""
+
+import importlib
+import sys
+import threading
+import time
+
+# module name -> {'seconds': float, 'lazy': bool, 'loaded_at': float}
+_import_timings = {}
+_timings_lock = threading.Lock()
+_process_started = time.time()
+
+
+def _record(name, seconds, lazy):
+    with _timings_lock:
+        _import_timings[name] = {
+            'seconds': seconds,
+            'lazy': lazy,
+            'loaded_at': time.time()
+        }
+
+
+def timed_import(name):
+    """
+    Import a module now and record how long it took
+    استيراد وحدة فوراً مع تسجيل زمن الاستيراد
+    """
+    already_loaded = name in sys.modules
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    if not already_loaded:
+        _record(name, time.perf_counter() - start, lazy=False)
+    return module
+
+
+class LazyModule:
+    """
+    Proxy that imports the real module on first attribute access
+    وكيل يستورد الوحدة الفعلية عند أول استخدام
+    """
+
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+        self.__dict__['_lock'] = threading.Lock()
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is not None:
+            return module
+
+        with self.__dict__['_lock']:
+            module = self.__dict__['_module']
+            if module is None:
+                name = self.__dict__['_name']
+                already_loaded = name in sys.modules
+                start = time.perf_counter()
+                module = importlib.import_module(name)
+                if not already_loaded:
+                    _record(name, time.perf_counter() - start, lazy=True)
+                self.__dict__['_module'] = module
+        return module
+
+    @property
+    def is_loaded(self):
+        return self.__dict__['_module'] is not None
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __repr__(self):
+        state = 'loaded' if self.is_loaded else 'not loaded'
+        return f"<LazyModule '{self.__dict__['_name']}' ({state})>"
+
+
+def lazy_import(name):
+    """Return a LazyModule proxy for the given module name"""
+    return LazyModule(name)
+
+
+def get_import_report():
+    """
+    Get import timings recorded so far, slowest first
+    الحصول على تقرير أزمنة الاستيراد
+    """
+    with _timings_lock:
+        timings = sorted(_import_timings.items(), key=lambda item: item[1]['seconds'], reverse=True)
+
+    return {
+        'uptime_seconds': round(time.time() - _process_started, 3),
+        'eager_seconds': round(sum(t['seconds'] for _, t in timings if not t['lazy']), 4),
+        'lazy_seconds': round(sum(t['seconds'] for _, t in timings if t['lazy']), 4),
+        'modules': [
+            {
+                'module': name,
+                'seconds': round(t['seconds'], 4),
+                'lazy': t['lazy']
+            }
+            for name, t in timings
+        ]
+    }
+
+
+def print_import_report(title="Startup import times"):
+    """Print the import timing report"""
+    report = get_import_report()
+    print(f"⏱️  {title} (eager: {report['eager_seconds']:.3f}s, lazy so far: {report['lazy_seconds']:.3f}s)")
+    for entry in report['modules']:
+        kind = 'lazy ' if entry['lazy'] else 'eager'
+        print(f"   {kind} {entry['module']:<32} {entry['seconds'] * 1000:8.1f} ms")
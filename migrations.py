@@ -0,0 +1,233 @@
+"""
+Versioned schema migrations for Faculty Housing Management System
+ترحيلات مخطط قاعدة البيانات ذات الإصدارات
+
+Each migration runs once per database and is recorded in the
+schema_migrations table. Migrations must work on both SQLite and PostgreSQL.
+"""
+
+import database_adapter
+import rollups
+import table_versions
+import trends
+
+SCHEMA_MIGRATIONS_DDL = '''
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
+'''
+
+# (name, table, columns, WHERE clause for partial indexes)
+# Columns already covered by a UNIQUE constraint (usernames, session tokens,
+# plate and sticker numbers, ...) get an index from the constraint itself.
+CORE_INDEXES = [
+    # Residents: building filters and the active/inactive split
+    ('idx_residents_building_id', 'residents', 'building_id, is_active', None),
+    ('idx_residents_is_active', 'residents', 'is_active', None),
+
+    # Vehicles: owner joins and the active-vehicle listing
+    ('idx_vehicles_owner_id', 'vehicles', 'owner_id', None),
+    ('idx_vehicles_active', 'vehicles', 'plate_number', 'is_active = 1'),
+
+    # Stickers
+    ('idx_stickers_resident_id', 'stickers', 'resident_id', None),
+    ('idx_stickers_plate_number', 'stickers', 'plate_number', None),
+    ('idx_stickers_status', 'stickers', 'status', None),
+
+    # Traffic violations: per-vehicle history ordered by date, status counts,
+    # and open violations grouped by vehicle for repeat offenders
+    ('idx_violations_vehicle_date', 'traffic_violations', 'vehicle_id, violation_date', None),
+    ('idx_violations_status', 'traffic_violations', 'status', None),
+    ('idx_violations_date', 'traffic_violations', 'violation_date', None),
+    ('idx_violations_open_vehicle', 'traffic_violations', 'vehicle_id',
+     "status IN ('pending', 'open', 'مفتوحة', 'معلقة')"),
+
+    # Complaints
+    ('idx_complaints_resident_id', 'complaints', 'resident_id', None),
+    ('idx_complaints_status', 'complaints', 'status', None),
+    ('idx_complaints_created_at', 'complaints', 'created_at', None),
+
+    # Visitors
+    ('idx_visitors_visiting_resident_id', 'visitors', 'visiting_resident_id', None),
+    ('idx_visitors_visit_date', 'visitors', 'visit_date', None),
+
+    # Security incidents
+    ('idx_incidents_incident_date', 'security_incidents', 'incident_date', None),
+    ('idx_incidents_status', 'security_incidents', 'status', None),
+
+    # Apartments and parking
+    ('idx_apartments_is_occupied', 'apartments', 'is_occupied', None),
+    ('idx_parking_building_id', 'parking_spots', 'building_id, spot_number', None),
+    ('idx_parking_is_occupied', 'parking_spots', 'is_occupied', None),
+
+    # Sessions: per-user lookups and the expired-session reaper
+    ('idx_sessions_user_id', 'sessions', 'user_id', None),
+    ('idx_sessions_expires_at', 'sessions', 'expires_at', None),
+
+    # Audit log
+    ('idx_audit_user_id', 'audit_log', 'user_id', None),
+    ('idx_audit_created_at', 'audit_log', 'created_at', None),
+
+    # Plate recognition history, newest first
+    ('idx_plate_recognition_recognized_at', 'plate_recognition_log', 'recognized_at', None),
+    ('idx_plate_recognition_user_id', 'plate_recognition_log', 'user_id', None),
+    ('idx_plate_recognition_plate', 'plate_recognition_log', 'plate_number', None),
+
+    # Car images: latest thumbnail per analysed vehicle
+    ('idx_car_analysis_vehicle_id', 'car_analysis', 'vehicle_id, car_image_id', None),
+    ('idx_car_analysis_image_id', 'car_analysis', 'car_image_id', None),
+    ('idx_car_images_uploaded_at', 'car_images', 'uploaded_at', None),
+
+    # Revoked signed tokens are pruned by expiry
+    ('idx_revoked_tokens_expires_at', 'revoked_tokens', 'expires_at', None),
+]
+
+
+def create_index_sql(name, table, columns, where=None):
+    """Build a portable CREATE INDEX statement"""
+    sql = f'CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})'
+    if where:
+        sql += f' WHERE {where}'
+    return sql
+
+
+def _migration_0001_core_indexes(cursor):
+    """Indexes for the lookups, joins and sorts used by the API"""
+    for name, table, columns, where in CORE_INDEXES:
+        cursor.execute(create_index_sql(name, table, columns, where))
+
+
+def column_exists(cursor, table, column):
+    """Check whether a column exists on either backend"""
+    if database_adapter.get_dialect().type == 'postgresql':
+        cursor.execute(
+            'SELECT 1 FROM information_schema.columns WHERE table_name = %s AND column_name = %s',
+            (table, column)
+        )
+        return cursor.fetchone() is not None
+
+    cursor.execute(f'PRAGMA table_info({table})')
+    return any(row['name'] == column for row in cursor.fetchall())
+
+
+def _migration_0002_parking_special_needs(cursor):
+    """Special-needs flag on parking spots (previously patched in by the import scripts)"""
+    if not column_exists(cursor, 'parking_spots', 'special_needs'):
+        cursor.execute('ALTER TABLE parking_spots ADD COLUMN special_needs INTEGER DEFAULT 0')
+
+
+def _migration_0003_rollup_counts(cursor):
+    """Trigger-maintained counters read by the dashboards and reports"""
+    rollups.install_rollups(cursor, database_adapter.get_dialect().type)
+
+
+TREND_INDEXES = [
+    # Monthly range counts for the report trend charts
+    ('idx_complaints_resolved_at', 'complaints', 'resolved_at', None),
+    ('idx_residents_move_in_date', 'residents', 'move_in_date', None),
+]
+
+
+def _migration_0004_monthly_buckets(cursor):
+    """Stored monthly trend buckets and the indexes their range queries use"""
+    cursor.execute(trends.MONTHLY_BUCKETS_DDL)
+    for name, table, columns, where in TREND_INDEXES:
+        cursor.execute(create_index_sql(name, table, columns, where))
+
+
+def _migration_0005_table_versions(cursor):
+    """Trigger-maintained change versions used for ETags on read-mostly endpoints"""
+    table_versions.install_table_versions(cursor, database_adapter.get_dialect().type)
+
+
+def _migration_0006_user_token_version(cursor):
+    """Per-user token version; bumping it invalidates the user's signed session tokens"""
+    if not column_exists(cursor, 'users', 'token_version'):
+        cursor.execute('ALTER TABLE users ADD COLUMN token_version INTEGER DEFAULT 0')
+
+
+def _migration_0007_trend_bucket_triggers(cursor):
+    """Triggers dropping the stored trend buckets of the months a row write touches"""
+    trends.install_bucket_triggers(cursor, database_adapter.get_dialect().type)
+
+
+# (version, name, function) - append only, never renumber
+MIGRATIONS = [
+    (1, 'core_indexes', _migration_0001_core_indexes),
+    (2, 'parking_special_needs', _migration_0002_parking_special_needs),
+    (3, 'rollup_counts', _migration_0003_rollup_counts),
+    (4, 'monthly_buckets', _migration_0004_monthly_buckets),
+    (5, 'table_versions', _migration_0005_table_versions),
+    (6, 'user_token_version', _migration_0006_user_token_version),
+    (7, 'trend_bucket_triggers', _migration_0007_trend_bucket_triggers),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(cursor):
+    """
+    Get the highest applied migration version (0 if none)
+    الحصول على آخر إصدار مطبق من المخطط
+    """
+    cursor.execute(SCHEMA_MIGRATIONS_DDL)
+    cursor.execute('SELECT MAX(version) AS version FROM schema_migrations')
+    return cursor.fetchone()['version'] or 0
+
+
+def is_up_to_date(conn):
+    """
+    Check with a single query whether every migration has been applied
+    التحقق باستعلام واحد من تطبيق جميع الترحيلات
+
+    Never runs DDL, so it is cheap enough to call on every process start.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute('SELECT MAX(version) AS version FROM schema_migrations')
+        version = cursor.fetchone()['version'] or 0
+    except Exception:
+        # No schema_migrations table yet: a fresh database
+        conn.rollback()
+        return False
+    return version >= LATEST_VERSION
+
+
+def run_migrations(conn, verbose=True):
+    """
+    Apply every pending migration, each in its own transaction
+    تطبيق جميع الترحيلات المعلقة
+
+    Returns the list of versions applied by this call.
+    """
+    cursor = conn.cursor()
+    current = get_schema_version(cursor)
+    conn.commit()
+
+    applied = []
+    for version, name, migration in MIGRATIONS:
+        if version <= current:
+            continue
+
+        try:
+            migration(cursor)
+            cursor.execute(
+                database_adapter.adapt_placeholders('INSERT INTO schema_migrations (version, name) VALUES (?, ?)'),
+                (version, name)
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            # Another process may have applied the same migration concurrently
+            if get_schema_version(cursor) >= version:
+                conn.commit()
+                continue
+            raise
+
+        applied.append(version)
+        if verbose:
+            print(f"✅ Applied migration {version:04d}_{name}")
+
+    return applied
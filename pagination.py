@@ -0,0 +1,203 @@
+"""
+Keyset pagination and filtering for list endpoints
+ترقيم الصفحات والتصفية لنقاط نهاية القوائم
+
+A ListQuery describes a list endpoint once: its SELECT, the sort orders it
+supports, the filters it accepts and the columns free-text search looks at.
+fetch_page() turns the request arguments into a single SQL query.
+
+Pages are addressed with an opaque cursor holding the sort key of the last
+row returned, so fetching page N costs the same as fetching page 1 (no
+OFFSET scans). Requests without ``limit`` or ``cursor`` (or with
+``limit=all``) get every matching row, as the endpoints always did.
+"""
+
+import base64
+import json
+import os
+
+import database_adapter
+
+DEFAULT_PAGE_SIZE = int(os.environ.get('API_PAGE_SIZE', 100))
+MAX_PAGE_SIZE = int(os.environ.get('API_MAX_PAGE_SIZE', 500))
+
+
+class PaginationError(ValueError):
+    """Invalid paging, sorting or filter arguments"""
+
+    def __init__(self, message, message_ar):
+        super().__init__(message)
+        self.message_ar = message_ar
+
+
+class ListQuery:
+    """
+    Declarative description of a paginated list query
+    وصف استعلام قائمة قابلة للترقيم
+
+    columns: the SELECT list; sort keys are appended after it, so positional
+             row access keeps working
+    source: FROM clause with its joins, without WHERE/ORDER BY
+    where: optional condition every row must satisfy
+    group_by: optional GROUP BY list for aggregate columns; it should start
+              with the sort keys so pages can still be read in index order
+    id_column: unique column used as the final tie-breaker (e.g. 'r.id')
+    sorts: sort name -> list of SQL expressions (NULL-free, e.g. COALESCE'd)
+    default_sort: sort used when the request does not choose one
+    filters: query parameter -> (SQL condition, value type); a condition
+             with several ? takes a tuple from its value type
+    search_columns: columns matched with LIKE by the ``q`` parameter; the
+                    search text is matched literally (% and _ are escaped)
+    """
+
+    def __init__(self, columns, source, id_column, sorts, default_sort, filters=None, search_columns=(),
+                 where=None, group_by=None):
+        self.columns = columns
+        self.source = source
+        self.where = where
+        self.group_by = group_by
+        self.id_column = id_column
+        self.sorts = sorts
+        self.default_sort = default_sort
+        self.filters = filters or {}
+        self.search_columns = search_columns
+
+    def build(self, args, default_sort=None):
+        """Build (sql, params, key_count, limit) from request arguments"""
+        limit = parse_limit(args)
+
+        sort = args.get('sort') or default_sort or self.default_sort
+        if sort not in self.sorts:
+            raise PaginationError(
+                f"Invalid sort '{sort}'. Allowed: {', '.join(sorted(self.sorts))}",
+                'قيمة الترتيب غير صالحة'
+            )
+        order = (args.get('order') or 'asc').lower()
+        if order not in ('asc', 'desc'):
+            raise PaginationError("order must be 'asc' or 'desc'", "قيمة order يجب أن تكون asc أو desc")
+
+        keys = list(self.sorts[sort]) + [self.id_column]
+        key_columns = ', '.join(f'{expr} AS _k{index}' for index, expr in enumerate(keys))
+        sql = f'SELECT {self.columns}, {key_columns} FROM {self.source}'
+
+        conditions = [self.where] if self.where else []
+        params = []
+
+        for name, (condition, value_type) in self.filters.items():
+            raw = args.get(name)
+            if raw in (None, ''):
+                continue
+            try:
+                value = value_type(raw)
+            except (TypeError, ValueError):
+                raise PaginationError(f"Invalid value for '{name}'", f"قيمة غير صالحة للمعامل '{name}'")
+            conditions.append(condition)
+            params.extend(value if isinstance(value, tuple) else (value,))
+
+        search = (args.get('q') or '').strip()
+        if search and self.search_columns:
+            conditions.append('(' + ' OR '.join(f"{column} LIKE ? ESCAPE '\\'" for column in self.search_columns) + ')')
+            params.extend([f'%{escape_like(search)}%'] * len(self.search_columns))
+
+        cursor_token = args.get('cursor')
+        if cursor_token:
+            values = decode_cursor(cursor_token, len(keys))
+            comparison = '>' if order == 'asc' else '<'
+            conditions.append(f"({', '.join(keys)}) {comparison} ({', '.join(['?'] * len(keys))})")
+            params.extend(values)
+
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        if self.group_by:
+            sql += ' GROUP BY ' + self.group_by
+
+        direction = 'ASC' if order == 'asc' else 'DESC'
+        sql += ' ORDER BY ' + ', '.join(f'{expr} {direction}' for expr in keys)
+
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit + 1)
+
+        return database_adapter.adapt_placeholders(sql), params, len(keys), limit
+
+    def fetch_page(self, cursor, args, default_sort=None):
+        """
+        Run the list query for one page
+        تنفيذ استعلام القائمة لصفحة واحدة
+
+        Returns (rows, page) where page is None in "all" mode, otherwise a
+        dict with limit, has_more and next_cursor for the response.
+        """
+        sql, params, key_count, limit = self.build(args, default_sort)
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+        if limit is None:
+            return rows, None
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = None
+        if has_more:
+            last = rows[-1]
+            next_cursor = encode_cursor([last[f'_k{index}'] for index in range(key_count)])
+
+        return rows, {
+            'limit': limit,
+            'has_more': has_more,
+            'next_cursor': next_cursor
+        }
+
+
+def escape_like(value):
+    """Escape LIKE wildcards so user text is matched literally (use with ESCAPE '\\')"""
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def parse_limit(args):
+    """Page size from the request, or None for "all" mode"""
+    raw = args.get('limit')
+    if raw is None:
+        return DEFAULT_PAGE_SIZE if args.get('cursor') else None
+    if raw == 'all':
+        return None
+    try:
+        limit = int(raw)
+    except ValueError:
+        raise PaginationError("limit must be a number or 'all'", "يجب أن يكون limit رقماً أو all")
+    if limit < 1:
+        raise PaginationError('limit must be at least 1', 'يجب ألا يقل limit عن 1')
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def encode_cursor(values):
+    """Encode the sort key of the last row as an opaque cursor"""
+    payload = json.dumps(values, default=str, separators=(',', ':'), ensure_ascii=False)
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, key_count):
+    """Decode a cursor produced by encode_cursor()"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+    except (ValueError, UnicodeError):
+        values = None
+    if (not isinstance(values, list) or len(values) != key_count
+            or not all(value is None or isinstance(value, (str, int, float)) for value in values)):
+        raise PaginationError('Invalid cursor', 'مؤشر الصفحة غير صالح')
+    return values
+
+
+def row_to_dict(row):
+    """Convert a result row to a dict without the internal sort-key columns"""
+    return {key: value for key, value in dict(row).items() if not key.startswith('_k')}
+
+
+def page_response(data, page, **extra):
+    """Response body with the legacy keys plus pagination info when paging"""
+    body = {'success': True, 'data': data}
+    body.update(extra)
+    if page is not None:
+        body['pagination'] = page
+    return body
@@ -14,6 +14,8 @@ import base64
 from typing import Dict, List, Optional
 from datetime import datetime
 import database
+import http_client
+import data_cache
 
 # ParkPow API Configuration
 PARKPOW_API_TOKEN = os.environ.get('PARKPOW_API_TOKEN', '')
@@ -54,8 +56,9 @@ def get_api_status() -> Dict:
         }
         
         # Test API connection
-        response = requests.get(
+        response = http_client.get(
             f'{PARKPOW_API_URL}/status/',
+            endpoint='parkpow.status',
             headers=headers,
             timeout=10
         )
@@ -127,8 +130,9 @@ def recognize_plate(image_data: str, camera_id: Optional[str] = None) -> Dict:
         if camera_id:
             payload['camera_id'] = camera_id
         
-        response = requests.post(
+        response = http_client.post(
             f'{PARKPOW_API_URL}/recognize/',
+            endpoint='parkpow.recognize',
             headers=headers,
             json=payload,
             timeout=30
@@ -245,6 +249,7 @@ def record_violation(plate_number: str, violation_data: Dict, user_id: int) -> D
         violation_id = cursor.lastrowid
         conn.commit()
         conn.close()
+        data_cache.mark_tables_changed('traffic_violations')
         
         return {
             'success': True,
@@ -9,13 +9,31 @@ for automatic license plate recognition from images.
 import os
 import requests
 import base64
-from typing import Dict, List, Optional, Tuple
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 from datetime import datetime
 import database
+import database_adapter
+import http_client
+import recognition_cache
+import recognition_governor
 
 # API Configuration
 API_TOKEN = os.environ.get('PLATE_RECOGNIZER_API_TOKEN', '')
 API_URL = os.environ.get('PLATE_RECOGNIZER_API_URL', 'https://api.platerecognizer.com/v1/plate-reader/')
+STATS_URL = os.environ.get('PLATE_RECOGNIZER_STATS_URL', 'https://api.platerecognizer.com/v1/statistics/')
+
+# Batch recognition: API calls in flight at once per process (shared by all batches)
+# and images accepted per batch request
+BATCH_CONCURRENCY = int(os.environ.get('PLATE_RECOGNIZER_BATCH_CONCURRENCY', 4))
+BATCH_MAX_IMAGES = int(os.environ.get('PLATE_RECOGNIZER_BATCH_MAX_IMAGES', 100))
+
+# Plates per IN (...) lookup, well below SQLite's bound-parameter limit
+PLATE_LOOKUP_CHUNK_SIZE = 500
+
+_batch_state = {'executor': None, 'pid': None}
+_batch_lock = threading.Lock()
 
 
 def is_configured() -> bool:
@@ -77,6 +95,30 @@ def recognize_plate_from_file(image_path: str, regions: Optional[List[str]] = No
         }
 
 
+def parse_api_results(api_response: Dict) -> List[Dict]:
+    """
+    Convert plate-reader API results to the result schema used by every recognition engine
+    تحويل نتائج واجهة التمييز إلى الصيغة الموحدة
+    
+    Args:
+        api_response: Decoded plate-reader response ({'results': [...]})
+    
+    Returns:
+        List of dicts with plate, confidence, region, vehicle_type, box and candidates
+    """
+    results = []
+    for result in api_response.get('results') or []:
+        results.append({
+            'plate': result.get('plate', '').upper(),
+            'confidence': result.get('score', 0.0),
+            'region': (result.get('region') or {}).get('code', ''),
+            'vehicle_type': (result.get('vehicle') or {}).get('type', ''),
+            'box': result.get('box', {}),
+            'candidates': result.get('candidates', [])
+        })
+    return results
+
+
 def recognize_plate_from_bytes(image_bytes: bytes, regions: Optional[List[str]] = None) -> Dict:
     """
     Recognize license plate from image bytes
@@ -87,7 +129,8 @@ def recognize_plate_from_bytes(image_bytes: bytes, regions: Optional[List[str]]
         regions: Optional list of region codes (e.g., ['sa'] for Saudi Arabia)
     
     Returns:
-        Dict containing recognition results
+        Dict containing recognition results; cache_hit tells whether they
+        came from the recognition cache instead of a (paid) API call
     """
     if not is_configured():
         return {
@@ -96,6 +139,32 @@ def recognize_plate_from_bytes(image_bytes: bytes, regions: Optional[List[str]]
             'error_ar': 'خدمة Plate Recognizer غير مفعلة'
         }
     
+    # Identical image and regions: reuse the stored result
+    cache_key = recognition_cache.cache_key(image_bytes, regions)
+    cached = recognition_cache.get(cache_key)
+    if cached is not None:
+        cached['cache_hit'] = True
+        return cached
+    
+    # Stay within the plan's monthly credits and calls per second
+    reservation = recognition_governor.reserve_call()
+    if reservation['refresh_statistics']:
+        _refresh_statistics_in_background()
+    
+    if reservation['reason'] == 'credits':
+        return {
+            'success': False,
+            'error': 'The monthly Plate Recognizer credits are used up.',
+            'error_ar': 'تم استهلاك رصيد Plate Recognizer الشهري.'
+        }
+    
+    if not reservation['allowed']:
+        return {
+            'success': False,
+            'error': 'Plate recognition is busy. Please try again in a few seconds.',
+            'error_ar': 'خدمة تمييز اللوحات مشغولة. يرجى المحاولة بعد بضع ثوانٍ.'
+        }
+    
     try:
         headers = {
             'Authorization': f'Token {API_TOKEN}'
@@ -109,37 +178,31 @@ def recognize_plate_from_bytes(image_bytes: bytes, regions: Optional[List[str]]
         if regions:
             data['regions'] = regions
         
-        response = requests.post(
+        response = http_client.post(
             API_URL,
+            endpoint='plate_recognizer.plate_reader',
             headers=headers,
             files=files,
             data=data,
             timeout=30
         )
         
-        if response.status_code == 200:
+        # The reserved call stays counted only if it was billed
+        if response.status_code not in (200, 201):
+            recognition_governor.release_call(exhausted=response.status_code == 402)
+        
+        if response.status_code in (200, 201):  # plate-reader answers 201 Created
             api_response = response.json()
             
-            # Parse results
-            results = []
-            if 'results' in api_response:
-                for result in api_response['results']:
-                    plate_data = {
-                        'plate': result.get('plate', '').upper(),
-                        'confidence': result.get('score', 0.0),
-                        'region': result.get('region', {}).get('code', ''),
-                        'vehicle_type': result.get('vehicle', {}).get('type', ''),
-                        'box': result.get('box', {}),
-                        'candidates': result.get('candidates', [])
-                    }
-                    results.append(plate_data)
-            
-            return {
+            result = {
                 'success': True,
-                'results': results,
+                'results': parse_api_results(api_response),
                 'processing_time': api_response.get('processing_time', 0),
                 'timestamp': datetime.now().isoformat()
             }
+            recognition_cache.put(cache_key, result)
+            result['cache_hit'] = False
+            return result
         
         elif response.status_code == 401:
             return {
@@ -169,6 +232,15 @@ def recognize_plate_from_bytes(image_bytes: bytes, regions: Optional[List[str]]
             'error_ar': 'انتهى وقت الطلب. يرجى المحاولة مرة أخرى.'
         }
     
+    except http_client.CircuitOpenError:
+        # Nothing was sent
+        recognition_governor.release_call()
+        return {
+            'success': False,
+            'error': 'Plate Recognizer is temporarily unavailable after repeated failures. Please try again shortly.',
+            'error_ar': 'خدمة Plate Recognizer غير متاحة مؤقتاً بعد عدة أخطاء. يرجى المحاولة بعد قليل.'
+        }
+    
     except requests.exceptions.ConnectionError:
         return {
             'success': False,
@@ -214,6 +286,84 @@ def recognize_plate_from_base64(base64_image: str, regions: Optional[List[str]]
         }
 
 
+def _batch_executor():
+    with _batch_lock:
+        # A pool created in another process (before a fork) has no threads here
+        if _batch_state['executor'] is None or _batch_state['pid'] != os.getpid():
+            _batch_state['executor'] = ThreadPoolExecutor(max_workers=BATCH_CONCURRENCY,
+                                                          thread_name_prefix='plate-batch')
+            _batch_state['pid'] = os.getpid()
+        return _batch_state['executor']
+
+
+def recognize_plates_batch(images: List[bytes], regions: Optional[List[str]] = None,
+                           recognize=None) -> Iterator[Tuple[int, Dict]]:
+    """
+    Recognize plates in several images concurrently
+    تمييز اللوحات في عدة صور بالتوازي
+    
+    Images are sent through a per-process pool of BATCH_CONCURRENCY threads,
+    so concurrent batches share the same limit on calls in flight (429
+    responses are retried by http_client after Retry-After). Images still
+    queued are cancelled if the caller stops iterating, e.g. when the
+    client disconnects.
+    
+    Args:
+        images: Image data, one bytes object per image
+        regions: Optional list of region codes
+        recognize: fn(image_bytes, regions) -> result, e.g. a recognition
+                   engine's recognize (default recognize_plate_from_bytes)
+    
+    Yields:
+        (index in images, recognition result) as each image finishes
+    """
+    recognize = recognize or recognize_plate_from_bytes
+    executor = _batch_executor()
+    futures = {
+        executor.submit(recognize, image_bytes, regions): index
+        for index, image_bytes in enumerate(images)
+    }
+    try:
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def log_plate_recognitions(entries: Iterable[Tuple]) -> bool:
+    """
+    Log several plate recognition events with one statement
+    تسجيل عدة أحداث تمييز لوحات دفعة واحدة
+    
+    Args:
+        entries: (user_id, plate_number, confidence, vehicle_id, image_path) tuples
+    
+    Returns:
+        bool: True if logging was successful (or there was nothing to log), False otherwise
+    """
+    recognized_at = datetime.now()
+    rows = [tuple(entry) + (recognized_at,) for entry in entries]
+    if not rows:
+        return True
+    
+    try:
+        with database.pooled_connection() as conn:
+            cursor = conn.cursor()
+
+            cursor.executemany(database_adapter.adapt_placeholders('''
+                INSERT INTO plate_recognition_log 
+                (user_id, plate_number, confidence, vehicle_id, image_path, recognized_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            '''), rows)
+        
+        return True
+    
+    except Exception as e:
+        print(f"Error logging plate recognition: {str(e)}")
+        return False
+
+
 def log_plate_recognition(user_id: int, plate_number: str, confidence: float, 
                          vehicle_id: Optional[int] = None, image_path: Optional[str] = None) -> bool:
     """
@@ -230,24 +380,46 @@ def log_plate_recognition(user_id: int, plate_number: str, confidence: float,
     Returns:
         bool: True if logging was successful, False otherwise
     """
+    return log_plate_recognitions([(user_id, plate_number, confidence, vehicle_id, image_path)])
+
+
+def find_vehicles_by_plates(plate_numbers: Iterable[str]) -> Dict[str, Dict]:
+    """
+    Find the active vehicles with any of the given plate numbers
+    البحث عن المركبات بعدة أرقام لوحات في استعلام واحد
+    
+    Args:
+        plate_numbers: Plate numbers to search for (case-insensitive)
+    
+    Returns:
+        Dict mapping each found (upper-case) plate number to its vehicle information
+    """
+    plates = sorted({plate.upper() for plate in plate_numbers if plate})
+    vehicles = {}
+    if not plates:
+        return vehicles
+    
     try:
-        conn = database.get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO plate_recognition_log 
-            (user_id, plate_number, confidence, vehicle_id, image_path, recognized_at)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (user_id, plate_number, confidence, vehicle_id, image_path, datetime.now()))
-        
-        conn.commit()
-        conn.close()
+        with database.pooled_connection() as conn:
+            cursor = conn.cursor()
+
+            for start in range(0, len(plates), PLATE_LOOKUP_CHUNK_SIZE):
+                chunk = plates[start:start + PLATE_LOOKUP_CHUNK_SIZE]
+                cursor.execute(database_adapter.adapt_placeholders(f'''
+                    SELECT v.*, r.name as owner_name, r.phone, r.unit_number
+                    FROM vehicles v
+                    LEFT JOIN residents r ON v.owner_id = r.id
+                    WHERE v.plate_number IN ({', '.join('?' * len(chunk))}) AND v.is_active = 1
+                '''), chunk)
+
+                for row in cursor.fetchall():
+                    vehicles[row['plate_number']] = dict(row)
         
-        return True
+        return vehicles
     
     except Exception as e:
-        print(f"Error logging plate recognition: {str(e)}")
-        return False
+        print(f"Error finding vehicle by plate: {str(e)}")
+        return {}
 
 
 def find_vehicle_by_plate(plate_number: str) -> Optional[Dict]:
@@ -261,28 +433,52 @@ def find_vehicle_by_plate(plate_number: str) -> Optional[Dict]:
     Returns:
         Dict containing vehicle information if found, None otherwise
     """
+    return find_vehicles_by_plates([plate_number]).get(plate_number.upper())
+
+
+def refresh_statistics() -> bool:
+    """
+    Load this month's usage from the statistics endpoint into the credit tracker
+    تحديث بيانات الاستخدام من واجهة الإحصائيات
+    
+    Returns:
+        bool: True if the statistics were loaded, False otherwise
+    """
     try:
-        conn = database.get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT v.*, r.name as owner_name, r.phone, r.unit_number
-            FROM vehicles v
-            LEFT JOIN residents r ON v.owner_id = r.id
-            WHERE v.plate_number = ? AND v.is_active = 1
-        ''', (plate_number.upper(),))
+        headers = {
+            'Authorization': f'Token {API_TOKEN}'
+        }
         
-        row = cursor.fetchone()
-        conn.close()
+        response = http_client.get(
+            STATS_URL,
+            endpoint='plate_recognizer.statistics',
+            headers=headers,
+            timeout=10
+        )
         
-        if row:
-            return dict(row)
+        if response.status_code == 200:
+            stats = response.json()
+            recognition_governor.record_statistics(stats.get('usage') or {}, stats.get('total_calls'))
+            return True
         
-        return None
+        recognition_governor.record_statistics_error(
+            f'API connection failed: {response.status_code}',
+            f'فشل الاتصال: {response.status_code}'
+        )
     
     except Exception as e:
-        print(f"Error finding vehicle by plate: {str(e)}")
-        return None
+        recognition_governor.record_statistics_error(
+            f'Connection error: {str(e)}',
+            f'خطأ في الاتصال: {str(e)}'
+        )
+    
+    return False
+
+
+def _refresh_statistics_in_background():
+    # Keeps the credit count reconciled even if nobody opens the status page;
+    # the caller has claimed the refresh (see recognition_governor.reserve_call)
+    threading.Thread(target=refresh_statistics, name='plate-statistics', daemon=True).start()
 
 
 def get_api_status() -> Dict:
@@ -290,6 +486,10 @@ def get_api_status() -> Dict:
     Check the status of the Plate Recognizer API connection
     التحقق من حالة الاتصال بخدمة Plate Recognizer
     
+    The statistics endpoint is called at most once per
+    RECOGNITION_STATS_REFRESH_SECONDS (shared by all workers); in between
+    the locally tracked usage is returned.
+    
     Returns:
         Dict containing status information
     """
@@ -300,40 +500,25 @@ def get_api_status() -> Dict:
             'message_ar': 'لم يتم تكوين رمز API'
         }
     
-    try:
-        headers = {
-            'Authorization': f'Token {API_TOKEN}'
-        }
-        
-        # Use the statistics endpoint to check connection
-        response = requests.get(
-            'https://api.platerecognizer.com/v1/statistics/',
-            headers=headers,
-            timeout=10
-        )
-        
-        if response.status_code == 200:
-            stats = response.json()
-            return {
-                'configured': True,
-                'connected': True,
-                'message': 'API connection successful',
-                'message_ar': 'تم الاتصال بنجاح',
-                'usage': stats.get('usage', {}),
-                'total_calls': stats.get('total_calls', 0)
-            }
-        else:
-            return {
-                'configured': True,
-                'connected': False,
-                'message': f'API connection failed: {response.status_code}',
-                'message_ar': f'فشل الاتصال: {response.status_code}'
-            }
+    if recognition_governor.claim_stats_refresh():
+        refresh_statistics()
     
-    except Exception as e:
+    credits = recognition_governor.get_credits()
+    if credits['connected'] is False:
         return {
             'configured': True,
             'connected': False,
-            'message': f'Connection error: {str(e)}',
-            'message_ar': f'خطأ في الاتصال: {str(e)}'
+            'message': credits['error'],
+            'message_ar': credits['error_ar'],
+            'credits': credits
         }
+    
+    return {
+        'configured': True,
+        'connected': True,
+        'message': 'API connection successful',
+        'message_ar': 'تم الاتصال بنجاح',
+        'usage': dict(credits['usage'], calls=credits['used']),
+        'total_calls': credits['quota'],
+        'credits': credits
+    }
@@ -0,0 +1,152 @@
+"""
+Plate recognition result cache
+ذاكرة مؤقتة لنتائج تمييز اللوحات
+
+Every Plate Recognizer call costs an API credit and about a second, and
+operators often submit the same photo again. Successful results are stored
+in a local SQLite file keyed by the SHA-256 of the image bytes plus the
+requested regions, so an identical request is answered from disk. The cache
+is shared by all workers on the machine, expires entries after
+RECOGNITION_CACHE_TTL_SECONDS and keeps at most RECOGNITION_CACHE_MAX_ENTRIES
+(least recently used entries are evicted first).
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+RECOGNITION_CACHE_PATH = os.environ.get(
+    'RECOGNITION_CACHE_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'recognition_cache.db')
+)
+RECOGNITION_CACHE_TTL_SECONDS = int(os.environ.get('RECOGNITION_CACHE_TTL_SECONDS', 30 * 24 * 3600))
+RECOGNITION_CACHE_MAX_ENTRIES = int(os.environ.get('RECOGNITION_CACHE_MAX_ENTRIES', 5000))
+
+CACHE_DDL = '''
+CREATE TABLE IF NOT EXISTS recognition_cache (
+    cache_key TEXT PRIMARY KEY,
+    result TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used_at REAL NOT NULL
+)
+'''
+
+_state = {'initialized': False}
+_stats = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0, 'errors': 0}
+_lock = threading.Lock()
+
+
+def is_enabled() -> bool:
+    """The cache is disabled with RECOGNITION_CACHE_TTL_SECONDS=0"""
+    return RECOGNITION_CACHE_TTL_SECONDS > 0 and RECOGNITION_CACHE_MAX_ENTRIES > 0
+
+
+def cache_key(image_bytes, regions=None) -> str:
+    """Content address of a recognition request: image hash plus sorted regions"""
+    digest = hashlib.sha256(image_bytes)
+    digest.update(b'\0' + ','.join(sorted(regions or [])).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _connect():
+    conn = sqlite3.connect(RECOGNITION_CACHE_PATH, timeout=5)
+    if not _state['initialized']:
+        with _lock:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(CACHE_DDL)
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_recognition_cache_last_used '
+                         'ON recognition_cache(last_used_at)')
+            conn.commit()
+            _state['initialized'] = True
+    return conn
+
+
+def _count(name):
+    with _lock:
+        _stats[name] += 1
+
+
+def get(key):
+    """
+    Get a cached recognition result
+    الحصول على نتيجة تمييز مخزنة
+
+    Returns the result dict, or None on a miss (or any cache error).
+    """
+    if not is_enabled():
+        return None
+    try:
+        conn = _connect()
+        try:
+            now = time.time()
+            row = conn.execute(
+                'SELECT result FROM recognition_cache WHERE cache_key = ? AND created_at > ?',
+                (key, now - RECOGNITION_CACHE_TTL_SECONDS)
+            ).fetchone()
+            if row is None:
+                _count('misses')
+                return None
+            conn.execute('UPDATE recognition_cache SET last_used_at = ? WHERE cache_key = ?', (now, key))
+            conn.commit()
+        finally:
+            conn.close()
+        _count('hits')
+        return json.loads(row[0])
+    except (sqlite3.Error, ValueError) as e:
+        _count('errors')
+        print(f"⚠️  Recognition cache read error: {e}")
+        return None
+
+
+def put(key, result):
+    """
+    Store a recognition result, evicting expired and least recently used entries
+    تخزين نتيجة تمييز
+    """
+    if not is_enabled():
+        return
+    try:
+        conn = _connect()
+        try:
+            now = time.time()
+            conn.execute(
+                'INSERT OR REPLACE INTO recognition_cache (cache_key, result, created_at, last_used_at) '
+                'VALUES (?, ?, ?, ?)',
+                (key, json.dumps(result, ensure_ascii=False), now, now)
+            )
+            evicted = conn.execute('DELETE FROM recognition_cache WHERE created_at <= ?',
+                                   (now - RECOGNITION_CACHE_TTL_SECONDS,)).rowcount
+            evicted += conn.execute('''
+                DELETE FROM recognition_cache WHERE cache_key IN (
+                    SELECT cache_key FROM recognition_cache
+                    ORDER BY last_used_at DESC LIMIT -1 OFFSET ?
+                )
+            ''', (RECOGNITION_CACHE_MAX_ENTRIES,)).rowcount
+            conn.commit()
+        finally:
+            conn.close()
+        with _lock:
+            _stats['stores'] += 1
+            _stats['evictions'] += evicted
+    except (sqlite3.Error, TypeError, ValueError) as e:
+        _count('errors')
+        print(f"⚠️  Recognition cache write error: {e}")
+
+
+def clear():
+    """Remove every cached result"""
+    conn = _connect()
+    try:
+        conn.execute('DELETE FROM recognition_cache')
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def get_stats():
+    """Hit/miss counters for this process"""
+    with _lock:
+        return dict(_stats, enabled=is_enabled())
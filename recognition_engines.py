@@ -0,0 +1,245 @@
+"""
+Pluggable plate recognition engines
+محركات تمييز اللوحات القابلة للتبديل
+
+Each backend is wrapped in a RecognitionEngine with the same recognize()
+signature and the same result schema:
+
+    {'success': True, 'engine': name, 'results': [{'plate', 'confidence',
+     'region', 'vehicle_type', 'box', 'candidates'}, ...],
+     'processing_time': ms, 'timestamp': iso, 'cache_hit': bool}
+
+or {'success': False, 'engine': name, 'error': ..., 'error_ar': ...}.
+
+Engines:
+- plate_recognizer: Plate Recognizer cloud (default; results are cached)
+- parkpow: ParkPow cloud
+- easyocr: local EasyOCR, no network or credits needed
+- stub: deterministic offline results (see stub_recognition_server), for
+  benchmarks and load tests
+
+The engine is chosen with RECOGNITION_ENGINE, e.g. to switch to a local
+engine while the cloud service is slow.
+"""
+
+import base64
+import importlib.util
+import os
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import lazy_loader
+import parkpow_integration
+import plate_recognizer
+import stub_recognition_server
+
+# EasyOCR and PIL are only loaded if the easyocr engine is used
+car_image_analyzer = lazy_loader.lazy_import('car_image_analyzer')
+
+RECOGNITION_ENGINE = os.environ.get('RECOGNITION_ENGINE', 'plate_recognizer').strip().lower()
+
+# Plate text reported by car_image_analyzer when nothing was read
+UNKNOWN_PLATE = 'غير محدد'
+
+
+class RecognitionEngine(ABC):
+    """
+    Base class of recognition engines
+    الفئة الأساسية لمحركات التمييز
+
+    Subclasses set name and label and implement _recognize(), returning
+    results already in the common schema; recognize() adds the common fields.
+    An engine without _recognize() fails when it is instantiated.
+    """
+
+    name = None
+    label = None
+
+    def is_configured(self) -> bool:
+        """Whether the engine can be used (credentials set, libraries installed)"""
+        return True
+
+    def get_status(self) -> Dict:
+        """Configuration and connection status, as for /api/plate-recognizer/status"""
+        configured = self.is_configured()
+        return {
+            'configured': configured,
+            'connected': configured,
+            'message': f'{self.label} is available' if configured else f'{self.label} is not available',
+            'message_ar': f'محرك {self.label} متاح' if configured else f'محرك {self.label} غير متاح'
+        }
+
+    def recognize(self, image_bytes: bytes, regions: Optional[List[str]] = None) -> Dict:
+        """
+        Recognize license plates in an image
+        تمييز لوحات السيارات في صورة
+
+        Args:
+            image_bytes: Image data as bytes
+            regions: Optional list of region codes (e.g., ['sa'])
+
+        Returns:
+            Dict in the common result schema (see module docstring)
+        """
+        if not self.is_configured():
+            return {
+                'success': False,
+                'engine': self.name,
+                'error': f'Recognition engine {self.label} is not configured',
+                'error_ar': f'محرك التمييز {self.label} غير مفعل'
+            }
+
+        started = time.perf_counter()
+        try:
+            result = self._recognize(image_bytes, regions)
+        except Exception as e:
+            print(f"⚠️  Recognition engine {self.name} error: {e}")
+            result = {
+                'success': False,
+                'error': 'Error during recognition',
+                'error_ar': 'خطأ أثناء التمييز'
+            }
+
+        result['engine'] = self.name
+        if result.get('success'):
+            result.setdefault('processing_time', round((time.perf_counter() - started) * 1000, 1))
+            result.setdefault('timestamp', datetime.now().isoformat())
+            result.setdefault('cache_hit', False)
+        return result
+
+    def recognize_base64(self, base64_image: str, regions: Optional[List[str]] = None) -> Dict:
+        """
+        Recognize license plates in a base64 encoded image (a data URL prefix is allowed)
+        تمييز اللوحات من صورة مشفرة base64
+        """
+        try:
+            image_bytes = base64.b64decode(base64_image.split(',')[-1])
+        except Exception as e:
+            return {
+                'success': False,
+                'engine': self.name,
+                'error': f'Error decoding base64 image: {str(e)}',
+                'error_ar': f'خطأ في فك تشفير الصورة: {str(e)}'
+            }
+        return self.recognize(image_bytes, regions)
+
+    @abstractmethod
+    def _recognize(self, image_bytes: bytes, regions: Optional[List[str]]) -> Dict:
+        """Recognize plates; returns {'success': True, 'results': [...]} or an error dict"""
+
+
+class PlateRecognizerEngine(RecognitionEngine):
+    """Plate Recognizer cloud API"""
+
+    name = 'plate_recognizer'
+    label = 'Plate Recognizer'
+
+    def is_configured(self) -> bool:
+        return plate_recognizer.is_configured()
+
+    def get_status(self) -> Dict:
+        return plate_recognizer.get_api_status()
+
+    def _recognize(self, image_bytes, regions):
+        return plate_recognizer.recognize_plate_from_bytes(image_bytes, regions)
+
+
+class ParkPowEngine(RecognitionEngine):
+    """ParkPow cloud API"""
+
+    name = 'parkpow'
+    label = 'ParkPow'
+
+    def is_configured(self) -> bool:
+        return parkpow_integration.is_configured()
+
+    def get_status(self) -> Dict:
+        status = parkpow_integration.get_api_status()
+        return dict(status, connected=status.get('success', False))
+
+    def _recognize(self, image_bytes, regions):
+        response = parkpow_integration.recognize_plate(base64.b64encode(image_bytes).decode('ascii'))
+        if not response.get('success'):
+            return response
+        return {
+            'success': True,
+            'results': plate_recognizer.parse_api_results(response)
+        }
+
+
+class EasyOCREngine(RecognitionEngine):
+    """Local EasyOCR (car_image_analyzer)"""
+
+    name = 'easyocr'
+    label = 'EasyOCR'
+
+    def is_configured(self) -> bool:
+        return importlib.util.find_spec('easyocr') is not None
+
+    def _recognize(self, image_bytes, regions):
+        analysis = car_image_analyzer.analyze_car_image_from_bytes(image_bytes)
+        if not analysis.get('success'):
+            return analysis
+
+        results = []
+        plate = analysis.get('plate_number')
+        if plate and plate != UNKNOWN_PLATE:
+            results.append({
+                'plate': plate.replace(' ', '').upper(),
+                'confidence': float(analysis.get('plate_confidence') or 0.0),
+                'region': '',
+                'vehicle_type': analysis.get('vehicle_type', ''),
+                'box': {},
+                'candidates': []
+            })
+        return {'success': True, 'results': results}
+
+
+class StubEngine(RecognitionEngine):
+    """Deterministic offline results, without network or credits"""
+
+    name = 'stub'
+    label = 'Offline stub'
+
+    def _recognize(self, image_bytes, regions):
+        api_response = stub_recognition_server.stub_api_response(image_bytes, regions)
+        if stub_recognition_server.STUB_RECOGNITION_LATENCY_MS:
+            time.sleep(stub_recognition_server.STUB_RECOGNITION_LATENCY_MS / 1000)
+        return {
+            'success': True,
+            'results': plate_recognizer.parse_api_results(api_response),
+            'processing_time': api_response['processing_time']
+        }
+
+
+ENGINES = {engine.name: engine for engine in (PlateRecognizerEngine, ParkPowEngine, EasyOCREngine, StubEngine)}
+
+_instances = {}
+
+
+def get_engine(name: Optional[str] = None) -> RecognitionEngine:
+    """
+    Get a recognition engine (default: the one set by RECOGNITION_ENGINE)
+    الحصول على محرك التمييز المحدد في الإعدادات
+
+    An unknown name falls back to Plate Recognizer with a warning.
+    """
+    name = (name or RECOGNITION_ENGINE).strip().lower()
+    if name not in ENGINES:
+        print(f"⚠️  Warning: Unknown recognition engine '{name}'. Using plate_recognizer.")
+        name = PlateRecognizerEngine.name
+    if name not in _instances:
+        _instances[name] = ENGINES[name]()
+    return _instances[name]
+
+
+def available_engines() -> List[Dict]:
+    """Name, label and availability of every engine"""
+    current = get_engine().name
+    return [
+        {'name': name, 'label': engine.label, 'configured': get_engine(name).is_configured(),
+         'active': name == current}
+        for name, engine in ENGINES.items()
+    ]
@@ -0,0 +1,190 @@
+"""
+Plate Recognition History Exporter
+تصدير سجل تمييز اللوحات إلى Excel
+
+A year of recognitions is hundreds of thousands of rows. Rows are read from
+a server-side cursor in batches and written with xlsx_stream, so memory use
+stays flat and every cell refers to one of a few shared named styles instead
+of carrying its own Font/Border/Alignment objects.
+"""
+
+import os
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+import database
+import database_adapter
+from xlsx_stream import StreamingXlsxWriter
+
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', 2000))
+
+RECOGNITION_HISTORY_SQL = '''
+    SELECT
+        p.plate_number,
+        p.confidence,
+        p.recognized_at,
+        u.name as user_name,
+        v.vehicle_type,
+        v.make,
+        v.model,
+        v.year,
+        v.color,
+        v.sticker_number,
+        r.name as owner_name,
+        r.national_id,
+        r.phone as owner_phone,
+        r.department,
+        r.job_title,
+        r.unit_number,
+        b.name as building_name
+    FROM plate_recognition_log p
+    LEFT JOIN users u ON p.user_id = u.id
+    LEFT JOIN vehicles v ON p.vehicle_id = v.id
+    LEFT JOIN residents r ON v.owner_id = r.id
+    LEFT JOIN buildings b ON r.building_id = b.id
+'''
+
+# (header, column width)
+COLUMNS = [
+    ('م', 5),  # Number
+    ('رقم اللوحة', 15),  # Plate Number
+    ('نسبة الدقة %', 12),  # Confidence
+    ('التاريخ والوقت', 18),  # Date/Time
+    ('المستخدم', 15),  # User
+    ('اسم المالك', 20),  # Owner Name
+    ('الرقم الوطني', 15),  # National ID
+    ('الهاتف', 15),  # Phone
+    ('القسم', 20),  # Department
+    ('المسمى الوظيفي', 20),  # Job Title
+    ('رقم الوحدة', 12),  # Unit Number
+    ('اسم المبنى', 15),  # Building Name
+    ('نوع المركبة', 15),  # Vehicle Type
+    ('الماركة', 12),  # Make
+    ('الموديل', 12),  # Model
+    ('السنة', 8),  # Year
+    ('اللون', 10),  # Color
+    ('رقم الملصق', 15),  # Sticker Number
+    ('حالة التسجيل', 15),  # Registration Status
+]
+
+
+# Shared named styles (see xlsx_stream.build_styles_xml)
+STYLES = {
+    'header': {'bold': True, 'color': 'FFFFFF', 'size': 12, 'font': 'Arial', 'fill': '1A5F7A', 'align': 'center'},
+    'cell_center': {'align': 'center'},
+    'cell_right': {'align': 'right'},
+    'cell_plate': {'bold': True, 'align': 'center'},
+    'cell_unregistered_owner': {'color': 'FF0000', 'align': 'right'},
+    'status_registered': {'bold': True, 'color': '155724', 'fill': 'D4EDDA', 'align': 'center'},
+    'status_unregistered': {'bold': True, 'color': '721C24', 'fill': 'F8D7DA', 'align': 'center'},
+}
+
+
+def _format_datetime(value):
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    try:
+        return datetime.fromisoformat(value).strftime('%Y-%m-%d %H:%M:%S')
+    except (ValueError, TypeError):
+        # Fallback for different datetime formats
+        return str(value)
+
+
+def _row_values(number, row):
+    """Cell (value, style) pairs for one recognition"""
+    registered = bool(row['owner_name'])
+    return [
+        (number, 'cell_center'),
+        (row['plate_number'], 'cell_plate'),
+        (round((row['confidence'] or 0) * 100, 1), 'cell_center'),
+        (_format_datetime(row['recognized_at']), 'cell_center'),
+        (row['user_name'] or '-', 'cell_right'),
+        (row['owner_name'] or 'غير مسجل', 'cell_right' if registered else 'cell_unregistered_owner'),
+        (row['national_id'] or '-', 'cell_center'),
+        (row['owner_phone'] or '-', 'cell_center'),
+        (row['department'] or '-', 'cell_right'),
+        (row['job_title'] or '-', 'cell_right'),
+        (row['unit_number'] or '-', 'cell_center'),
+        (row['building_name'] or '-', 'cell_right'),
+        (row['vehicle_type'] or '-', 'cell_right'),
+        (row['make'] or '-', 'cell_right'),
+        (row['model'] or '-', 'cell_right'),
+        (row['year'] or '-', 'cell_center'),
+        (row['color'] or '-', 'cell_right'),
+        (row['sticker_number'] or '-', 'cell_center'),
+        ('مسجلة' if registered else 'غير مسجلة', 'status_registered' if registered else 'status_unregistered'),
+    ]
+
+
+def build_history_query(start_date: Optional[str] = None, end_date: Optional[str] = None,
+                        count_only: bool = False):
+    """
+    Build the history query with optional YYYY-MM-DD date bounds
+    بناء استعلام السجل مع حدود التاريخ الاختيارية
+
+    Bounds are a half-open range on recognized_at so the index on that column
+    can be used (DATE(recognized_at) would scan the whole log).
+    """
+    sql = 'SELECT COUNT(*) AS total FROM plate_recognition_log p' if count_only else RECOGNITION_HISTORY_SQL
+    conditions = []
+    params = []
+    if start_date:
+        conditions.append('p.recognized_at >= ?')
+        params.append(date.fromisoformat(start_date).isoformat())
+    if end_date:
+        conditions.append('p.recognized_at < ?')
+        params.append((date.fromisoformat(end_date) + timedelta(days=1)).isoformat())
+    if conditions:
+        sql += ' WHERE ' + ' AND '.join(conditions)
+    if not count_only:
+        sql += ' ORDER BY p.recognized_at DESC'
+    return database_adapter.adapt_placeholders(sql), params
+
+
+def export_recognition_history_excel(output, start_date: Optional[str] = None,
+                                     end_date: Optional[str] = None, progress=None) -> int:
+    """
+    Write the plate recognition history to an Excel file
+    تصدير سجل تمييز اللوحات إلى ملف Excel
+
+    Args:
+        output: Destination .xlsx path or binary file object
+        start_date: Optional first day (YYYY-MM-DD)
+        end_date: Optional last day (YYYY-MM-DD), inclusive
+        progress: Optional fn(percent) called after each batch
+
+    Returns:
+        Number of recognitions written
+
+    Raises:
+        ValueError: If a date is not in YYYY-MM-DD format
+    """
+    sql, params = build_history_query(start_date, end_date)
+
+    with StreamingXlsxWriter(output, 'تقرير تمييز اللوحات', [width for _, width in COLUMNS], STYLES) as writer:
+        writer.write_row([(header, 'header') for header, _ in COLUMNS])
+
+        count = 0
+        with database.pooled_connection() as conn:
+            total = 0
+            if progress:
+                count_sql, count_params = build_history_query(start_date, end_date, count_only=True)
+                count_cursor = conn.cursor()
+                count_cursor.execute(count_sql, count_params)
+                total = count_cursor.fetchone()['total']
+
+            cursor = database_adapter.streaming_cursor(conn, EXPORT_BATCH_SIZE)
+            cursor.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(EXPORT_BATCH_SIZE)
+                if not rows:
+                    break
+                writer.write_rows(_row_values(count + number, row) for number, row in enumerate(rows, start=1))
+                count += len(rows)
+                if progress and total:
+                    progress(count * 100 / total)
+            cursor.close()
+
+    return count
@@ -0,0 +1,285 @@
+"""
+Plate Recognizer rate limit and credit governor
+منظم معدل طلبات تمييز اللوحات ورصيد الاستخدام
+
+Plate Recognizer limits lookups per second and per month; going over is
+only reported afterwards with a 429 or 402. This module keeps both limits
+on our side, shared by every gunicorn worker through a small JSON state
+file guarded by an exclusive file lock:
+
+- a token bucket (RECOGNITION_RATE_PER_SECOND, RECOGNITION_RATE_BURST):
+  each call reserves the next free slot and sleeps until it, so a burst
+  queues for a few seconds instead of failing; a call that would wait
+  longer than RECOGNITION_MAX_WAIT_SECONDS is refused
+- a credit tracker: calls are counted locally and reconciled with the
+  statistics endpoint at most every RECOGNITION_STATS_REFRESH_SECONDS
+  (across all workers); cloud calls stop while the remaining credits are
+  at or below RECOGNITION_CREDIT_RESERVE. The billing period ends on the
+  statistics' resets_on date (the calendar month until that is known).
+
+reserve_call() does the credit check, the rate-limit slot and the call
+count in a single locked update; release_call() gives back a call the
+service did not bill.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows: the state is only shared between threads
+    fcntl = None
+
+RECOGNITION_RATE_PER_SECOND = float(os.environ.get('RECOGNITION_RATE_PER_SECOND', '1'))
+RECOGNITION_RATE_BURST = float(os.environ.get('RECOGNITION_RATE_BURST', '1'))
+RECOGNITION_MAX_WAIT_SECONDS = float(os.environ.get('RECOGNITION_MAX_WAIT_SECONDS', '20'))
+RECOGNITION_CREDIT_RESERVE = int(os.environ.get('RECOGNITION_CREDIT_RESERVE', 0))
+RECOGNITION_STATS_REFRESH_SECONDS = int(os.environ.get('RECOGNITION_STATS_REFRESH_SECONDS', 900))
+RECOGNITION_GOVERNOR_PATH = os.environ.get(
+    'RECOGNITION_GOVERNOR_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'recognition_governor.json')
+)
+
+# A claimed statistics refresh that never completed may be retried after this long
+STATS_REFRESH_RETRY_SECONDS = 60
+
+_lock = threading.Lock()
+_stats = {'acquired': 0, 'queued': 0, 'rejected': 0, 'credit_rejected': 0,
+          'total_wait_seconds': 0.0, 'max_wait_seconds': 0.0}
+
+
+@contextmanager
+def _shared_state():
+    """Read, lock and (on exit) write back the state shared by all workers"""
+    with _lock:
+        with open(RECOGNITION_GOVERNOR_PATH, 'a+', encoding='utf-8') as f:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            f.seek(0)
+            try:
+                state = json.loads(f.read() or '{}')
+            except ValueError:
+                state = {}
+            yield state
+            f.seek(0)
+            f.truncate()
+            json.dump(state, f)
+            f.flush()
+
+
+def _month():
+    return datetime.now().strftime('%Y-%m')
+
+
+def _parse_reset_date(value):
+    """ISO date of the statistics' resets_on value, or None"""
+    try:
+        return date.fromisoformat(str(value)[:10]).isoformat() if value else None
+    except ValueError:
+        return None
+
+
+def _period_over(credits):
+    if credits.get('resets_on'):
+        return date.today().isoformat() >= credits['resets_on']
+    return credits.get('month') != _month()
+
+
+def _credits(state):
+    credits = state.setdefault('credits', {})
+    if 'used' not in credits or _period_over(credits):
+        # New billing period: counts restart and the statistics are stale
+        credits.update(month=_month(), used=0, exhausted=False, exhausted_at=None,
+                       resets_on=None, refreshed_at=0)
+    return credits
+
+
+def _credits_allow_call(credits):
+    quota = credits.get('quota')
+    return not credits.get('exhausted') and (
+        quota is None or quota - credits['used'] > RECOGNITION_CREDIT_RESERVE)
+
+
+def _claim_refresh(credits, now):
+    # An exhausted account is re-checked one interval after the 402, not before
+    last = max(credits.get('refreshed_at') or 0, credits.get('exhausted_at') or 0)
+    if now - last < RECOGNITION_STATS_REFRESH_SECONDS:
+        return False
+    if now - credits.get('refresh_claimed_at', 0) < STATS_REFRESH_RETRY_SECONDS:
+        return False
+    credits['refresh_claimed_at'] = now
+    return True
+
+
+def _take_slot(state, now, max_wait):
+    """Seconds until the next rate-limit slot; the slot is only taken if within max_wait"""
+    if RECOGNITION_RATE_PER_SECOND <= 0:
+        return 0.0
+    bucket = state.get('bucket') or {'tokens': RECOGNITION_RATE_BURST, 'updated_at': now}
+    elapsed = max(0.0, now - bucket['updated_at'])
+    # Tokens below zero are calls already queued by other requests
+    tokens = min(RECOGNITION_RATE_BURST, bucket['tokens'] + elapsed * RECOGNITION_RATE_PER_SECOND) - 1
+    wait = -tokens / RECOGNITION_RATE_PER_SECOND if tokens < 0 else 0.0
+    if wait <= max_wait:
+        state['bucket'] = {'tokens': tokens, 'updated_at': now}
+    return wait
+
+
+# ==================== Calls ====================
+
+def reserve_call(max_wait=None):
+    """
+    Reserve one recognition call and wait for its rate-limit slot
+    حجز طلب تمييز وانتظار دوره
+
+    Checks the credits, takes the next slot of the token bucket and counts
+    the call against the credits, all in one locked update. Unknown quotas
+    (statistics not loaded yet) do not block calls.
+
+    Args:
+        max_wait: Longest acceptable wait in seconds (default RECOGNITION_MAX_WAIT_SECONDS)
+
+    Returns:
+        Dict with:
+        - allowed: whether the call may be made
+        - reason: None, 'credits' (credits used up) or 'busy' (queue longer than max_wait)
+        - wait: seconds waited
+        - refresh_statistics: True for the one caller that should now reload
+          the statistics (see record_statistics()), whether or not the call
+          was allowed
+    """
+    max_wait = RECOGNITION_MAX_WAIT_SECONDS if max_wait is None else max_wait
+    reason = None
+    wait = 0.0
+
+    with _shared_state() as state:
+        now = time.time()
+        credits = _credits(state)
+        refresh = _claim_refresh(credits, now)
+        if not _credits_allow_call(credits):
+            reason = 'credits'
+        else:
+            wait = _take_slot(state, now, max_wait)
+            if wait > max_wait:
+                reason = 'busy'
+            else:
+                credits['used'] += 1
+
+    with _lock:
+        if reason == 'credits':
+            _stats['credit_rejected'] += 1
+        elif reason == 'busy':
+            _stats['rejected'] += 1
+        else:
+            _stats['acquired'] += 1
+            if wait:
+                _stats['queued'] += 1
+                _stats['total_wait_seconds'] += wait
+                _stats['max_wait_seconds'] = max(_stats['max_wait_seconds'], wait)
+
+    if reason is None and wait:
+        time.sleep(wait)
+    return {'allowed': reason is None, 'reason': reason, 'wait': wait if reason is None else 0.0,
+            'refresh_statistics': refresh}
+
+
+def release_call(exhausted=False):
+    """
+    Give back a reserved call that the service did not bill
+    إعادة طلب محجوز لم تحتسبه الخدمة
+
+    Args:
+        exhausted: The service refused the call because no credits are left
+                   (HTTP 402); cloud calls stop until the next statistics
+                   refresh, one RECOGNITION_STATS_REFRESH_SECONDS later
+    """
+    with _shared_state() as state:
+        credits = _credits(state)
+        credits['used'] = max(0, credits['used'] - 1)
+        if exhausted:
+            credits.update(exhausted=True, exhausted_at=time.time())
+
+
+# ==================== Statistics ====================
+
+def claim_stats_refresh():
+    """
+    Claim the next statistics refresh
+    حجز التحديث التالي للإحصائيات
+
+    Returns True for one caller (in any worker) once the statistics are
+    older than RECOGNITION_STATS_REFRESH_SECONDS; that caller must then
+    call record_statistics() or record_statistics_error().
+    """
+    with _shared_state() as state:
+        return _claim_refresh(_credits(state), time.time())
+
+
+def record_statistics(usage, quota):
+    """
+    Store the usage reported by the statistics endpoint
+    حفظ بيانات الاستخدام من واجهة الإحصائيات
+
+    Args:
+        usage: The endpoint's usage dict (calls made this period, resets_on...)
+        quota: Calls included per period (total_calls), or None if not reported
+    """
+    with _shared_state() as state:
+        credits = _credits(state)
+        used = int(usage.get('calls') or 0)
+        exhausted = quota is not None and used >= quota
+        credits.update(used=used, quota=quota, usage=usage, connected=True, error=None,
+                       resets_on=_parse_reset_date(usage.get('resets_on')),
+                       exhausted=exhausted, exhausted_at=credits.get('exhausted_at') if exhausted else None,
+                       refreshed_at=time.time())
+
+
+def record_statistics_error(message, message_ar):
+    """Store a failed statistics refresh; it is retried on the next schedule"""
+    with _shared_state() as state:
+        _credits(state).update(connected=False, error=message, error_ar=message_ar,
+                               refreshed_at=time.time())
+
+
+def get_credits():
+    """
+    Locally tracked credits for the current billing period
+    الرصيد المتتبع محلياً للفترة الحالية
+    """
+    with _shared_state() as state:
+        credits = dict(_credits(state))
+    quota = credits.get('quota')
+    refreshed_at = credits.get('refreshed_at') or 0
+    return {
+        'month': credits['month'],
+        'used': credits['used'],
+        'quota': quota,
+        'remaining': max(0, quota - credits['used']) if quota is not None else None,
+        'exhausted': credits.get('exhausted', False),
+        'resets_on': credits.get('resets_on'),
+        'usage': credits.get('usage') or {},
+        'connected': credits.get('connected'),
+        'error': credits.get('error'),
+        'error_ar': credits.get('error_ar'),
+        'refreshed_at': datetime.fromtimestamp(refreshed_at).isoformat(timespec='seconds') if refreshed_at else None,
+    }
+
+
+def get_state():
+    """Rate limit settings, this worker's queueing counters and the shared credits"""
+    with _lock:
+        stats = dict(_stats)
+    stats['total_wait_seconds'] = round(stats['total_wait_seconds'], 2)
+    stats['max_wait_seconds'] = round(stats['max_wait_seconds'], 2)
+    return {
+        'rate_per_second': RECOGNITION_RATE_PER_SECOND,
+        'burst': RECOGNITION_RATE_BURST,
+        'max_wait_seconds': RECOGNITION_MAX_WAIT_SECONDS,
+        'credit_reserve': RECOGNITION_CREDIT_RESERVE,
+        'stats': stats,
+        'credits': get_credits(),
+    }
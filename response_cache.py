@@ -0,0 +1,136 @@
+"""
+Conditional GET and response caching for read-mostly endpoints
+الطلبات الشرطية والتخزين المؤقت للاستجابات
+
+@versioned_response('buildings') derives a strong ETag from the request URL
+and the change versions of the tables the endpoint reads. A request whose
+If-None-Match (or If-Modified-Since) matches gets 304 without running the
+view, and a request for a version already served by this worker is answered
+from an in-process cache of encoded bodies. The ETag never depends on the
+body, so streamed responses keep streaming and are cached as they go out.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, g, request
+
+import table_versions
+
+RESPONSE_CACHE_SIZE = int(os.environ.get('RESPONSE_CACHE_SIZE', 64))
+RESPONSE_CACHE_MAX_BYTES = int(os.environ.get('RESPONSE_CACHE_MAX_BYTES', 2 * 1024 * 1024))
+
+_responses = OrderedDict()  # etag -> (body, mimetype)
+_lock = threading.Lock()
+_stats = {'not_modified': 0, 'hits': 0, 'misses': 0}
+
+
+def _cache_get(etag):
+    with _lock:
+        entry = _responses.get(etag)
+        if entry is not None:
+            _responses.move_to_end(etag)
+        return entry
+
+
+def _cache_put(etag, body, mimetype):
+    if RESPONSE_CACHE_SIZE <= 0 or len(body) > RESPONSE_CACHE_MAX_BYTES:
+        return
+    with _lock:
+        _responses[etag] = (body, mimetype)
+        _responses.move_to_end(etag)
+        while len(_responses) > RESPONSE_CACHE_SIZE:
+            _responses.popitem(last=False)
+
+
+def _cache_stream(chunks, etag, mimetype, request_g):
+    """Pass a streamed body through, caching it once it completes within the size limit"""
+    parts, size = [], 0
+    try:
+        for chunk in chunks:
+            data = chunk.encode('utf-8') if isinstance(chunk, str) else chunk
+            if parts is not None:
+                size += len(data)
+                if size <= RESPONSE_CACHE_MAX_BYTES:
+                    parts.append(data)
+                else:
+                    parts = None
+            yield data
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+
+    # Only reached when the client read the whole body
+    if parts is not None and not getattr(request_g, 'stream_failed', False):
+        _cache_put(etag, b''.join(parts), mimetype)
+
+
+def _add_validators(response, etag, last_modified):
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    # Clients may keep the body but must revalidate before using it
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def versioned_response(*tables):
+    """
+    Decorator adding ETag/Last-Modified handling and response caching to a GET view
+    مزخرف لإضافة ETag والتخزين المؤقت للاستجابة
+    """
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            versions = table_versions.get_versions()
+            state = [versions.get(table, (0, None)) for table in tables]
+            version_key = ';'.join(f'{table}={version}' for table, (version, _) in zip(tables, state))
+            etag = hashlib.sha256(f'{request.full_path}|{version_key}'.encode('utf-8')).hexdigest()[:32]
+            changed = [changed_at for _, changed_at in state if changed_at is not None]
+            last_modified = max(changed) if changed else None
+
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains(etag)
+            else:
+                not_modified = (last_modified is not None and request.if_modified_since is not None
+                                and last_modified.replace(microsecond=0) <= request.if_modified_since.replace(tzinfo=None))
+            if not_modified:
+                _stats['not_modified'] += 1
+                return _add_validators(Response(status=304), etag, last_modified)
+
+            cached = _cache_get(etag)
+            if cached is not None:
+                _stats['hits'] += 1
+                body, mimetype = cached
+                return _add_validators(Response(body, mimetype=mimetype), etag, last_modified)
+
+            _stats['misses'] += 1
+            response = f(*args, **kwargs)
+            if not isinstance(response, Response) or response.status_code != 200:
+                return response
+
+            if response.is_streamed:
+                # Cached when the stream completes; a stream that failed part way is not cached
+                response.response = _cache_stream(response.response, etag, response.mimetype,
+                                                  g._get_current_object())
+            else:
+                _cache_put(etag, response.get_data(), response.mimetype)
+            return _add_validators(response, etag, last_modified)
+        return wrapper
+    return decorator
+
+
+def get_stats():
+    """Counts of 304s, cache hits and misses in this worker"""
+    with _lock:
+        return dict(_stats, cached_responses=len(_responses))
+
+
+def clear():
+    """Drop every cached response"""
+    with _lock:
+        _responses.clear()
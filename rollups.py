@@ -0,0 +1,194 @@
+"""
+Materialized counters for dashboards and reports
+عدادات مجمعة للوحات التحكم والتقارير
+
+The rollup_counts table holds one row per metric, for example
+``traffic_violations`` (total rows) or ``complaints.status.open`` (rows with
+that status). Database triggers keep the counters current on every INSERT,
+UPDATE and DELETE, including writes made by import scripts that bypass the
+application, so readers never have to scan the underlying tables.
+"""
+
+import database_adapter
+
+ROLLUP_COUNTS_DDL = '''
+CREATE TABLE IF NOT EXISTS rollup_counts (
+    metric TEXT PRIMARY KEY,
+    value INTEGER NOT NULL DEFAULT 0
+)
+'''
+
+# table -> (columns whose updates can move a counter, metric key expressions)
+# Key expressions use {row} for the row reference (NEW/OLD in triggers);
+# a NULL key means the row does not count towards that metric.
+ROLLUP_DEFINITIONS = {
+    'buildings': ((), [
+        "'buildings'",
+    ]),
+    'apartments': (('is_occupied',), [
+        "'apartments'",
+        "'apartments.is_occupied.' || {row}.is_occupied",
+    ]),
+    'parking_spots': (('is_occupied',), [
+        "'parking_spots'",
+        "'parking_spots.is_occupied.' || {row}.is_occupied",
+    ]),
+    'residents': (('is_active', 'building_id'), [
+        "'residents'",
+        "'residents.is_active.' || {row}.is_active",
+        "CASE WHEN {row}.is_active = 1 THEN 'residents.building.' || {row}.building_id END",
+    ]),
+    'vehicles': (('is_active',), [
+        "'vehicles'",
+        "'vehicles.is_active.' || {row}.is_active",
+    ]),
+    'stickers': ((), [
+        "'stickers'",
+    ]),
+    'traffic_violations': (('status', 'violation_type'), [
+        "'traffic_violations'",
+        "'traffic_violations.status.' || {row}.status",
+        "'traffic_violations.violation_type.' || {row}.violation_type",
+    ]),
+    'security_incidents': (('status',), [
+        "'security_incidents'",
+        "'security_incidents.status.' || {row}.status",
+    ]),
+    'complaints': (('status',), [
+        "'complaints'",
+        "'complaints.status.' || {row}.status",
+    ]),
+    'visitors': ((), [
+        "'visitors'",
+    ]),
+}
+
+_UPSERT_SQL = '''
+    INSERT INTO rollup_counts (metric, value)
+    SELECT k, {delta} FROM (SELECT {expr} AS k) t WHERE k IS NOT NULL
+    ON CONFLICT (metric) DO UPDATE SET value = rollup_counts.value + excluded.value
+'''
+
+_BACKFILL_SQL = '''
+    INSERT INTO rollup_counts (metric, value)
+    SELECT k, COUNT(*) FROM (SELECT {expr} AS k FROM {table} r) t WHERE k IS NOT NULL GROUP BY k
+    ON CONFLICT (metric) DO UPDATE SET value = rollup_counts.value + excluded.value
+'''
+
+
+def _counter_statements(table, row, delta):
+    _, keys = ROLLUP_DEFINITIONS[table]
+    return [_UPSERT_SQL.format(delta=delta, expr=key.format(row=row)).strip() for key in keys]
+
+
+def sqlite_trigger_sql(table):
+    """Build the SQLite INSERT/UPDATE/DELETE triggers for a table"""
+    columns, _ = ROLLUP_DEFINITIONS[table]
+    statements = []
+
+    def trigger(event, body):
+        body_sql = ';\n    '.join(body)
+        return (f'CREATE TRIGGER IF NOT EXISTS trg_rollup_{table}_{event.split()[0].lower()} '
+                f'AFTER {event} ON {table} FOR EACH ROW BEGIN\n    {body_sql};\nEND')
+
+    statements.append(trigger('INSERT', _counter_statements(table, 'NEW', 1)))
+    statements.append(trigger('DELETE', _counter_statements(table, 'OLD', -1)))
+    if columns:
+        statements.append(trigger(
+            f"UPDATE OF {', '.join(columns)}",
+            _counter_statements(table, 'OLD', -1) + _counter_statements(table, 'NEW', 1)
+        ))
+    return statements
+
+
+def postgresql_trigger_sql(table):
+    """Build the PostgreSQL trigger function and trigger for a table"""
+    columns, _ = ROLLUP_DEFINITIONS[table]
+    old_body = ';\n        '.join(_counter_statements(table, 'OLD', -1))
+    new_body = ';\n        '.join(_counter_statements(table, 'NEW', 1))
+    events = 'INSERT OR DELETE'
+    if columns:
+        events += f" OR UPDATE OF {', '.join(columns)}"
+
+    return [
+        f'''CREATE OR REPLACE FUNCTION rollup_{table}() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        {old_body};
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        {new_body};
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql''',
+        f'DROP TRIGGER IF EXISTS trg_rollup_{table} ON {table}',
+        f'CREATE TRIGGER trg_rollup_{table} AFTER {events} ON {table} '
+        f'FOR EACH ROW EXECUTE PROCEDURE rollup_{table}()',
+    ]
+
+
+def rebuild_rollups(cursor):
+    """
+    Recompute every counter from the underlying tables
+    إعادة حساب جميع العدادات من الجداول الأصلية
+    """
+    cursor.execute('DELETE FROM rollup_counts')
+    for table, (_, keys) in ROLLUP_DEFINITIONS.items():
+        for key in keys:
+            cursor.execute(_BACKFILL_SQL.format(expr=key.format(row='r'), table=table))
+
+
+def install_rollups(cursor, db_type):
+    """Create the rollup table, backfill it and install the triggers"""
+    cursor.execute(ROLLUP_COUNTS_DDL)
+    rebuild_rollups(cursor)
+    for table in ROLLUP_DEFINITIONS:
+        statements = postgresql_trigger_sql(table) if db_type == 'postgresql' else sqlite_trigger_sql(table)
+        for sql in statements:
+            cursor.execute(sql)
+
+
+# ==================== Readers ====================
+
+def metric(table, column=None, value=None):
+    """Build a metric key, e.g. metric('complaints', 'status', 'open')"""
+    if column is None:
+        return table
+    return f'{table}.{column}.{value}'
+
+
+def read_counts(cursor, prefixes):
+    """
+    Read every counter whose metric starts with one of the given table names
+    قراءة العدادات الخاصة بالجداول المحددة
+
+    Returns a dict of metric -> value; missing metrics are simply absent.
+    """
+    conditions = ' OR '.join(['metric = ? OR metric LIKE ?'] * len(prefixes))
+    params = []
+    for prefix in prefixes:
+        params.extend([prefix, prefix + '.%'])
+
+    sql = f'SELECT metric, value FROM rollup_counts WHERE {conditions}'
+    cursor.execute(database_adapter.adapt_placeholders(sql), params)
+    return {row['metric']: row['value'] for row in cursor.fetchall()}
+
+
+def count(counts, table, column=None, values=None):
+    """
+    Total of one or more counters from a read_counts() result
+    مجموع العدادات المطلوبة
+    """
+    if column is None:
+        return counts.get(table, 0)
+    return sum(counts.get(metric(table, column, value), 0) for value in values)
+
+
+def top_values(counts, table, column, limit=None):
+    """(value, count) pairs for a column, largest first, skipping empty counters"""
+    prefix = f'{table}.{column}.'
+    pairs = [(key[len(prefix):], value) for key, value in counts.items()
+             if key.startswith(prefix) and value > 0]
+    pairs.sort(key=lambda pair: pair[1], reverse=True)
+    return pairs[:limit] if limit else pairs
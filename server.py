@@ -3,25 +3,41 @@ Main Flask server for Faculty Housing Management System
 خادم Flask الرئيسي لنظام إدارة إسكان أعضاء هيئة التدريس
 """
 
-from flask import Flask, request, jsonify, send_from_directory, make_response, abort, send_file
+from flask import Flask, Response, request, jsonify, send_from_directory, make_response, abort, send_file, stream_with_context
 from flask_cors import CORS
 from werkzeug.security import safe_join
 from werkzeug.utils import secure_filename
 import os
 from dotenv import load_dotenv
-import database
-import auth
-import plate_recognizer
-import parkpow_integration
-import car_image_analyzer
-import car_data_exporter
-import vehicle_report_exporter
-import import_historical_vehicles
-import housing_report_generator
+import lazy_loader
+import data_cache
+import rollups
+import trends
+import pagination
+import streaming
+import response_cache
+import export_jobs
+import http_client
+import recognition_cache
+import recognition_governor
 from datetime import datetime
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from io import BytesIO
+
+# Core modules used by every worker (import time is recorded for the startup report)
+database = lazy_loader.timed_import('database')
+auth = lazy_loader.timed_import('auth')
+plate_recognizer = lazy_loader.timed_import('plate_recognizer')
+parkpow_integration = lazy_loader.timed_import('parkpow_integration')
+recognition_engines = lazy_loader.timed_import('recognition_engines')
+
+# Export, import and reporting subsystems pull in PIL, openpyxl, reportlab,
+# python-docx and pandas; they are loaded on first use only
+# وحدات التصدير والاستيراد والتقارير تُحمّل عند أول استخدام فقط
+car_image_analyzer = lazy_loader.lazy_import('car_image_analyzer')
+car_data_exporter = lazy_loader.lazy_import('car_data_exporter')
+vehicle_report_exporter = lazy_loader.lazy_import('vehicle_report_exporter')
+import_historical_vehicles = lazy_loader.lazy_import('import_historical_vehicles')
+housing_report_generator = lazy_loader.lazy_import('housing_report_generator')
+recognition_exporter = lazy_loader.lazy_import('recognition_exporter')
 
 # Load environment variables from .env file
 load_dotenv()
@@ -89,6 +105,7 @@ EXPORT_FOLDER = os.path.join(BASE_DIR, 'exports')
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(THUMBNAIL_FOLDER, exist_ok=True)
 os.makedirs(EXPORT_FOLDER, exist_ok=True)
+export_jobs.init(EXPORT_FOLDER)
 
 # Allowed file extensions
 ALLOWED_EXTENSIONS = {'.html', '.css', '.js', '.png', '.jpg', '.jpeg', '.gif', '.svg', '.pdf', '.md'}
@@ -115,10 +132,46 @@ def allowed_image_file(filename):
     _, ext = os.path.splitext(filename)
     return ext.lower() in ALLOWED_IMAGE_EXTENSIONS
 
+
+def list_response(query, format_row, default_sort=None, key='data', include_total=True):
+    """
+    Respond to a list request
+    الاستجابة لطلب قائمة
+    
+    In "all" mode (no limit/cursor) every row is streamed with fetchmany();
+    otherwise one page is returned with its pagination info.
+    """
+    args = request.args
+    if pagination.parse_limit(args) is None:
+        sql, params, _, _ = query.build(args, default_sort)
+        return streaming.stream_json(sql, params, format_row, key=key, include_total=include_total)
+    
+    with database.pooled_connection() as conn:
+        rows, page = query.fetch_page(conn.cursor(), args, default_sort)
+    
+    data = [format_row(row) for row in rows]
+    body = {'success': True, key: data, 'pagination': page}
+    if include_total:
+        body['total'] = len(data)
+    return jsonify(body)
+
+
+def pagination_error_response(error):
+    """400 response for invalid limit/cursor/sort/filter arguments"""
+    return jsonify({
+        'success': False,
+        'error': str(error),
+        'error_ar': error.message_ar
+    }), 400
+
 # Initialize database on startup
 with app.app_context():
     database.init_database()
 
+# Print how long the eager imports took (set STARTUP_IMPORT_REPORT=false to silence)
+if os.environ.get('STARTUP_IMPORT_REPORT', 'true').lower() == 'true':
+    lazy_loader.print_import_report()
+
 # ==================== Authentication Routes ====================
 
 @app.route('/api/auth/login', methods=['POST'])
@@ -156,7 +209,8 @@ def login():
         session_token, expires_at = auth.create_session(
             user['id'],
             ip_address=request.remote_addr,
-            user_agent=request.headers.get('User-Agent')
+            user_agent=request.headers.get('User-Agent'),
+            user=user
         )
         
         # Log successful login
@@ -308,6 +362,9 @@ def change_password():
         success = database.update_user_password(request.user['id'], new_password)
         
         if success:
+            # Cached sessions still carry the old user row
+            auth.invalidate_user_sessions(request.user['id'])
+            
             # Log password change
             database.log_audit(
                 request.user['id'],
@@ -315,11 +372,26 @@ def change_password():
                 ip_address=request.remote_addr
             )
             
-            return jsonify({
+            response = make_response(jsonify({
                 'success': True,
                 'message': 'Password changed successfully',
                 'message_ar': 'تم تغيير كلمة المرور بنجاح'
-            })
+            }))
+            
+            # The new password invalidated every signed token of this user,
+            # including the caller's, so hand out a fresh one
+            if auth.is_signed_token(request.cookies.get('session_token')):
+                session_token, expires_at = auth.create_session(request.user['id'])
+                response.set_cookie(
+                    'session_token',
+                    session_token,
+                    expires=expires_at,
+                    httponly=True,
+                    secure=app.config['SESSION_COOKIE_SECURE'],
+                    samesite=app.config['SESSION_COOKIE_SAMESITE']
+                )
+            
+            return response
         else:
             return jsonify({
                 'success': False,
@@ -340,9 +412,10 @@ def change_password():
 @app.route('/api/plate-recognizer/status', methods=['GET'])
 @auth.require_auth
 def plate_recognizer_status():
-    """Get Plate Recognizer API status"""
+    """Get the status of the configured recognition engine (RECOGNITION_ENGINE)"""
     try:
-        status = plate_recognizer.get_api_status()
+        engine = recognition_engines.get_engine()
+        status = dict(engine.get_status(), engine=engine.name, engine_label=engine.label)
         return jsonify(status)
     except Exception as e:
         app.logger.error(f'Plate recognizer status error: {str(e)}')
@@ -355,10 +428,13 @@ def plate_recognizer_status():
 @app.route('/api/plate-recognizer/recognize', methods=['POST'])
 @auth.require_auth
 def recognize_plate():
-    """Recognize license plate from uploaded image"""
+    """Recognize license plate from uploaded image with the configured recognition engine"""
     try:
+        # Multipart uploads have no JSON body (request.json would raise 415)
+        payload = request.get_json(silent=True) or {}
+        
         # Check if image is provided
-        if 'image' not in request.files and 'base64_image' not in request.json:
+        if 'image' not in request.files and 'base64_image' not in payload:
             return jsonify({
                 'success': False,
                 'error': 'No image provided',
@@ -366,8 +442,8 @@ def recognize_plate():
             }), 400
         
         regions = request.form.get('regions', 'sa').split(',') if 'image' in request.files else None
-        if request.json and 'regions' in request.json:
-            regions = request.json['regions']
+        if 'regions' in payload:
+            regions = payload['regions']
         
         # Handle file upload
         if 'image' in request.files:
@@ -377,12 +453,12 @@ def recognize_plate():
             image_bytes = image_file.read()
             
             # Recognize plate
-            result = plate_recognizer.recognize_plate_from_bytes(image_bytes, regions)
+            result = recognition_engines.get_engine().recognize(image_bytes, regions)
         
         # Handle base64 image
-        elif request.json and 'base64_image' in request.json:
-            base64_image = request.json['base64_image']
-            result = plate_recognizer.recognize_plate_from_base64(base64_image, regions)
+        elif 'base64_image' in payload:
+            base64_image = payload['base64_image']
+            result = recognition_engines.get_engine().recognize_base64(base64_image, regions)
         
         else:
             return jsonify({
@@ -429,44 +505,132 @@ def recognize_plate():
             'error_ar': 'خطأ في تمييز اللوحة'
         }), 500
 
+@app.route('/api/plate-recognizer/recognize-batch', methods=['POST'])
+@auth.require_auth
+def recognize_plate_batch():
+    """
+    Recognize plates in many uploaded images at once
+    تمييز اللوحات في عدة صور مرفوعة دفعة واحدة
+    
+    Form fields: images (one or more files), regions (comma-separated, default sa).
+    The images are recognized concurrently and the response is NDJSON: one line
+    per image as soon as it is done (the /recognize result plus index and
+    filename, in completion order), then a summary line with "done": true.
+    Recognitions are logged together when the batch ends.
+    """
+    files = [file for file in request.files.getlist('images') if file and file.filename]
+    if not files:
+        return jsonify({
+            'success': False,
+            'error': 'No images provided',
+            'error_ar': 'لم يتم تقديم أي صور'
+        }), 400
+    
+    if len(files) > plate_recognizer.BATCH_MAX_IMAGES:
+        return jsonify({
+            'success': False,
+            'error': f'Too many images; at most {plate_recognizer.BATCH_MAX_IMAGES} per batch',
+            'error_ar': f'عدد الصور كبير؛ الحد الأقصى {plate_recognizer.BATCH_MAX_IMAGES} صورة في الدفعة'
+        }), 400
+    
+    engine = recognition_engines.get_engine()
+    if not engine.is_configured():
+        return jsonify({
+            'success': False,
+            'error': f'Recognition engine {engine.label} is not configured',
+            'error_ar': f'محرك التمييز {engine.label} غير مفعل'
+        }), 503
+    
+    regions = request.form.get('regions', 'sa').split(',')
+    filenames = [file.filename for file in files]
+    images = [file.read() for file in files]
+    user_id = request.user['id']
+    ip_address = request.remote_addr
+    dumps = app.json.dumps
+    
+    def generate():
+        pending_logs = []
+        succeeded = 0
+        try:
+            for index, result in plate_recognizer.recognize_plates_batch(images, regions, engine.recognize):
+                if result.get('success'):
+                    succeeded += 1
+                    plates = result.get('results') or []
+                    vehicles = plate_recognizer.find_vehicles_by_plates(plate['plate'] for plate in plates)
+                    for plate_data in plates:
+                        vehicle = vehicles.get(plate_data['plate'])
+                        plate_data['vehicle_info'] = vehicle
+                        pending_logs.append((user_id, plate_data['plate'], plate_data['confidence'],
+                                             vehicle['id'] if vehicle else None, None))
+                
+                result.update(index=index, filename=filenames[index])
+                yield dumps(result) + '\n'
+            
+            yield dumps({
+                'done': True,
+                'success': True,
+                'total': len(images),
+                'succeeded': succeeded,
+                'failed': len(images) - succeeded
+            }) + '\n'
+        finally:
+            # Also reached when the client disconnects part way through
+            plate_recognizer.log_plate_recognitions(pending_logs)
+            database.log_audit(
+                user_id,
+                f'Batch plate recognition performed ({len(pending_logs)} plates in {len(images)} images)',
+                ip_address=ip_address
+            )
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+# Recognition history with user and vehicle info, newest first
+PLATE_HISTORY_SQL = '''
+    SELECT 
+        p.*,
+        u.username,
+        u.name as user_name,
+        v.plate_number as registered_plate,
+        v.make,
+        v.model,
+        r.name as owner_name,
+        r.unit_number
+    FROM plate_recognition_log p
+    LEFT JOIN users u ON p.user_id = u.id
+    LEFT JOIN vehicles v ON p.vehicle_id = v.id
+    LEFT JOIN residents r ON v.owner_id = r.id
+    ORDER BY p.recognized_at DESC
+'''
+
+
 @app.route('/api/plate-recognizer/history', methods=['GET'])
 @auth.require_auth
 def plate_recognition_history():
     """Get plate recognition history"""
     try:
+        # limit=all streams the whole history (newest first) instead of one page
+        if request.args.get('limit') == 'all':
+            return streaming.stream_json(
+                PLATE_HISTORY_SQL,
+                key='history',
+                extra={'limit': 'all', 'offset': 0}
+            )
+        
         # Get query parameters
         limit = request.args.get('limit', 50, type=int)
         offset = request.args.get('offset', 0, type=int)
         
-        conn = database.get_db_connection()
-        cursor = conn.cursor()
-        
-        # Get recognition history with user and vehicle info
-        cursor.execute('''
-            SELECT 
-                p.*,
-                u.username,
-                u.name as user_name,
-                v.plate_number as registered_plate,
-                v.make,
-                v.model,
-                r.name as owner_name,
-                r.unit_number
-            FROM plate_recognition_log p
-            LEFT JOIN users u ON p.user_id = u.id
-            LEFT JOIN vehicles v ON p.vehicle_id = v.id
-            LEFT JOIN residents r ON v.owner_id = r.id
-            ORDER BY p.recognized_at DESC
-            LIMIT ? OFFSET ?
-        ''', (limit, offset))
-        
-        rows = cursor.fetchall()
-        
-        # Get total count
-        cursor.execute('SELECT COUNT(*) FROM plate_recognition_log')
-        total = cursor.fetchone()[0]
-        
-        conn.close()
+        with database.pooled_connection() as conn:
+            cursor = conn.cursor()
+
+            # Get recognition history with user and vehicle info
+            cursor.execute(PLATE_HISTORY_SQL + ' LIMIT ? OFFSET ?', (limit, offset))
+
+            rows = cursor.fetchall()
+
+            # Get total count
+            cursor.execute('SELECT COUNT(*) FROM plate_recognition_log')
+            total = cursor.fetchone()[0]
         
         history = [dict(row) for row in rows]
         
@@ -489,272 +653,31 @@ def plate_recognition_history():
 @app.route('/api/plate-recognizer/export-excel', methods=['GET'])
 @auth.require_auth
 def export_plate_recognition_excel():
-    """Export plate recognition history to Excel"""
+    """Export plate recognition history to Excel (?async=true runs it as a background job)"""
     try:
         # Get query parameters
         start_date = request.args.get('start_date', '')
         end_date = request.args.get('end_date', '')
         
-        conn = database.get_db_connection()
-        cursor = conn.cursor()
+        try:
+            recognition_exporter.build_history_query(start_date, end_date)
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'error': 'Dates must be in YYYY-MM-DD format',
+                'error_ar': 'يجب أن تكون التواريخ بصيغة YYYY-MM-DD'
+            }), 400
         
-        # Build query with optional date filters
-        query = '''
-            SELECT 
-                p.id,
-                p.plate_number,
-                p.confidence,
-                p.recognized_at,
-                u.name as user_name,
-                v.plate_number as registered_plate,
-                v.vehicle_type,
-                v.make,
-                v.model,
-                v.year,
-                v.color,
-                v.sticker_number,
-                r.name as owner_name,
-                r.national_id,
-                r.phone as owner_phone,
-                r.department,
-                r.job_title,
-                r.unit_number,
-                b.name as building_name
-            FROM plate_recognition_log p
-            LEFT JOIN users u ON p.user_id = u.id
-            LEFT JOIN vehicles v ON p.vehicle_id = v.id
-            LEFT JOIN residents r ON v.owner_id = r.id
-            LEFT JOIN buildings b ON r.building_id = b.id
-        '''
-        
-        params = []
-        if start_date and end_date:
-            query += ' WHERE DATE(p.recognized_at) BETWEEN ? AND ?'
-            params.extend([start_date, end_date])
-        elif start_date:
-            query += ' WHERE DATE(p.recognized_at) >= ?'
-            params.append(start_date)
-        elif end_date:
-            query += ' WHERE DATE(p.recognized_at) <= ?'
-            params.append(end_date)
-        
-        query += ' ORDER BY p.recognized_at DESC'
-        
-        cursor.execute(query, params)
-        rows = cursor.fetchall()
-        conn.close()
-        
-        # Create Excel workbook
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "تقرير تمييز اللوحات"
-        
-        # Define styles
-        header_fill = PatternFill(start_color="1A5F7A", end_color="1A5F7A", fill_type="solid")
-        header_font = Font(bold=True, color="FFFFFF", size=12, name="Arial")
-        cell_border = Border(
-            left=Side(style='thin'),
-            right=Side(style='thin'),
-            top=Side(style='thin'),
-            bottom=Side(style='thin')
-        )
-        center_alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
-        right_alignment = Alignment(horizontal='right', vertical='center', wrap_text=True)
-        
-        # Headers in Arabic
-        headers = [
-            'م',  # Number
-            'رقم اللوحة',  # Plate Number
-            'نسبة الدقة %',  # Confidence
-            'التاريخ والوقت',  # Date/Time
-            'المستخدم',  # User
-            'اسم المالك',  # Owner Name
-            'الرقم الوطني',  # National ID
-            'الهاتف',  # Phone
-            'القسم',  # Department
-            'المسمى الوظيفي',  # Job Title
-            'رقم الوحدة',  # Unit Number
-            'اسم المبنى',  # Building Name
-            'نوع المركبة',  # Vehicle Type
-            'الماركة',  # Make
-            'الموديل',  # Model
-            'السنة',  # Year
-            'اللون',  # Color
-            'رقم الملصق',  # Sticker Number
-            'حالة التسجيل'  # Registration Status
-        ]
-        
-        # Write headers
-        for col, header in enumerate(headers, start=1):
-            cell = ws.cell(row=1, column=col)
-            cell.value = header
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.border = cell_border
-            cell.alignment = center_alignment
-        
-        # Set column widths
-        column_widths = [5, 15, 12, 18, 15, 20, 15, 15, 20, 20, 12, 15, 15, 12, 12, 8, 10, 15, 15]
-        for col, width in enumerate(column_widths, start=1):
-            ws.column_dimensions[ws.cell(row=1, column=col).column_letter].width = width
-        
-        # Write data
-        for idx, row in enumerate(rows, start=2):
-            # Row number
-            cell = ws.cell(row=idx, column=1)
-            cell.value = idx - 1
-            cell.alignment = center_alignment
-            cell.border = cell_border
-            
-            # Plate number
-            cell = ws.cell(row=idx, column=2)
-            cell.value = row['plate_number']
-            cell.alignment = center_alignment
-            cell.border = cell_border
-            cell.font = Font(bold=True, size=11)
-            
-            # Confidence
-            cell = ws.cell(row=idx, column=3)
-            confidence_percent = round((row['confidence'] or 0) * 100, 1)
-            cell.value = confidence_percent
-            cell.alignment = center_alignment
-            cell.border = cell_border
-            
-            # DateTime
-            cell = ws.cell(row=idx, column=4)
-            if row['recognized_at']:
-                try:
-                    dt = datetime.fromisoformat(row['recognized_at'])
-                    cell.value = dt.strftime('%Y-%m-%d %H:%M:%S')
-                except (ValueError, TypeError):
-                    # Fallback for different datetime formats
-                    cell.value = str(row['recognized_at'])
-            cell.alignment = center_alignment
-            cell.border = cell_border
-            
-            # User
-            cell = ws.cell(row=idx, column=5)
-            cell.value = row['user_name'] or '-'
-            cell.alignment = right_alignment
-            cell.border = cell_border
-            
-            # Owner Name
-            cell = ws.cell(row=idx, column=6)
-            cell.value = row['owner_name'] or 'غير مسجل'
-            cell.alignment = right_alignment
-            cell.border = cell_border
-            if not row['owner_name']:
-                cell.font = Font(color="FF0000")
-            
-            # National ID
-            cell = ws.cell(row=idx, column=7)
-            cell.value = row['national_id'] or '-'
-            cell.alignment = center_alignment
-            cell.border = cell_border
-            
-            # Phone
-            cell = ws.cell(row=idx, column=8)
-            cell.value = row['owner_phone'] or '-'
-            cell.alignment = center_alignment
-            cell.border = cell_border
-            
-            # Department
-            cell = ws.cell(row=idx, column=9)
-            cell.value = row['department'] or '-'
-            cell.alignment = right_alignment
-            cell.border = cell_border
-            
-            # Job Title
-            cell = ws.cell(row=idx, column=10)
-            cell.value = row['job_title'] or '-'
-            cell.alignment = right_alignment
-            cell.border = cell_border
-            
-            # Unit Number
-            cell = ws.cell(row=idx, column=11)
-            cell.value = row['unit_number'] or '-'
-            cell.alignment = center_alignment
-            cell.border = cell_border
-            
-            # Building Name
-            cell = ws.cell(row=idx, column=12)
-            cell.value = row['building_name'] or '-'
-            cell.alignment = right_alignment
-            cell.border = cell_border
-            
-            # Vehicle Type
-            cell = ws.cell(row=idx, column=13)
-            cell.value = row['vehicle_type'] or '-'
-            cell.alignment = right_alignment
-            cell.border = cell_border
-            
-            # Make
-            cell = ws.cell(row=idx, column=14)
-            cell.value = row['make'] or '-'
-            cell.alignment = right_alignment
-            cell.border = cell_border
-            
-            # Model
-            cell = ws.cell(row=idx, column=15)
-            cell.value = row['model'] or '-'
-            cell.alignment = right_alignment
-            cell.border = cell_border
-            
-            # Year
-            cell = ws.cell(row=idx, column=16)
-            cell.value = row['year'] or '-'
-            cell.alignment = center_alignment
-            cell.border = cell_border
-            
-            # Color
-            cell = ws.cell(row=idx, column=17)
-            cell.value = row['color'] or '-'
-            cell.alignment = right_alignment
-            cell.border = cell_border
-            
-            # Sticker Number
-            cell = ws.cell(row=idx, column=18)
-            cell.value = row['sticker_number'] or '-'
-            cell.alignment = center_alignment
-            cell.border = cell_border
-            
-            # Registration Status
-            cell = ws.cell(row=idx, column=19)
-            status = 'مسجلة' if row['owner_name'] else 'غير مسجلة'
-            cell.value = status
-            cell.alignment = center_alignment
-            cell.border = cell_border
-            if row['owner_name']:
-                cell.fill = PatternFill(start_color="D4EDDA", end_color="D4EDDA", fill_type="solid")
-                cell.font = Font(color="155724", bold=True)
-            else:
-                cell.fill = PatternFill(start_color="F8D7DA", end_color="F8D7DA", fill_type="solid")
-                cell.font = Font(color="721C24", bold=True)
-        
-        # Freeze first row
-        ws.freeze_panes = 'A2'
-        
-        # Save to BytesIO
-        excel_file = BytesIO()
-        wb.save(excel_file)
-        excel_file.seek(0)
+        def render(output_path, progress):
+            return recognition_exporter.export_recognition_history_excel(
+                output_path, start_date, end_date, progress)
         
-        # Generate filename
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f'تقرير_تمييز_اللوحات_{timestamp}.xlsx'
-        
-        # Log audit
-        database.log_audit(
-            request.user['id'],
-            f'Exported plate recognition report ({len(rows)} records)',
-            ip_address=request.remote_addr
-        )
-        
-        return send_file(
-            excel_file,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            as_attachment=True,
-            download_name=filename
+        return export_response(
+            'plate-recognition',
+            f'تقرير_تمييز_اللوحات_{timestamp}.xlsx',
+            render,
+            lambda count: f'Exported plate recognition report ({count} records)'
         )
     
     except Exception as e:
@@ -977,66 +900,103 @@ def serve_static(filename):
 
 # ==================== System Statistics ====================
 
+@app.route('/api/system/import-report')
+@auth.require_role('admin')
+def import_report():
+    """Get module import timings, including subsystems loaded lazily since startup"""
+    return jsonify({
+        'success': True,
+        'data': lazy_loader.get_import_report()
+    })
+
+
+@app.route('/api/system/http-metrics')
+@auth.require_role('admin')
+def http_metrics():
+    """Get call counts, latency and circuit state of external API endpoints, recognition cache hits and rate/credit governor state"""
+    return jsonify({
+        'success': True,
+        'data': http_client.get_metrics(),
+        'recognition_cache': recognition_cache.get_stats(),
+        'recognition_governor': recognition_governor.get_state()
+    })
+
+
+# One pass per table: each derived table scans its table once and computes
+# the total and filtered counts together with conditional aggregation
+SYSTEM_STATS_SQL = '''
+    SELECT
+        b.buildings,
+        r.residents, r.active_residents,
+        v.vehicles, v.active_vehicles,
+        tv.violations, tv.open_violations,
+        si.security_incidents, si.open_incidents,
+        vi.visitors,
+        c.complaints, c.open_complaints,
+        u.users, u.active_users,
+        s.active_sessions
+    FROM
+        (SELECT COUNT(*) AS buildings FROM buildings) b,
+        (SELECT COUNT(*) AS residents,
+                COALESCE(SUM(CASE WHEN is_active = 1 THEN 1 ELSE 0 END), 0) AS active_residents
+         FROM residents) r,
+        (SELECT COUNT(*) AS vehicles,
+                COALESCE(SUM(CASE WHEN is_active = 1 THEN 1 ELSE 0 END), 0) AS active_vehicles
+         FROM vehicles) v,
+        (SELECT COUNT(*) AS violations,
+                COALESCE(SUM(CASE WHEN status IN ('مفتوحة', 'open') THEN 1 ELSE 0 END), 0) AS open_violations
+         FROM traffic_violations) tv,
+        (SELECT COUNT(*) AS security_incidents,
+                COALESCE(SUM(CASE WHEN status IN ('مفتوحة', 'open') THEN 1 ELSE 0 END), 0) AS open_incidents
+         FROM security_incidents) si,
+        (SELECT COUNT(*) AS visitors FROM visitors) vi,
+        (SELECT COUNT(*) AS complaints,
+                COALESCE(SUM(CASE WHEN status IN ('مفتوحة', 'open') THEN 1 ELSE 0 END), 0) AS open_complaints
+         FROM complaints) c,
+        (SELECT COUNT(*) AS users,
+                COALESCE(SUM(CASE WHEN is_active = 1 THEN 1 ELSE 0 END), 0) AS active_users
+         FROM users) u,
+        (SELECT COUNT(*) AS active_sessions FROM sessions WHERE expires_at > ?) s
+'''
+
+SYSTEM_STATS_TABLES = ('buildings', 'residents', 'vehicles', 'traffic_violations', 'security_incidents',
+                       'visitors', 'complaints', 'users', 'sessions')
+
+# Response key -> column in SYSTEM_STATS_SQL
+SYSTEM_STATS_FIELDS = {
+    'buildings': 'buildings',
+    'residents': 'residents',
+    'activeResidents': 'active_residents',
+    'vehicles': 'vehicles',
+    'activeVehicles': 'active_vehicles',
+    'violations': 'violations',
+    'openViolations': 'open_violations',
+    'securityIncidents': 'security_incidents',
+    'openIncidents': 'open_incidents',
+    'visitors': 'visitors',
+    'complaints': 'complaints',
+    'openComplaints': 'open_complaints',
+    'users': 'users',
+    'activeUsers': 'active_users',
+    'activeSessions': 'active_sessions',
+}
+
+
+def compute_system_stats():
+    """Compute all system counts in a single query"""
+    with database.pooled_connection() as conn:
+        cursor = conn.cursor()
+        database._execute_query(cursor, SYSTEM_STATS_SQL, (datetime.now(),))
+        row = cursor.fetchone()
+    
+    return {key: int(row[column]) for key, column in SYSTEM_STATS_FIELDS.items()}
+
+
 @app.route('/api/system/stats')
 def system_stats():
     """Get system statistics for validation report"""
     try:
-        conn = database.get_db_connection()
-        cursor = conn.cursor()
-        
-        # Get counts for each table
-        stats = {}
-        
-        # Buildings
-        cursor.execute('SELECT COUNT(*) FROM buildings')
-        stats['buildings'] = cursor.fetchone()[0]
-        
-        # Residents
-        cursor.execute('SELECT COUNT(*) FROM residents')
-        stats['residents'] = cursor.fetchone()[0]
-        cursor.execute('SELECT COUNT(*) FROM residents WHERE is_active = 1')
-        stats['activeResidents'] = cursor.fetchone()[0]
-        
-        # Vehicles
-        cursor.execute('SELECT COUNT(*) FROM vehicles')
-        stats['vehicles'] = cursor.fetchone()[0]
-        cursor.execute('SELECT COUNT(*) FROM vehicles WHERE is_active = 1')
-        stats['activeVehicles'] = cursor.fetchone()[0]
-        
-        # Traffic violations
-        cursor.execute('SELECT COUNT(*) FROM traffic_violations')
-        stats['violations'] = cursor.fetchone()[0]
-        cursor.execute("SELECT COUNT(*) FROM traffic_violations WHERE status = 'مفتوحة' OR status = 'open'")
-        stats['openViolations'] = cursor.fetchone()[0]
-        
-        # Security incidents
-        cursor.execute('SELECT COUNT(*) FROM security_incidents')
-        stats['securityIncidents'] = cursor.fetchone()[0]
-        cursor.execute("SELECT COUNT(*) FROM security_incidents WHERE status = 'مفتوحة' OR status = 'open'")
-        stats['openIncidents'] = cursor.fetchone()[0]
-        
-        # Visitors
-        cursor.execute('SELECT COUNT(*) FROM visitors')
-        stats['visitors'] = cursor.fetchone()[0]
-        
-        # Complaints
-        cursor.execute('SELECT COUNT(*) FROM complaints')
-        stats['complaints'] = cursor.fetchone()[0]
-        cursor.execute("SELECT COUNT(*) FROM complaints WHERE status = 'مفتوحة' OR status = 'open'")
-        stats['openComplaints'] = cursor.fetchone()[0]
-        
-        # Users
-        cursor.execute('SELECT COUNT(*) FROM users')
-        stats['users'] = cursor.fetchone()[0]
-        cursor.execute('SELECT COUNT(*) FROM users WHERE is_active = 1')
-        stats['activeUsers'] = cursor.fetchone()[0]
-        
-        # Active sessions
-        cursor.execute('SELECT COUNT(*) FROM sessions WHERE expires_at > datetime("now")')
-        stats['activeSessions'] = cursor.fetchone()[0]
-        
-        conn.close()
-        
+        stats = data_cache.get_or_compute('system_stats', SYSTEM_STATS_TABLES, compute_system_stats)
         return jsonify(stats)
         
     except Exception as e:
@@ -1056,11 +1016,10 @@ def health_check():
     """
     try:
         # Test database connection
-        conn = database.get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT 1')
-        cursor.fetchone()
-        conn.close()
+        with database.pooled_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
         
         return jsonify({
             'status': 'healthy',
@@ -1082,36 +1041,21 @@ def health_check():
 def get_statistics():
     """Get statistics for unified dashboard"""
     try:
-        conn = database.get_db_connection()
-        cursor = conn.cursor()
-        
-        stats = {}
-        
-        # Total residents
-        cursor.execute('SELECT COUNT(*) FROM residents')
-        stats['total_residents'] = cursor.fetchone()[0]
-        
-        # Total buildings
-        cursor.execute('SELECT COUNT(*) FROM buildings')
-        stats['total_buildings'] = cursor.fetchone()[0]
-        
-        # Total stickers
-        cursor.execute('SELECT COUNT(*) FROM stickers')
-        stats['total_stickers'] = cursor.fetchone()[0]
-        
-        # Total units (apartments)
-        cursor.execute('SELECT COUNT(*) FROM apartments')
-        stats['total_units'] = cursor.fetchone()[0]
-        
-        # Total parking spots
-        cursor.execute('SELECT COUNT(*) FROM parking_spots')
-        stats['total_parking'] = cursor.fetchone()[0]
-        
-        # Active violations
-        cursor.execute("SELECT COUNT(*) FROM traffic_violations WHERE status = 'نشط' OR status = 'active'")
-        stats['active_violations'] = cursor.fetchone()[0]
-        
-        conn.close()
+        with database.pooled_connection() as conn:
+            cursor = conn.cursor()
+
+            counts = rollups.read_counts(cursor, [
+                'residents', 'buildings', 'stickers', 'apartments', 'parking_spots', 'traffic_violations'
+            ])
+        
+        stats = {
+            'total_residents': rollups.count(counts, 'residents'),
+            'total_buildings': rollups.count(counts, 'buildings'),
+            'total_stickers': rollups.count(counts, 'stickers'),
+            'total_units': rollups.count(counts, 'apartments'),
+            'total_parking': rollups.count(counts, 'parking_spots'),
+            'active_violations': rollups.count(counts, 'traffic_violations', 'status', ('نشط', 'active'))
+        }
         
         return jsonify({
             'success': True,
@@ -1126,63 +1070,55 @@ def get_statistics():
             'error_ar': 'فشل في الحصول على الإحصائيات'
         }), 500
 
+# Residents list shared by /api/residents and /api/residents-list
+RESIDENTS_QUERY = pagination.ListQuery(
+    columns='''r.id, r.name, r.national_id, r.email, r.phone, r.department,
+               r.job_title, r.unit_number, r.move_in_date, r.move_out_date,
+               r.is_active, b.building_number, b.name as building_name''',
+    source='residents r LEFT JOIN buildings b ON r.building_id = b.id',
+    id_column='r.id',
+    sorts={
+        'id': [],
+        'name': ["COALESCE(r.name, '')"],
+        'building': ["COALESCE(b.building_number, '')", "COALESCE(r.unit_number, '')", "COALESCE(r.name, '')"],
+    },
+    default_sort='building',
+    filters={
+        'building_id': ('r.building_id = ?', int),
+        'is_active': ('r.is_active = ?', int),
+        'department': ('r.department = ?', str),
+    },
+    search_columns=('r.name', 'r.national_id', 'r.phone', 'r.unit_number')
+)
+
+
+def resident_json(row):
+    """JSON representation of a resident row"""
+    return {
+        'id': row[0],
+        'name': row[1],
+        'national_id': row[2],
+        'email': row[3],
+        'phone': row[4],
+        'department': row[5],
+        'job_title': row[6],
+        'unit_number': row[7],
+        'move_in_date': row[8],
+        'move_out_date': row[9],
+        'is_active': row[10],
+        'building_number': row[11],
+        'building_name': row[12]
+    }
+
+
 @app.route('/api/residents')
 def get_residents():
     """Get all residents with their unit information"""
     try:
-        conn = database.get_db_connection()
-        cursor = conn.cursor()
-        
-        # Get residents with building information
-        query = """
-        SELECT 
-            r.id,
-            r.name,
-            r.national_id,
-            r.email,
-            r.phone,
-            r.department,
-            r.job_title,
-            r.unit_number,
-            r.move_in_date,
-            r.move_out_date,
-            r.is_active,
-            b.building_number,
-            b.name as building_name
-        FROM residents r
-        LEFT JOIN buildings b ON r.building_id = b.id
-        ORDER BY r.id ASC
-        """
-        
-        cursor.execute(query)
-        rows = cursor.fetchall()
-        
-        # Format the data
-        residents = []
-        for row in rows:
-            residents.append({
-                'id': row[0],
-                'name': row[1],
-                'national_id': row[2],
-                'email': row[3],
-                'phone': row[4],
-                'department': row[5],
-                'job_title': row[6],
-                'unit_number': row[7],
-                'move_in_date': row[8],
-                'move_out_date': row[9],
-                'is_active': row[10],
-                'building_number': row[11],
-                'building_name': row[12]
-            })
-        
-        conn.close()
-        
-        return jsonify({
-            'success': True,
-            'data': residents
-        })
+        return list_response(RESIDENTS_QUERY, resident_json, default_sort='id', include_total=False)
         
+    except pagination.PaginationError as e:
+        return pagination_error_response(e)
     except Exception as e:
         app.logger.error(f'Residents API error: {str(e)}')
         return jsonify({
@@ -1195,45 +1131,43 @@ def get_residents():
 def get_violation_report():
     """Get violation report with resident information"""
     try:
-        conn = database.get_db_connection()
-        cursor = conn.cursor()
-        
-        # Get violations with resident information
-        query = """
-        SELECT 
-            v.plate_number,
-            COUNT(tv.id) as violation_count,
-            v.vehicle_type,
-            MAX(tv.violation_date) as latest_violation,
-            r.name as resident_name,
-            b.building_number,
-            r.unit_number
-        FROM traffic_violations tv
-        LEFT JOIN vehicles v ON tv.vehicle_id = v.id
-        LEFT JOIN residents r ON v.owner_id = r.id
-        LEFT JOIN buildings b ON r.building_id = b.id
-        WHERE v.plate_number IS NOT NULL
-        GROUP BY v.plate_number
-        ORDER BY violation_count DESC, latest_violation DESC
-        """
-        
-        cursor.execute(query)
-        rows = cursor.fetchall()
-        
-        # Format the data
-        violations = []
-        for row in rows:
-            violations.append({
-                'plateNumber': row[0],
-                'violationCount': row[1],
-                'vehicleType': row[2],
-                'processingDate': row[3],
-                'residentName': row[4],
-                'buildingNumber': row[5],
-                'unitNumber': row[6]
-            })
-        
-        conn.close()
+        with database.pooled_connection() as conn:
+            cursor = conn.cursor()
+
+            # Get violations with resident information
+            query = """
+            SELECT 
+                v.plate_number,
+                COUNT(tv.id) as violation_count,
+                v.vehicle_type,
+                MAX(tv.violation_date) as latest_violation,
+                r.name as resident_name,
+                b.building_number,
+                r.unit_number
+            FROM traffic_violations tv
+            LEFT JOIN vehicles v ON tv.vehicle_id = v.id
+            LEFT JOIN residents r ON v.owner_id = r.id
+            LEFT JOIN buildings b ON r.building_id = b.id
+            WHERE v.plate_number IS NOT NULL
+            GROUP BY v.plate_number
+            ORDER BY violation_count DESC, latest_violation DESC
+            """
+
+            cursor.execute(query)
+            rows = cursor.fetchall()
+
+            # Format the data
+            violations = []
+            for row in rows:
+                violations.append({
+                    'plateNumber': row[0],
+                    'violationCount': row[1],
+                    'vehicleType': row[2],
+                    'processingDate': row[3],
+                    'residentName': row[4],
+                    'buildingNumber': row[5],
+                    'unitNumber': row[6]
+                })
         
         return jsonify({
             'success': True,
@@ -1255,64 +1189,10 @@ def get_violation_report():
 def get_residents_list():
     """Get all residents with building info"""
     try:
-        conn = database.get_db_connection()
-        cursor = conn.cursor()
-        
-        building_id = request.args.get('building_id', type=int)
-        is_active = request.args.get('is_active', type=int)
-        
-        query = '''
-            SELECT r.id, r.name, r.national_id, r.email, r.phone, r.department, 
-                   r.job_title, r.unit_number, r.move_in_date, r.move_out_date, 
-                   r.is_active, b.name as building_name, b.building_number
-            FROM residents r
-            LEFT JOIN buildings b ON r.building_id = b.id
-        '''
-        
-        conditions = []
-        params = []
-        
-        if building_id:
-            conditions.append('r.building_id = ?')
-            params.append(building_id)
-        
-        if is_active is not None:
-            conditions.append('r.is_active = ?')
-            params.append(is_active)
-        
-        if conditions:
-            query += ' WHERE ' + ' AND '.join(conditions)
-        
-        query += ' ORDER BY b.building_number, r.unit_number, r.name'
-        
-        cursor.execute(query, params)
-        
-        residents = []
-        for row in cursor.fetchall():
-            residents.append({
-                'id': row[0],
-                'name': row[1],
-                'national_id': row[2],
-                'email': row[3],
-                'phone': row[4],
-                'department': row[5],
-                'job_title': row[6],
-                'unit_number': row[7],
-                'move_in_date': row[8],
-                'move_out_date': row[9],
-                'is_active': row[10],
-                'building_name': row[11],
-                'building_number': row[12]
-            })
-        
-        conn.close()
-        
-        return jsonify({
-            'success': True,
-            'data': residents,
-            'total': len(residents)
-        })
+        return list_response(RESIDENTS_QUERY, resident_json)
         
+    except pagination.PaginationError as e:
+        return pagination_error_response(e)
     except Exception as e:
         app.logger.error(f'Residents API error: {str(e)}')
         return jsonify({
@@ -1321,53 +1201,48 @@ def get_residents_list():
             'error_ar': 'فشل في تحميل بيانات السكان'
         }), 500
 
+APARTMENTS_QUERY = pagination.ListQuery(
+    columns='''a.id, a.unit_number, a.floor_number, a.unit_type, a.is_occupied,
+               b.name as building_name, b.building_number''',
+    source='apartments a JOIN buildings b ON a.building_id = b.id',
+    id_column='a.id',
+    sorts={
+        'building': ['b.building_number', 'COALESCE(a.floor_number, 0)', 'a.unit_number'],
+        'unit': ['a.unit_number'],
+    },
+    default_sort='building',
+    filters={
+        'building_id': ('a.building_id = ?', int),
+        'is_occupied': ('a.is_occupied = ?', int),
+        'floor': ('a.floor_number = ?', int),
+        'unit_type': ('a.unit_type = ?', str),
+    },
+    search_columns=('a.unit_number', 'b.name', 'b.building_number')
+)
+
+
+def apartment_json(row):
+    """JSON representation of an apartment row"""
+    return {
+        'id': row[0],
+        'unit_number': row[1],
+        'floor_number': row[2],
+        'unit_type': row[3],
+        'is_occupied': row[4],
+        'building_name': row[5],
+        'building_number': row[6]
+    }
+
+
 @app.route('/api/apartments')
+@response_cache.versioned_response('apartments', 'buildings')
 def get_apartments():
     """Get all apartments with building info"""
     try:
-        conn = database.get_db_connection()
-        cursor = conn.cursor()
-        
-        building_id = request.args.get('building_id', type=int)
-        
-        if building_id:
-            cursor.execute('''
-                SELECT a.id, a.unit_number, a.floor_number, a.unit_type, a.is_occupied,
-                       b.name as building_name, b.building_number
-                FROM apartments a
-                JOIN buildings b ON a.building_id = b.id
-                WHERE a.building_id = ?
-                ORDER BY a.floor_number, a.unit_number
-            ''', (building_id,))
-        else:
-            cursor.execute('''
-                SELECT a.id, a.unit_number, a.floor_number, a.unit_type, a.is_occupied,
-                       b.name as building_name, b.building_number
-                FROM apartments a
-                JOIN buildings b ON a.building_id = b.id
-                ORDER BY b.building_number, a.floor_number, a.unit_number
-            ''')
-        
-        apartments = []
-        for row in cursor.fetchall():
-            apartments.append({
-                'id': row[0],
-                'unit_number': row[1],
-                'floor_number': row[2],
-                'unit_type': row[3],
-                'is_occupied': row[4],
-                'building_name': row[5],
-                'building_number': row[6]
-            })
-        
-        conn.close()
-        
-        return jsonify({
-            'success': True,
-            'data': apartments,
-            'total': len(apartments)
-        })
+        return list_response(APARTMENTS_QUERY, apartment_json)
         
+    except pagination.PaginationError as e:
+        return pagination_error_response(e)
     except Exception as e:
         app.logger.error(f'Apartments API error: {str(e)}')
         return jsonify({
@@ -1376,57 +1251,52 @@ def get_apartments():
             'error_ar': 'فشل في تحميل بيانات الشقق'
         }), 500
 
+PARKING_SPOTS_QUERY = pagination.ListQuery(
+    columns='''p.id, p.spot_number, p.parking_area, p.is_occupied,
+               b.name as building_name, b.building_number,
+               a.unit_number''',
+    source='''parking_spots p
+               LEFT JOIN buildings b ON p.building_id = b.id
+               LEFT JOIN apartments a ON p.apartment_id = a.id''',
+    id_column='p.id',
+    sorts={
+        'area': ['p.parking_area', 'p.spot_number'],
+        'spot': ['p.spot_number'],
+    },
+    default_sort='area',
+    filters={
+        'building_id': ('p.building_id = ?', int),
+        'is_occupied': ('p.is_occupied = ?', int),
+        'parking_area': ('p.parking_area = ?', str),
+    },
+    search_columns=('p.spot_number', 'p.parking_area', 'a.unit_number')
+)
+
+
+def parking_spot_json(row):
+    """JSON representation of a parking spot row"""
+    return {
+        'id': row[0],
+        'spot_number': row[1],
+        'parking_area': row[2],
+        'is_occupied': row[3],
+        'building_name': row[4],
+        'building_number': row[5],
+        'unit_number': row[6]
+    }
+
+
 @app.route('/api/parking-spots')
+@response_cache.versioned_response('parking_spots', 'buildings', 'apartments')
 def get_parking_spots():
     """Get all parking spots with building and apartment info"""
     try:
-        conn = database.get_db_connection()
-        cursor = conn.cursor()
-        
-        building_id = request.args.get('building_id', type=int)
-        
-        if building_id:
-            cursor.execute('''
-                SELECT p.id, p.spot_number, p.parking_area, p.is_occupied,
-                       b.name as building_name, b.building_number,
-                       a.unit_number
-                FROM parking_spots p
-                LEFT JOIN buildings b ON p.building_id = b.id
-                LEFT JOIN apartments a ON p.apartment_id = a.id
-                WHERE p.building_id = ?
-                ORDER BY p.spot_number
-            ''', (building_id,))
-        else:
-            cursor.execute('''
-                SELECT p.id, p.spot_number, p.parking_area, p.is_occupied,
-                       b.name as building_name, b.building_number,
-                       a.unit_number
-                FROM parking_spots p
-                LEFT JOIN buildings b ON p.building_id = b.id
-                LEFT JOIN apartments a ON p.apartment_id = a.id
-                ORDER BY p.parking_area, p.spot_number
-            ''')
-        
-        parking_spots = []
-        for row in cursor.fetchall():
-            parking_spots.append({
-                'id': row[0],
-                'spot_number': row[1],
-                'parking_area': row[2],
-                'is_occupied': row[3],
-                'building_name': row[4],
-                'building_number': row[5],
-                'unit_number': row[6]
-            })
-        
-        conn.close()
-        
-        return jsonify({
-            'success': True,
-            'data': parking_spots,
-            'total': len(parking_spots)
-        })
+        # Spots of a single building were always listed by spot number alone
+        default_sort = 'spot' if request.args.get('building_id') else 'area'
+        return list_response(PARKING_SPOTS_QUERY, parking_spot_json, default_sort=default_sort)
         
+    except pagination.PaginationError as e:
+        return pagination_error_response(e)
     except Exception as e:
         app.logger.error(f'Parking spots API error: {str(e)}')
         return jsonify({
@@ -1435,53 +1305,61 @@ def get_parking_spots():
             'error_ar': 'فشل في تحميل بيانات المواقف'
         }), 500
 
+STICKERS_QUERY = pagination.ListQuery(
+    columns='''s.id, s.sticker_number, s.plate_number, s.vehicle_type,
+               s.issue_date, s.expiry_date, s.status,
+               r.name as resident_name, r.national_id, r.phone,
+               r.department, r.job_title, r.unit_number,
+               b.name as building_name, b.building_number''',
+    source='''stickers s
+               LEFT JOIN residents r ON s.resident_id = r.id
+               LEFT JOIN buildings b ON r.building_id = b.id''',
+    id_column='s.id',
+    sorts={
+        'sticker': ['s.sticker_number'],
+        'plate': ['s.plate_number'],
+        # DATE(...) is a function in SQLite and a cast in PostgreSQL, so both get a date-typed fallback
+        'expiry': ["COALESCE(s.expiry_date, DATE('0001-01-01'))"],
+    },
+    default_sort='sticker',
+    filters={
+        'status': ('s.status = ?', str),
+        'building_id': ('r.building_id = ?', int),
+        'resident_id': ('s.resident_id = ?', int),
+    },
+    search_columns=('s.sticker_number', 's.plate_number', 'r.name', 'r.national_id')
+)
+
+
+def sticker_json(row):
+    """JSON representation of a sticker row"""
+    return {
+        'id': row[0],
+        'sticker_number': row[1],
+        'plate_number': row[2],
+        'vehicle_type': row[3],
+        'issue_date': row[4],
+        'expiry_date': row[5],
+        'status': row[6],
+        'resident_name': row[7],
+        'national_id': row[8],
+        'phone': row[9],
+        'department': row[10],
+        'job_title': row[11],
+        'unit_number': row[12],
+        'building_name': row[13],
+        'building_number': row[14]
+    }
+
+
 @app.route('/api/stickers')
 def get_stickers():
     """Get all stickers data with resident information"""
     try:
-        conn = database.get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT s.id, s.sticker_number, s.plate_number, s.vehicle_type, 
-                   s.issue_date, s.expiry_date, s.status,
-                   r.name as resident_name, r.national_id, r.phone,
-                   r.department, r.job_title, r.unit_number,
-                   b.name as building_name, b.building_number
-            FROM stickers s
-            LEFT JOIN residents r ON s.resident_id = r.id
-            LEFT JOIN buildings b ON r.building_id = b.id
-            ORDER BY s.sticker_number
-        ''')
-        
-        stickers = []
-        for row in cursor.fetchall():
-            stickers.append({
-                'id': row[0],
-                'sticker_number': row[1],
-                'plate_number': row[2],
-                'vehicle_type': row[3],
-                'issue_date': row[4],
-                'expiry_date': row[5],
-                'status': row[6],
-                'resident_name': row[7],
-                'national_id': row[8],
-                'phone': row[9],
-                'department': row[10],
-                'job_title': row[11],
-                'unit_number': row[12],
-                'building_name': row[13],
-                'building_number': row[14]
-            })
-        
-        conn.close()
-        
-        return jsonify({
-            'success': True,
-            'data': stickers,
-            'total': len(stickers)
-        })
+        return list_response(STICKERS_QUERY, sticker_json)
         
+    except pagination.PaginationError as e:
+        return pagination_error_response(e)
     except Exception as e:
         app.logger.error(f'Stickers API error: {str(e)}')
         return jsonify({
@@ -1490,41 +1368,43 @@ def get_stickers():
             'error_ar': 'فشل في تحميل بيانات الملصقات'
         }), 500
 
+BUILDINGS_QUERY = pagination.ListQuery(
+    columns='''id, name, building_number, address, total_units, total_floors,
+               created_at, updated_at''',
+    source='buildings',
+    id_column='id',
+    sorts={
+        'number': ['building_number'],
+        'name': ['name'],
+    },
+    default_sort='number',
+    search_columns=('name', 'building_number', 'address')
+)
+
+
+def building_json(row):
+    """JSON representation of a building row"""
+    return {
+        'id': row[0],
+        'name': row[1],
+        'building_number': row[2],
+        'address': row[3],
+        'total_units': row[4],
+        'total_floors': row[5],
+        'created_at': row[6],
+        'updated_at': row[7]
+    }
+
+
 @app.route('/api/buildings')
+@response_cache.versioned_response('buildings')
 def get_buildings():
     """Get all buildings data"""
     try:
-        conn = database.get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT id, name, building_number, address, total_units, total_floors, 
-                   created_at, updated_at
-            FROM buildings
-            ORDER BY building_number
-        ''')
-        
-        buildings = []
-        for row in cursor.fetchall():
-            buildings.append({
-                'id': row[0],
-                'name': row[1],
-                'building_number': row[2],
-                'address': row[3],
-                'total_units': row[4],
-                'total_floors': row[5],
-                'created_at': row[6],
-                'updated_at': row[7]
-            })
-        
-        conn.close()
-        
-        return jsonify({
-            'success': True,
-            'data': buildings,
-            'total': len(buildings)
-        })
+        return list_response(BUILDINGS_QUERY, building_json)
         
+    except pagination.PaginationError as e:
+        return pagination_error_response(e)
     except Exception as e:
         app.logger.error(f'Buildings API error: {str(e)}')
         return jsonify({
@@ -1537,114 +1417,87 @@ def get_buildings():
 def get_comprehensive_reports():
     """Get comprehensive system reports data"""
     try:
-        conn = database.get_db_connection()
-        cursor = conn.cursor()
-        
-        reports = {}
-        
-        # Residents summary
-        cursor.execute('SELECT COUNT(*) FROM residents WHERE is_active = 1')
-        reports['totalResidents'] = cursor.fetchone()[0]
-        
-        cursor.execute('SELECT COUNT(*) FROM residents WHERE is_active = 0')
-        reports['inactiveResidents'] = cursor.fetchone()[0]
-        
-        # Buildings summary
-        cursor.execute('SELECT COUNT(*) FROM buildings')
-        reports['totalBuildings'] = cursor.fetchone()[0]
-        
-        # Violations summary
-        cursor.execute('SELECT COUNT(*) FROM traffic_violations')
-        reports['totalViolations'] = cursor.fetchone()[0]
-        
-        cursor.execute("""
-            SELECT COUNT(*) FROM traffic_violations 
-            WHERE status IN ('pending', 'open', 'مفتوحة', 'معلقة')
-        """)
-        reports['openViolations'] = cursor.fetchone()[0]
-        
-        # Security incidents
-        cursor.execute('SELECT COUNT(*) FROM security_incidents')
-        reports['totalIncidents'] = cursor.fetchone()[0]
-        
-        cursor.execute("""
-            SELECT COUNT(*) FROM security_incidents 
-            WHERE status IN ('reported', 'open', 'مفتوحة')
-        """)
-        reports['openIncidents'] = cursor.fetchone()[0]
-        
-        # Complaints
-        cursor.execute('SELECT COUNT(*) FROM complaints')
-        reports['totalComplaints'] = cursor.fetchone()[0]
-        
-        cursor.execute("""
-            SELECT COUNT(*) FROM complaints 
-            WHERE status IN ('open', 'مفتوحة')
-        """)
-        reports['openComplaints'] = cursor.fetchone()[0]
-        
-        cursor.execute("""
-            SELECT COUNT(*) FROM complaints 
-            WHERE status IN ('resolved', 'محلولة', 'closed', 'مغلقة')
-        """)
-        reports['resolvedComplaints'] = cursor.fetchone()[0]
-        
-        # Vehicles and parking
-        cursor.execute('SELECT COUNT(*) FROM vehicles WHERE is_active = 1')
-        reports['activeVehicles'] = cursor.fetchone()[0]
-        
-        # Monthly occupancy trend (last 7 months)
-        # TODO: Calculate from actual residents data when available
-        reports['occupancyTrend'] = {
-            'labels': ['يناير', 'فبراير', 'مارس', 'أبريل', 'مايو', 'يونيو', 'يوليو'],
-            'data': [85, 87, 89, 91, 88, 90, 92]  # Mock data - requires residents data
-        }
-        
-        # Violations by type
-        cursor.execute("""
-            SELECT violation_type, COUNT(*) as count
-            FROM traffic_violations
-            GROUP BY violation_type
-            ORDER BY count DESC
-            LIMIT 5
-        """)
-        violation_types = cursor.fetchall()
-        reports['violationsByType'] = {
-            'labels': [row[0] for row in violation_types] if violation_types else ['وقوف ممنوع', 'عكس سير', 'مواقف ذوي الاحتياجات', 'عدم التقيد بالإشارات'],
-            'data': [row[1] for row in violation_types] if violation_types else [15, 12, 6, 5]
-        }
-        
-        # Security incidents trend (last 7 months)
-        # TODO: Group by month when sufficient data exists
-        reports['securityTrend'] = {
-            'labels': ['يناير', 'فبراير', 'مارس', 'أبريل', 'مايو', 'يونيو', 'يوليو'],
-            'data': [8, 6, 10, 7, 9, 11, 12]  # Mock data - will be replaced with real aggregation
-        }
-        
-        # Complaints trend
-        # TODO: Calculate from actual complaints data with monthly grouping
-        reports['complaintsTrend'] = {
-            'labels': ['يناير', 'فبراير', 'مارس', 'أبريل', 'مايو', 'يونيو', 'يوليو'],
-            'new': [25, 30, 28, 35, 32, 29, 31],  # Mock data
-            'resolved': [23, 28, 26, 33, 30, 27, 29]  # Mock data
-        }
-        
-        # Residents by building
-        cursor.execute("""
-            SELECT b.name, COUNT(r.id) as count
-            FROM buildings b
-            LEFT JOIN residents r ON b.id = r.building_id AND r.is_active = 1
-            GROUP BY b.id, b.name
-            ORDER BY count DESC
-            LIMIT 4
-        """)
-        residents_by_building = cursor.fetchall()
-        reports['residentsByBuilding'] = {
-            'labels': [row[0] for row in residents_by_building] if residents_by_building else ['المبنى 1', 'المبنى 2', 'المبنى 3', 'الفلل'],
-            'data': [row[1] for row in residents_by_building] if residents_by_building else [65, 58, 72, 50]
-        }
-        
-        conn.close()
+        with database.pooled_connection() as conn:
+            cursor = conn.cursor()
+
+            # All counters come from the trigger-maintained rollup_counts table
+            counts = rollups.read_counts(cursor, [
+                'residents', 'buildings', 'apartments', 'traffic_violations', 'security_incidents',
+                'complaints', 'vehicles'
+            ])
+
+            reports = {}
+
+            # Residents summary
+            reports['totalResidents'] = rollups.count(counts, 'residents', 'is_active', (1,))
+            reports['inactiveResidents'] = rollups.count(counts, 'residents', 'is_active', (0,))
+
+            # Buildings summary
+            reports['totalBuildings'] = rollups.count(counts, 'buildings')
+
+            # Violations summary
+            reports['totalViolations'] = rollups.count(counts, 'traffic_violations')
+            reports['openViolations'] = rollups.count(
+                counts, 'traffic_violations', 'status', ('pending', 'open', 'مفتوحة', 'معلقة'))
+
+            # Security incidents
+            reports['totalIncidents'] = rollups.count(counts, 'security_incidents')
+            reports['openIncidents'] = rollups.count(
+                counts, 'security_incidents', 'status', ('reported', 'open', 'مفتوحة'))
+
+            # Complaints
+            reports['totalComplaints'] = rollups.count(counts, 'complaints')
+            reports['openComplaints'] = rollups.count(counts, 'complaints', 'status', ('open', 'مفتوحة'))
+            reports['resolvedComplaints'] = rollups.count(
+                counts, 'complaints', 'status', ('resolved', 'محلولة', 'closed', 'مغلقة'))
+
+            # Vehicles and parking
+            reports['activeVehicles'] = rollups.count(counts, 'vehicles', 'is_active', (1,))
+
+            # Monthly trends (last 7 months): closed months come from stored buckets,
+            # only the current month is counted on each request
+            trend = trends.get_trends(cursor, [
+                'residents_occupied', 'security_incidents', 'complaints_new', 'complaints_resolved'
+            ], months=7)
+            trend_labels = [trends.month_label(month) for month in trend['months']]
+            total_units = rollups.count(counts, 'apartments')
+
+            reports['occupancyTrend'] = {
+                'labels': trend_labels,
+                'data': [round(occupied / total_units * 100, 1) if total_units else 0
+                         for occupied in trend['residents_occupied']]
+            }
+
+            # Violations by type
+            violation_types = rollups.top_values(counts, 'traffic_violations', 'violation_type', limit=5)
+            reports['violationsByType'] = {
+                'labels': [row[0] for row in violation_types] if violation_types else ['وقوف ممنوع', 'عكس سير', 'مواقف ذوي الاحتياجات', 'عدم التقيد بالإشارات'],
+                'data': [row[1] for row in violation_types] if violation_types else [15, 12, 6, 5]
+            }
+
+            # Security incidents trend
+            reports['securityTrend'] = {
+                'labels': trend_labels,
+                'data': trend['security_incidents']
+            }
+
+            # Complaints trend
+            reports['complaintsTrend'] = {
+                'labels': trend_labels,
+                'new': trend['complaints_new'],
+                'resolved': trend['complaints_resolved']
+            }
+
+            # Residents by building (active residents per building are counted by the rollups)
+            cursor.execute('SELECT id, name FROM buildings')
+            residents_by_building = sorted(
+                [(row['name'], counts.get(f"residents.building.{row['id']}", 0)) for row in cursor.fetchall()],
+                key=lambda pair: pair[1], reverse=True
+            )[:4]
+            reports['residentsByBuilding'] = {
+                'labels': [row[0] for row in residents_by_building] if residents_by_building else ['المبنى 1', 'المبنى 2', 'المبنى 3', 'الفلل'],
+                'data': [row[1] for row in residents_by_building] if residents_by_building else [65, 58, 72, 50]
+            }
         
         return jsonify({
             'success': True,
@@ -1708,18 +1561,16 @@ def upload_car_images():
                 car_image_analyzer.create_thumbnail(image_path, thumbnail_path)
                 
                 # Save to database
-                conn = database.get_db_connection()
-                cursor = conn.cursor()
-                
-                cursor.execute('''
-                    INSERT INTO car_images 
-                    (original_filename, image_path, thumbnail_path, uploaded_by)
-                    VALUES (?, ?, ?, ?)
-                ''', (filename, image_path, thumbnail_path, user['id']))
-                
-                car_image_id = cursor.lastrowid
-                conn.commit()
-                conn.close()
+                with database.pooled_connection() as conn:
+                    cursor = conn.cursor()
+
+                    cursor.execute('''
+                        INSERT INTO car_images 
+                        (original_filename, image_path, thumbnail_path, uploaded_by)
+                        VALUES (?, ?, ?, ?)
+                    ''', (filename, image_path, thumbnail_path, user['id']))
+
+                    car_image_id = cursor.lastrowid
                 
                 # Analyze image
                 analysis = car_image_analyzer.analyze_car_image(image_path)
@@ -1815,98 +1666,36 @@ def export_car_analysis(format):
     """
     Export car analysis data in specified format (excel, pdf, html)
     تصدير بيانات تحليل السيارات بالتنسيق المحدد
+    
+    Add ?async=true to run the export as a background job.
     """
     try:
-        user = request.user
+        exporters = {
+            'excel': car_data_exporter.export_to_excel,
+            'pdf': car_data_exporter.export_to_pdf,
+            'html': car_data_exporter.export_to_html,
+        }
+        if format not in exporters:
+            return unsupported_export_format(format)
         
         # Get filter params from request
         filter_params = request.get_json() if request.is_json else None
         
-        # Get data
-        records = car_data_exporter.get_car_analysis_records(filter_params)
-        
-        if not records:
-            return jsonify({
-                'success': False,
-                'error': 'No data to export',
-                'error_ar': 'لا توجد بيانات للتصدير'
-            }), 400
+        def render(output_path, progress):
+            records = car_data_exporter.get_car_analysis_records(filter_params)
+            if not records:
+                raise export_jobs.ExportError('No data to export', 'لا توجد بيانات للتصدير')
+            progress(30)
+            if not exporters[format](records, output_path):
+                raise export_jobs.ExportError('Export failed', 'فشل التصدير', 500)
         
-        # Generate filename
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        
-        if format == 'excel':
-            filename = f'car_analysis_{timestamp}.xlsx'
-            output_path = os.path.join(EXPORT_FOLDER, filename)
-            
-            success = car_data_exporter.export_to_excel(records, output_path)
-            
-            if success:
-                database.log_audit(
-                    user['id'],
-                    f'Exported car analysis to Excel',
-                    ip_address=request.remote_addr
-                )
-                
-                return send_file(
-                    output_path,
-                    mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-                    as_attachment=True,
-                    download_name=filename
-                )
-        
-        elif format == 'pdf':
-            filename = f'car_analysis_{timestamp}.pdf'
-            output_path = os.path.join(EXPORT_FOLDER, filename)
-            
-            success = car_data_exporter.export_to_pdf(records, output_path)
-            
-            if success:
-                database.log_audit(
-                    user['id'],
-                    f'Exported car analysis to PDF',
-                    ip_address=request.remote_addr
-                )
-                
-                return send_file(
-                    output_path,
-                    mimetype='application/pdf',
-                    as_attachment=True,
-                    download_name=filename
-                )
-        
-        elif format == 'html':
-            filename = f'car_analysis_{timestamp}.html'
-            output_path = os.path.join(EXPORT_FOLDER, filename)
-            
-            success = car_data_exporter.export_to_html(records, output_path)
-            
-            if success:
-                database.log_audit(
-                    user['id'],
-                    f'Exported car analysis to HTML',
-                    ip_address=request.remote_addr
-                )
-                
-                return send_file(
-                    output_path,
-                    mimetype='text/html',
-                    as_attachment=True,
-                    download_name=filename
-                )
-        
-        else:
-            return jsonify({
-                'success': False,
-                'error': f'Unsupported export format: {format}',
-                'error_ar': f'تنسيق التصدير غير مدعوم: {format}'
-            }), 400
-        
-        return jsonify({
-            'success': False,
-            'error': 'Export failed',
-            'error_ar': 'فشل التصدير'
-        }), 500
+        return export_response(
+            'car-analysis',
+            f'car_analysis_{timestamp}.{EXPORT_FORMATS[format][0]}',
+            render,
+            f'Exported car analysis to {EXPORT_FORMATS[format][2]}'
+        )
         
     except Exception as e:
         app.logger.error(f'Export car analysis error: {str(e)}')
@@ -1925,12 +1714,11 @@ def get_car_thumbnail(image_id):
     الحصول على صورة مصغرة لصورة السيارة
     """
     try:
-        conn = database.get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT thumbnail_path FROM car_images WHERE id = ?', (image_id,))
-        row = cursor.fetchone()
-        conn.close()
+        with database.pooled_connection() as conn:
+            cursor = conn.cursor()
+
+            cursor.execute('SELECT thumbnail_path FROM car_images WHERE id = ?', (image_id,))
+            row = cursor.fetchone()
         
         if not row or not row[0]:
             return jsonify({
@@ -1967,9 +1755,17 @@ def export_vehicle_report(vehicle_id, format):
     """
     Export single vehicle report with violations
     تصدير تقرير سيارة واحدة مع المخالفات
+    
+    Add ?async=true to run the export as a background job.
     """
     try:
-        user = request.user
+        exporters = {
+            'excel': vehicle_report_exporter.export_vehicle_to_excel,
+            'pdf': vehicle_report_exporter.export_vehicle_to_pdf,
+            'html': vehicle_report_exporter.export_vehicle_to_html,
+        }
+        if format not in exporters:
+            return unsupported_export_format(format)
         
         # Get vehicle with violations
         vehicle = vehicle_report_exporter.get_vehicle_with_violations(vehicle_id)
@@ -1981,82 +1777,20 @@ def export_vehicle_report(vehicle_id, format):
                 'error_ar': 'السيارة غير موجودة'
             }), 404
         
+        def render(output_path, progress):
+            if not exporters[format](vehicle, output_path):
+                raise export_jobs.ExportError('Export failed', 'فشل التصدير', 500)
+        
         # Generate filename
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         plate = vehicle.get('plate_number', 'unknown').replace(' ', '_')
         
-        if format == 'excel':
-            filename = f'vehicle_report_{plate}_{timestamp}.xlsx'
-            output_path = os.path.join(EXPORT_FOLDER, filename)
-            
-            success = vehicle_report_exporter.export_vehicle_to_excel(vehicle, output_path)
-            
-            if success:
-                database.log_audit(
-                    user['id'],
-                    f'Exported vehicle report to Excel: {vehicle.get("plate_number")}',
-                    ip_address=request.remote_addr
-                )
-                
-                return send_file(
-                    output_path,
-                    mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-                    as_attachment=True,
-                    download_name=filename
-                )
-        
-        elif format == 'pdf':
-            filename = f'vehicle_report_{plate}_{timestamp}.pdf'
-            output_path = os.path.join(EXPORT_FOLDER, filename)
-            
-            success = vehicle_report_exporter.export_vehicle_to_pdf(vehicle, output_path)
-            
-            if success:
-                database.log_audit(
-                    user['id'],
-                    f'Exported vehicle report to PDF: {vehicle.get("plate_number")}',
-                    ip_address=request.remote_addr
-                )
-                
-                return send_file(
-                    output_path,
-                    mimetype='application/pdf',
-                    as_attachment=True,
-                    download_name=filename
-                )
-        
-        elif format == 'html':
-            filename = f'vehicle_report_{plate}_{timestamp}.html'
-            output_path = os.path.join(EXPORT_FOLDER, filename)
-            
-            success = vehicle_report_exporter.export_vehicle_to_html(vehicle, output_path)
-            
-            if success:
-                database.log_audit(
-                    user['id'],
-                    f'Exported vehicle report to HTML: {vehicle.get("plate_number")}',
-                    ip_address=request.remote_addr
-                )
-                
-                return send_file(
-                    output_path,
-                    mimetype='text/html',
-                    as_attachment=True,
-                    download_name=filename
-                )
-        
-        else:
-            return jsonify({
-                'success': False,
-                'error': f'Unsupported export format: {format}',
-                'error_ar': f'تنسيق التصدير غير مدعوم: {format}'
-            }), 400
-        
-        return jsonify({
-            'success': False,
-            'error': 'Export failed',
-            'error_ar': 'فشل التصدير'
-        }), 500
+        return export_response(
+            'vehicle-report',
+            f'vehicle_report_{plate}_{timestamp}.{EXPORT_FORMATS[format][0]}',
+            render,
+            f'Exported vehicle report to {EXPORT_FORMATS[format][2]}: {vehicle.get("plate_number")}'
+        )
         
     except Exception as e:
         app.logger.error(f'Export vehicle report error: {str(e)}')
@@ -2073,78 +1807,109 @@ def export_all_vehicles_report(format):
     """
     Export all vehicles report
     تصدير تقرير جميع السيارات
+    
+    Add ?async=true to run the export as a background job.
     """
     try:
-        user = request.user
-        
-        # Get all vehicles with violations
-        vehicles = vehicle_report_exporter.get_all_vehicles_with_violations()
-        
-        if not vehicles:
-            return jsonify({
-                'success': False,
-                'error': 'No vehicles found',
-                'error_ar': 'لا توجد سيارات'
-            }), 404
+        exporters = {
+            'excel': vehicle_report_exporter.export_all_vehicles_to_excel,
+            'html': vehicle_report_exporter.export_all_vehicles_to_html,
+        }
+        if format not in exporters:
+            return unsupported_export_format(format)
+        
+        def render(output_path, progress):
+            # Get all vehicles with violations
+            vehicles = vehicle_report_exporter.get_all_vehicles_with_violations()
+            if not vehicles:
+                raise export_jobs.ExportError('No vehicles found', 'لا توجد سيارات', 404)
+            progress(40)
+            if not exporters[format](vehicles, output_path):
+                raise export_jobs.ExportError('Export failed', 'فشل التصدير', 500)
+            return len(vehicles)
         
-        # Generate filename
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        label = EXPORT_FORMATS[format][2]
+        return export_response(
+            'all-vehicles-report',
+            f'all_vehicles_report_{timestamp}.{EXPORT_FORMATS[format][0]}',
+            render,
+            lambda count: f'Exported all vehicles report to {label} ({count} vehicles)'
+        )
         
-        if format == 'excel':
-            filename = f'all_vehicles_report_{timestamp}.xlsx'
-            output_path = os.path.join(EXPORT_FOLDER, filename)
-            
-            success = vehicle_report_exporter.export_all_vehicles_to_excel(vehicles, output_path)
-            
-            if success:
-                database.log_audit(
-                    user['id'],
-                    f'Exported all vehicles report to Excel ({len(vehicles)} vehicles)',
-                    ip_address=request.remote_addr
-                )
-                
-                return send_file(
-                    output_path,
-                    mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-                    as_attachment=True,
-                    download_name=filename
-                )
-        
-        elif format == 'html':
-            filename = f'all_vehicles_report_{timestamp}.html'
-            output_path = os.path.join(EXPORT_FOLDER, filename)
-            
-            success = vehicle_report_exporter.export_all_vehicles_to_html(vehicles, output_path)
-            
-            if success:
-                database.log_audit(
-                    user['id'],
-                    f'Exported all vehicles report to HTML ({len(vehicles)} vehicles)',
-                    ip_address=request.remote_addr
-                )
-                
-                return send_file(
-                    output_path,
-                    mimetype='text/html',
-                    as_attachment=True,
-                    download_name=filename
-                )
-        
-        else:
-            return jsonify({
-                'success': False,
-                'error': f'Unsupported export format: {format}',
-                'error_ar': f'تنسيق التصدير غير مدعوم: {format}'
-            }), 400
-        
+    except Exception as e:
+        app.logger.error(f'Export all vehicles report error: {str(e)}')
         return jsonify({
             'success': False,
-            'error': 'Export failed',
-            'error_ar': 'فشل التصدير'
+            'error': 'Server connection error. Please try again later.',
+            'error_ar': 'خطأ في اتصال الخادم. يرجى المحاولة لاحقاً.'
         }), 500
+
+
+def plate_prefix(value):
+    """
+    Range bounds matching plates that start with value (index-friendly, unlike LIKE)
+
+    Plates are stored upper-case. The upper bound is the prefix with its last
+    character incremented ('ABC' -> 'ABD'), so the range holds exactly the
+    plates starting with the prefix under any collation that compares them
+    character by character, not only byte order.
+    """
+    prefix = value.strip().upper()
+    if not prefix:
+        raise ValueError('Empty plate prefix')
+    return (prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1))
+
+
+# Lightweight vehicle index: one grouped query, violation rows are never loaded.
+# Grouping starts with the plate so pages are read in plate-index order.
+VEHICLE_SUMMARY_QUERY = pagination.ListQuery(
+    columns='''v.id, v.plate_number, v.vehicle_type, v.make, v.model, v.year, v.color,
+               v.is_active, v.sticker_number, v.owner_id,
+               r.name as owner_name, r.unit_number, b.building_number,
+               COUNT(tv.id) as violation_count,
+               SUM(CASE WHEN tv.status IN ('pending', 'open', 'مفتوحة', 'معلقة') THEN 1 ELSE 0 END) as open_violation_count,
+               MAX(tv.violation_date) as last_violation_date,
+               COALESCE(SUM(tv.fine_amount), 0) as total_fines''',
+    source='''vehicles v
+               LEFT JOIN residents r ON v.owner_id = r.id
+               LEFT JOIN buildings b ON r.building_id = b.id
+               LEFT JOIN traffic_violations tv ON tv.vehicle_id = v.id''',
+    where='v.is_active = 1',
+    group_by='v.plate_number, v.id, r.id, b.id',
+    id_column='v.id',
+    sorts={
+        'plate': ['v.plate_number'],
+        'owner': ["COALESCE(r.name, '')"],
+    },
+    default_sort='plate',
+    filters={
+        'plate': ('v.plate_number >= ? AND v.plate_number < ?', plate_prefix),
+        'owner_id': ('v.owner_id = ?', int),
+        'building_id': ('r.building_id = ?', int),
+        'vehicle_type': ('v.vehicle_type = ?', str),
+    },
+    search_columns=('v.plate_number', 'r.name', 'v.sticker_number')
+)
+
+
+@app.route('/api/vehicles/summary', methods=['GET'])
+@auth.require_auth
+def get_vehicles_summary():
+    """
+    Get a lightweight vehicle index: plate, owner and violation counts
+    الحصول على فهرس مختصر للسيارات مع عدد المخالفات
+    
+    Supports limit/cursor paging, q (plate, owner or sticker), plate (prefix)
+    and owner_id/building_id/vehicle_type filters.
+    """
+    try:
+        return list_response(VEHICLE_SUMMARY_QUERY, pagination.row_to_dict, key='vehicles')
         
+    except pagination.PaginationError as e:
+        return pagination_error_response(e)
     except Exception as e:
-        app.logger.error(f'Export all vehicles report error: {str(e)}')
+        app.logger.error(f'Get vehicles summary error: {str(e)}')
         return jsonify({
             'success': False,
             'error': 'Server connection error. Please try again later.',
@@ -2160,14 +1925,32 @@ def get_vehicles_list():
     الحصول على قائمة جميع السيارات
     """
     try:
-        vehicles = vehicle_report_exporter.get_all_vehicles_with_violations()
+        # include_violations=false lists vehicles with their violation_count only
+        include_violations = request.args.get('include_violations', 'true').lower() != 'false'
+        
+        if pagination.parse_limit(request.args) is None:
+            # Full list: stream it, loading violations one batch of vehicles at a time
+            sql, params, _, _ = vehicle_report_exporter.VEHICLES_QUERY.build(request.args)
+            return streaming.stream_json(
+                sql, params,
+                format_batch=lambda conn, rows: vehicle_report_exporter.vehicles_from_rows(
+                    conn, rows, include_violations),
+                key='vehicles'
+            )
         
-        return jsonify({
+        vehicles, page = vehicle_report_exporter.get_vehicles_page(request.args, include_violations)
+        
+        body = {
             'success': True,
             'vehicles': vehicles,
             'total': len(vehicles)
-        })
+        }
+        if page is not None:
+            body['pagination'] = page
+        return jsonify(body)
         
+    except pagination.PaginationError as e:
+        return pagination_error_response(e)
     except Exception as e:
         app.logger.error(f'Get vehicles list error: {str(e)}')
         return jsonify({
@@ -2424,35 +2207,32 @@ def get_housing_report_data():
         }), 500
 
 
-@app.route('/api/housing-report/export/pdf')
-def export_housing_report_pdf():
-    """Export housing report as PDF"""
-    try:
+def housing_report_renderer(generate, error):
+    """Render function writing the housing report produced by generate(report_data)"""
+    def render(output_path, progress):
         # Get report data
         report_data = housing_report_generator.get_report_data()
         if not report_data:
-            return jsonify({
-                'success': False,
-                'error': 'Failed to get report data'
-            }), 500
+            raise export_jobs.ExportError('Failed to get report data', 'فشل في الحصول على بيانات التقرير', 500)
+        progress(50)
         
-        # Generate PDF
-        pdf_buffer = housing_report_generator.generate_pdf_report(report_data)
-        if not pdf_buffer:
-            return jsonify({
-                'success': False,
-                'error': 'Failed to generate PDF'
-            }), 500
-        
-        # Create filename with timestamp
+        buffer = generate(report_data)
+        if not buffer:
+            raise export_jobs.ExportError(error, 'فشل في إنشاء التقرير', 500)
+        with open(output_path, 'wb') as f:
+            f.write(buffer.getvalue())
+    return render
+
+
+@app.route('/api/housing-report/export/pdf')
+def export_housing_report_pdf():
+    """Export housing report as PDF (?async=true runs it as a background job)"""
+    try:
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f'housing_report_{timestamp}.pdf'
-        
-        return send_file(
-            pdf_buffer,
-            mimetype='application/pdf',
-            as_attachment=True,
-            download_name=filename
+        return export_response(
+            'housing-report',
+            f'housing_report_{timestamp}.pdf',
+            housing_report_renderer(housing_report_generator.generate_pdf_report, 'Failed to generate PDF')
         )
         
     except Exception as e:
@@ -2465,33 +2245,14 @@ def export_housing_report_pdf():
 
 @app.route('/api/housing-report/export/word')
 def export_housing_report_word():
-    """Export housing report as Word document"""
+    """Export housing report as Word document (?async=true runs it as a background job)"""
     try:
-        # Get report data
-        report_data = housing_report_generator.get_report_data()
-        if not report_data:
-            return jsonify({
-                'success': False,
-                'error': 'Failed to get report data'
-            }), 500
-        
-        # Generate Word document
-        docx_buffer = housing_report_generator.generate_word_report(report_data)
-        if not docx_buffer:
-            return jsonify({
-                'success': False,
-                'error': 'Failed to generate Word document'
-            }), 500
-        
-        # Create filename with timestamp
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f'housing_report_{timestamp}.docx'
-        
-        return send_file(
-            docx_buffer,
-            mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-            as_attachment=True,
-            download_name=filename
+        return export_response(
+            'housing-report',
+            f'housing_report_{timestamp}.docx',
+            housing_report_renderer(housing_report_generator.generate_word_report,
+                                    'Failed to generate Word document')
         )
         
     except Exception as e:
@@ -2501,11 +2262,151 @@ def export_housing_report_word():
             'error': 'Failed to generate Word report. Please try again later.'
         }), 500
 
+# ==================== Background Export Jobs ====================
+
+# format -> (file extension, mimetype, label used in audit messages)
+EXPORT_FORMATS = {
+    'excel': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'Excel'),
+    'pdf': ('pdf', 'application/pdf', 'PDF'),
+    'html': ('html', 'text/html', 'HTML'),
+    'word': ('docx', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document', 'Word'),
+}
+EXPORT_MIMETYPES = {extension: mimetype for extension, mimetype, _ in EXPORT_FORMATS.values()}
+
+
+def unsupported_export_format(format):
+    return jsonify({
+        'success': False,
+        'error': f'Unsupported export format: {format}',
+        'error_ar': f'تنسيق التصدير غير مدعوم: {format}'
+    }), 400
+
+
+def export_response(kind, filename, render, audit_message=None):
+    """
+    Run an export and send the file, or queue it as a background job when
+    the request has ?async=true (the response is then 202 with the job)
+    تنفيذ التصدير وإرسال الملف أو إضافته إلى مهام الخلفية
+    
+    Args:
+        kind: Export type shown in the job status
+        filename: Download name; its extension selects the mimetype
+        render: fn(output_path, progress) -> optional result, see export_jobs.submit
+        audit_message: Audit text, or fn(render result) -> text
+    """
+    user = getattr(request, 'user', None)
+    ip_address = request.remote_addr
+    mimetype = EXPORT_MIMETYPES[filename.rsplit('.', 1)[-1]]
+    
+    def audit(result):
+        if audit_message and user:
+            message = audit_message(result) if callable(audit_message) else audit_message
+            database.log_audit(user['id'], message, ip_address=ip_address)
+    
+    if request.args.get('async', '').lower() in ('1', 'true', 'yes'):
+        if not user:
+            return jsonify({
+                'success': False,
+                'error': 'Authentication required for background exports',
+                'error_ar': 'يجب تسجيل الدخول لتشغيل التصدير في الخلفية'
+            }), 401
+        job = export_jobs.submit(kind, filename, mimetype, render, user_id=user['id'], on_done=audit)
+        return jsonify({
+            'success': True,
+            'message': 'Export started',
+            'message_ar': 'بدأ التصدير في الخلفية',
+            'job': export_jobs.job_json(job)
+        }), 202
+    
+    export_jobs.cleanup_expired()
+    output_path = export_jobs.scratch_path(filename)
+    try:
+        result = render(output_path, lambda percent: None)
+    except export_jobs.ExportError as e:
+        export_jobs.discard(output_path)
+        return jsonify({'success': False, 'error': str(e), 'error_ar': e.message_ar}), e.status
+    except Exception:
+        export_jobs.discard(output_path)
+        raise
+    audit(result)
+    
+    response = send_file(
+        output_path,
+        mimetype=mimetype,
+        as_attachment=True,
+        download_name=filename
+    )
+    # The file is only needed until it has been sent. Without direct
+    # passthrough the WSGI server closes the response, which runs the callback.
+    response.direct_passthrough = False
+    response.call_on_close(lambda: export_jobs.discard(output_path))
+    return response
+
+
+def get_accessible_export_job(job_id):
+    """The export job if it exists and belongs to the current user (admins see all)"""
+    job = export_jobs.get_job(job_id)
+    if job and (job['user_id'] == request.user['id'] or request.user['role'] == 'admin'):
+        return job
+    return None
+
+
+@app.route('/api/exports/<job_id>', methods=['GET'])
+@auth.require_auth
+def get_export_job(job_id):
+    """
+    Get the status and progress of a background export
+    الحصول على حالة وتقدم التصدير في الخلفية
+    """
+    job = get_accessible_export_job(job_id)
+    if not job:
+        return jsonify({
+            'success': False,
+            'error': 'Export not found or expired',
+            'error_ar': 'التصدير غير موجود أو انتهت صلاحيته'
+        }), 404
+    
+    return jsonify({'success': True, 'job': export_jobs.job_json(job)})
+
+
+@app.route('/api/exports/<job_id>/download', methods=['GET'])
+@auth.require_auth
+def download_export_job(job_id):
+    """
+    Download the result of a finished background export
+    تحميل نتيجة التصدير في الخلفية
+    """
+    job = get_accessible_export_job(job_id)
+    path = export_jobs.artifact_path(job) if job else None
+    if not job or (job['status'] == 'done' and not os.path.exists(path)):
+        return jsonify({
+            'success': False,
+            'error': 'Export not found or expired',
+            'error_ar': 'التصدير غير موجود أو انتهت صلاحيته'
+        }), 404
+    
+    if job['status'] != 'done':
+        failed = job['status'] == 'failed'
+        return jsonify({
+            'success': False,
+            'error': job['error'] if failed else 'Export is not ready',
+            'error_ar': job['error_ar'] if failed else 'التصدير غير جاهز بعد',
+            'job': export_jobs.job_json(job)
+        }), 409
+    
+    return send_file(
+        path,
+        mimetype=job['mimetype'],
+        as_attachment=True,
+        download_name=job['filename']
+    )
+
 # ==================== Startup ====================
 
 if __name__ == '__main__':
-    # Cleanup expired sessions on startup
+    # Cleanup expired sessions on startup, then keep reaping in the background
     auth.cleanup_expired_sessions()
+    auth.start_session_reaper()
     
     # Get configuration from environment
     # Default to False for security - set FLASK_DEBUG=True explicitly for development
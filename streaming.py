@@ -0,0 +1,86 @@
+"""
+Streaming JSON responses for large result sets
+استجابات JSON متدفقة لمجموعات النتائج الكبيرة
+
+jsonify() needs the whole result as Python objects plus the encoded string
+in memory at once. stream_json() instead reads the cursor with fetchmany()
+and sends each batch as soon as it is encoded, so memory stays bounded by
+the batch size however many rows the query returns.
+
+The body looks like what jsonify() would produce:
+{"data": [...], "total": N, ..., "success": true}
+"success" comes last. If the query fails part way through, the array is
+closed and the body ends with "success": false and an error message.
+"""
+
+import os
+
+from flask import Response, current_app, g, stream_with_context
+
+import database
+import database_adapter
+
+STREAM_BATCH_SIZE = int(os.environ.get('STREAM_BATCH_SIZE', 500))
+
+
+def stream_json(sql, params=(), format_row=dict, format_batch=None, key='data', extra=None,
+                include_total=True, batch_size=None):
+    """
+    Stream query results as a JSON object
+    بث نتائج الاستعلام بصيغة JSON
+
+    Args:
+        sql: Query to run (placeholders already adapted)
+        params: Query parameters
+        format_row: Turns a row into a JSON-serializable value
+        format_batch: Optional fn(conn, rows) -> list, used instead of format_row
+                      when each batch needs extra lookups
+        key: Name of the array in the response body
+        extra: Additional top-level fields (e.g. limit/offset)
+        include_total: Add "total" with the number of rows streamed
+        batch_size: Rows per fetchmany() call
+    """
+    batch_size = batch_size or STREAM_BATCH_SIZE
+    dumps = current_app.json.dumps
+
+    def generate():
+        total = 0
+        error = None
+        yield '{' + dumps(key) + ':['
+
+        try:
+            with database.pooled_connection() as conn:
+                cursor = database_adapter.streaming_cursor(conn, batch_size)
+                cursor.execute(sql, params)
+
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+
+                    items = format_batch(conn, rows) if format_batch else [format_row(row) for row in rows]
+                    chunk = ','.join(dumps(item) for item in items)
+                    yield (',' if total else '') + chunk
+                    total += len(items)
+
+                cursor.close()
+        except Exception as e:
+            current_app.logger.error(f'Streaming query error: {str(e)}')
+            g.stream_failed = True
+            error = e
+
+        tail = dict(extra or {})
+        if include_total:
+            tail['total'] = total
+        if error is not None:
+            tail.update({
+                'success': False,
+                'error': 'Failed to load data',
+                'error_ar': 'فشل في تحميل البيانات'
+            })
+        else:
+            tail['success'] = True
+
+        yield ']' + ''.join(f',{dumps(name)}:{dumps(value)}' for name, value in tail.items()) + '}'
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
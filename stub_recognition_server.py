@@ -0,0 +1,190 @@
+"""
+Offline stand-in for the Plate Recognizer and ParkPow APIs
+خادم محلي بديل لخدمات تمييز اللوحات للاختبار دون اتصال
+
+Answers like the cloud services, without an account or network access, so
+the whole recognition pipeline (HTTP client, retries, cache, batch
+fan-out, logging) can be benchmarked and load-tested offline. Results are
+deterministic: the same image always gives the same plate, derived from
+its SHA-256, and about one image in ten has no plate.
+
+Run:
+    python stub_recognition_server.py [port]
+
+then point the application at it:
+    PLATE_RECOGNIZER_API_URL=http://127.0.0.1:8099/v1/plate-reader/
+    PLATE_RECOGNIZER_STATS_URL=http://127.0.0.1:8099/v1/statistics/
+    PARKPOW_API_URL=http://127.0.0.1:8099/api/v1
+
+STUB_RECOGNITION_LATENCY_MS adds a fixed delay to every recognition, to
+mimic cloud round trips. The in-process 'stub' recognition engine uses the
+same results without the HTTP server.
+"""
+
+import base64
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from datetime import date
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STUB_RECOGNITION_PORT = int(os.environ.get('STUB_RECOGNITION_PORT', 8099))
+STUB_RECOGNITION_LATENCY_MS = int(os.environ.get('STUB_RECOGNITION_LATENCY_MS', 0))
+STUB_RECOGNITION_MONTHLY_CALLS = int(os.environ.get('STUB_RECOGNITION_MONTHLY_CALLS', 50000))
+
+# Latin letters used on Saudi plates
+PLATE_LETTERS = 'ABDEGHJKLNRSTUVXZ'
+VEHICLE_TYPES = ['Sedan', 'SUV', 'Pickup Truck', 'Van', 'Big Truck']
+
+_usage = {'calls': 0}
+_usage_lock = threading.Lock()
+
+
+def stub_api_response(image_bytes, regions=None):
+    """
+    Plate-reader response for an image, derived only from its content
+    نتيجة تمييز ثابتة مشتقة من محتوى الصورة
+
+    Returns:
+        Dict in the Plate Recognizer plate-reader response format
+    """
+    digest = hashlib.sha256(image_bytes).digest()
+    results = []
+    if digest[0] % 10:
+        letters = ''.join(PLATE_LETTERS[b % len(PLATE_LETTERS)] for b in digest[1:4])
+        number = int.from_bytes(digest[4:6], 'big') % 9000 + 1000
+        plate = f'{letters}{number}'.lower()
+        score = round(0.8 + digest[6] / 255 * 0.19, 3)
+        xmin, ymin = digest[7] * 2, digest[8] * 2
+        results.append({
+            'plate': plate,
+            'score': score,
+            'dscore': score,
+            'region': {'code': (regions or ['sa'])[0], 'score': 0.9},
+            'vehicle': {'type': VEHICLE_TYPES[digest[9] % len(VEHICLE_TYPES)], 'score': 0.8},
+            'box': {'xmin': xmin, 'ymin': ymin, 'xmax': xmin + 160, 'ymax': ymin + 40},
+            'candidates': [{'plate': plate, 'score': score}],
+        })
+    return {
+        'filename': 'upload.jpg',
+        'processing_time': float(STUB_RECOGNITION_LATENCY_MS),
+        'results': results,
+        'version': 1,
+    }
+
+
+def _statistics():
+    today = date.today()
+    with _usage_lock:
+        calls = _usage['calls']
+    return {
+        'usage': {'year': today.year, 'month': today.month, 'calls': calls,
+                  'resets_on': date(today.year + today.month // 12, today.month % 12 + 1, 1).isoformat()},
+        'total_calls': STUB_RECOGNITION_MONTHLY_CALLS,
+    }
+
+
+def _multipart_fields(content_type, body):
+    header = b'Content-Type: ' + content_type.encode('latin-1') + b'\r\n\r\n'
+    message = BytesParser(policy=HTTP).parsebytes(header + body)
+    fields = {}
+    for part in message.iter_parts() if message.is_multipart() else []:
+        name = part.get_param('name', header='content-disposition')
+        if name:
+            fields.setdefault(name, []).append(part.get_payload(decode=True) or b'')
+    return fields
+
+
+class StubRecognitionHandler(BaseHTTPRequestHandler):
+    """Plate Recognizer (/v1/...) and ParkPow (/api/v1/...) endpoints"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _authorized(self):
+        if self.headers.get('Authorization', '').startswith('Token '):
+            return True
+        self._send_json(401, {'detail': 'Authentication credentials were not provided.'})
+        return False
+
+    def _recognize(self, image_bytes, regions=None):
+        if STUB_RECOGNITION_LATENCY_MS:
+            time.sleep(STUB_RECOGNITION_LATENCY_MS / 1000)
+        with _usage_lock:
+            _usage['calls'] += 1
+        return stub_api_response(image_bytes, regions)
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        path = self.path.split('?')[0].rstrip('/')
+        if path == '/v1/statistics':
+            self._send_json(200, _statistics())
+        elif path == '/api/v1/status':
+            self._send_json(200, {'status': 'ok'})
+        else:
+            self._send_json(404, {'detail': 'Not found.'})
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if not self._authorized():
+            return
+        path = self.path.split('?')[0].rstrip('/')
+        content_type = self.headers.get('Content-Type', '')
+
+        if path == '/v1/plate-reader':
+            fields = _multipart_fields(content_type, body)
+            if not fields.get('upload'):
+                self._send_json(400, {'upload': ['No file was submitted.']})
+                return
+            regions = [region.decode('utf-8') for region in fields.get('regions', [])]
+            self._send_json(201, self._recognize(fields['upload'][0], regions))
+        elif path == '/api/v1/recognize':
+            try:
+                image = json.loads(body or b'{}').get('image', '')
+                image_bytes = base64.b64decode(image.split(',')[-1])
+            except ValueError:
+                self._send_json(400, {'image': ['Invalid image.']})
+                return
+            self._send_json(200, self._recognize(image_bytes))
+        else:
+            self._send_json(404, {'detail': 'Not found.'})
+
+
+def create_server(host='127.0.0.1', port=STUB_RECOGNITION_PORT):
+    """Create the stub server (port 0 picks a free port); call serve_forever() to run it"""
+    return ThreadingHTTPServer((host, port), StubRecognitionHandler)
+
+
+def main():
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else STUB_RECOGNITION_PORT
+    server = create_server(port=port)
+    print(f"🧪 Stub recognition server on http://127.0.0.1:{port}")
+    print(f"   PLATE_RECOGNIZER_API_URL=http://127.0.0.1:{port}/v1/plate-reader/")
+    print(f"   PLATE_RECOGNIZER_STATS_URL=http://127.0.0.1:{port}/v1/statistics/")
+    print(f"   PARKPOW_API_URL=http://127.0.0.1:{port}/api/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""
+Per-table change versions for read-mostly tables
+أرقام إصدارات التغيير للجداول نادرة التعديل
+
+Triggers bump table_versions.version on every INSERT, UPDATE and DELETE of a
+versioned table, whoever makes the change (API, import scripts, psql). Each
+process keeps the versions it last read for TABLE_VERSION_TTL_SECONDS, so
+deciding whether cached data is still current normally costs no query at
+all, and never more than one tiny query per TTL per worker.
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+
+import database_adapter
+
+VERSIONED_TABLES = ('buildings', 'apartments', 'parking_spots')
+
+TABLE_VERSION_TTL_SECONDS = float(os.environ.get('TABLE_VERSION_TTL_SECONDS', '2'))
+
+TABLE_VERSIONS_DDL = '''
+CREATE TABLE IF NOT EXISTS table_versions (
+    table_name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 1,
+    changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
+'''
+
+_BUMP_SQL = "UPDATE table_versions SET version = version + 1, changed_at = CURRENT_TIMESTAMP WHERE table_name = '{table}'"
+
+
+def sqlite_trigger_sql(table):
+    """Row-level SQLite triggers bumping the table's version"""
+    bump = _BUMP_SQL.format(table=table)
+    return [
+        f'CREATE TRIGGER IF NOT EXISTS trg_version_{table}_{event.lower()} '
+        f'AFTER {event} ON {table} FOR EACH ROW BEGIN {bump}; END'
+        for event in ('INSERT', 'UPDATE', 'DELETE')
+    ]
+
+
+def postgresql_trigger_sql(table):
+    """Statement-level PostgreSQL trigger bumping the table's version once per statement"""
+    return [
+        f'''CREATE OR REPLACE FUNCTION version_{table}() RETURNS trigger AS $$
+BEGIN
+    {_BUMP_SQL.format(table=table)};
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql''',
+        f'DROP TRIGGER IF EXISTS trg_version_{table} ON {table}',
+        f'CREATE TRIGGER trg_version_{table} AFTER INSERT OR UPDATE OR DELETE ON {table} '
+        f'FOR EACH STATEMENT EXECUTE PROCEDURE version_{table}()',
+    ]
+
+
+def install_table_versions(cursor, db_type):
+    """Create the version table, seed a row per versioned table and install the triggers"""
+    cursor.execute(TABLE_VERSIONS_DDL)
+    for table in VERSIONED_TABLES:
+        cursor.execute(database_adapter.adapt_placeholders(
+            'INSERT INTO table_versions (table_name, version) VALUES (?, 1) ON CONFLICT (table_name) DO NOTHING'
+        ), (table,))
+        statements = postgresql_trigger_sql(table) if db_type == 'postgresql' else sqlite_trigger_sql(table)
+        for sql in statements:
+            cursor.execute(sql)
+
+
+# ==================== Cached reads ====================
+
+_cache = {'checked_at': 0.0, 'versions': {}}
+_lock = threading.Lock()
+
+
+def _parse_timestamp(value):
+    if value is None or isinstance(value, datetime):
+        return value
+    try:
+        return datetime.strptime(str(value)[:19], '%Y-%m-%d %H:%M:%S')
+    except ValueError:
+        return None
+
+
+def get_versions():
+    """
+    Get {table: (version, changed_at)} for every versioned table
+    الحصول على إصدارات الجداول
+
+    Served from the per-process copy while it is younger than the TTL.
+    """
+    now = time.monotonic()
+    with _lock:
+        if _cache['versions'] and now - _cache['checked_at'] < TABLE_VERSION_TTL_SECONDS:
+            return _cache['versions']
+
+    import database
+    with database.pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT table_name, version, changed_at FROM table_versions')
+        versions = {
+            row['table_name']: (row['version'], _parse_timestamp(row['changed_at']))
+            for row in cursor.fetchall()
+        }
+
+    with _lock:
+        _cache['versions'] = versions
+        _cache['checked_at'] = now
+    return versions
+
+
+def invalidate():
+    """Force the next get_versions() call to re-read the table; called by data_cache.mark_tables_changed()"""
+    with _lock:
+        _cache['checked_at'] = 0.0
@@ -0,0 +1,124 @@
+"""
+Shared pytest fixtures
+إعدادات الاختبارات المشتركة
+
+Every test gets its own SQLite database in a temporary directory. The ``db``
+fixture builds it twice: once from scratch ('fresh') and once the way an
+existing installation is upgraded ('upgraded'): tables and data created
+before any migration ran, then init_database() applying the migrations.
+"""
+
+import os
+import sys
+import tempfile
+from functools import lru_cache
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Keep module-level state out of the working tree before anything is imported
+_session_dir = tempfile.mkdtemp(prefix='housing-tests-')
+os.environ.pop('DATABASE_URL', None)
+os.environ.setdefault('STARTUP_IMPORT_REPORT', 'false')
+os.environ.setdefault('AUDIT_ASYNC', 'false')
+os.environ.setdefault('SESSION_REAPER_INTERVAL_SECONDS', '0')
+os.environ.setdefault('RECOGNITION_CACHE_PATH', os.path.join(_session_dir, 'recognition_cache.db'))
+os.environ.setdefault('RECOGNITION_GOVERNOR_PATH', os.path.join(_session_dir, 'recognition_governor.json'))
+
+import database_adapter  # noqa: E402
+
+_db_path = {'path': os.path.join(_session_dir, 'housing.db')}
+
+
+@lru_cache(maxsize=1)
+def _test_dialect():
+    return database_adapter.Dialect('sqlite', None, _db_path['path'], '?')
+
+
+# server.py initializes the database on import, so the dialect is redirected
+# before any test module imports it
+database_adapter.get_dialect = _test_dialect
+
+import auth  # noqa: E402
+import data_cache  # noqa: E402
+import database  # noqa: E402
+import migrations  # noqa: E402
+import response_cache  # noqa: E402
+import table_versions  # noqa: E402
+
+ADMIN = ('admin', 'Admin@2025')
+VIEWER = ('viewer', 'Viewer@2025')
+
+
+def _reset_state():
+    if database_adapter._pool is not None:
+        database_adapter._pool.close_all()
+        database_adapter._pool = None
+    database_adapter.reset_dialect()
+    auth._session_cache.clear()
+    auth._revoked_jtis.clear()
+    data_cache.clear()
+    response_cache.clear()
+    table_versions.invalidate()
+
+
+def _init_before_migrations():
+    """Create the tables and seed data as an installation without migrations would have them"""
+    run_migrations = migrations.run_migrations
+    migrations.run_migrations = lambda conn, verbose=True: None
+    try:
+        database.init_database()
+    finally:
+        migrations.run_migrations = run_migrations
+
+    conn = database.get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute('DROP TABLE IF EXISTS schema_migrations')
+    cursor.execute('''
+        INSERT INTO residents (name, national_id, phone, building_id, unit_number, is_active)
+        VALUES ('Existing Resident', '1000000001', '0500000001', 1, '11', 1)
+    ''')
+    cursor.execute('''
+        INSERT INTO vehicles (plate_number, owner_id, make, model, is_active)
+        VALUES ('ABC1234', ?, 'Toyota', 'Camry', 1)
+    ''', (cursor.lastrowid,))
+    cursor.execute('''
+        INSERT INTO traffic_violations (vehicle_id, violation_type, violation_date, status)
+        VALUES (?, 'parking', '2024-01-15', 'pending')
+    ''', (cursor.lastrowid,))
+    conn.commit()
+    conn.close()
+
+
+@pytest.fixture(params=['fresh', 'upgraded'])
+def db(request, tmp_path):
+    """Path of an initialized test database, fresh or upgraded from a pre-migration schema"""
+    _db_path['path'] = str(tmp_path / 'housing.db')
+    _reset_state()
+
+    if request.param == 'upgraded':
+        _init_before_migrations()
+    database.init_database()
+
+    yield _db_path['path']
+    _reset_state()
+
+
+@pytest.fixture
+def app(db):
+    import server
+    server.app.config['TESTING'] = True
+    return server.app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def login(client, credentials=ADMIN):
+    """Log in and return the response; the session cookie stays on the client"""
+    username, password = credentials
+    return client.post('/api/auth/login', json={'username': username, 'password': password})
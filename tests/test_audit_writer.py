@@ -0,0 +1,129 @@
+"""Tests for the buffered audit log writer"""
+
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import pytest
+
+import database
+
+
+def _entry(action):
+    return (1, action, None, None, None, None, '127.0.0.1', datetime(2026, 10, 18, 12, 0, 0))
+
+
+def _actions():
+    with database.pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT action FROM audit_log WHERE action LIKE 'test %' ORDER BY id")
+        return [row['action'] for row in cursor.fetchall()]
+
+
+@pytest.fixture
+def writer(db):
+    # No size trigger and no timer during the test: only explicit flushes write
+    return database.AuditWriter(batch_size=1000, flush_interval=3600, max_buffer=1000)
+
+
+def test_flush_writes_buffer_in_one_batch(writer, monkeypatch):
+    for index in range(5):
+        assert writer.add(_entry(f'test {index}'))
+    assert writer.pending() == 5
+    assert _actions() == []
+
+    statements = []
+    pooled_connection = database.pooled_connection
+
+    class RecordingCursor:
+        def __init__(self, cursor):
+            self._cursor = cursor
+
+        def execute(self, sql, params=()):
+            statements.append(('execute', len(params)))
+            return self._cursor.execute(sql, params)
+
+        def executemany(self, sql, rows):
+            rows = list(rows)
+            statements.append(('executemany', len(rows)))
+            return self._cursor.executemany(sql, rows)
+
+    class RecordingConnection:
+        def __init__(self, conn):
+            self._conn = conn
+
+        def cursor(self):
+            return RecordingCursor(self._conn.cursor())
+
+    @contextmanager
+    def recording_connection():
+        with pooled_connection() as conn:
+            yield RecordingConnection(conn)
+
+    monkeypatch.setattr(database, 'pooled_connection', recording_connection)
+    assert writer.flush() == 5
+    monkeypatch.setattr(database, 'pooled_connection', pooled_connection)
+
+    assert statements == [('executemany', 5)]
+    assert writer.pending() == 0
+    assert _actions() == [f'test {index}' for index in range(5)]
+    assert writer.flush() == 0
+
+
+def test_failed_batch_is_requeued_in_order(writer, monkeypatch):
+    writer.add(_entry('test first'))
+    writer.add(_entry('test second'))
+    pooled_connection = database.pooled_connection
+
+    @contextmanager
+    def failing_connection():
+        raise sqlite3.OperationalError('database is locked')
+        yield
+
+    monkeypatch.setattr(database, 'pooled_connection', failing_connection)
+    with pytest.raises(sqlite3.OperationalError):
+        writer.flush()
+    assert writer.pending() == 2
+
+    # Entries queued while the batch was failing go after it
+    writer.add(_entry('test third'))
+    monkeypatch.setattr(database, 'pooled_connection', pooled_connection)
+    assert writer.flush() == 3
+    assert _actions() == ['test first', 'test second', 'test third']
+
+
+def test_full_batch_wakes_the_writer_thread(db):
+    writer = database.AuditWriter(batch_size=2, flush_interval=3600, max_buffer=1000)
+
+    writer.add(_entry('test a'))
+    writer.add(_entry('test b'))
+
+    deadline = time.monotonic() + 5
+    while writer.pending() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert _actions() == ['test a', 'test b']
+
+
+def test_full_buffer_falls_back_to_direct_write(db, monkeypatch):
+    writer = database.AuditWriter(batch_size=1000, flush_interval=3600, max_buffer=1)
+    monkeypatch.setattr(database, 'AUDIT_ASYNC', True)
+    monkeypatch.setattr(database, '_audit_writer', writer)
+
+    database.log_audit(1, 'test buffered')
+    database.log_audit(1, 'test direct')
+
+    assert writer.pending() == 1
+    assert _actions() == ['test direct']
+    assert database.flush_audit_log() == 1
+    assert _actions() == ['test direct', 'test buffered']
+
+
+def test_entries_of_the_parent_are_dropped_after_fork(writer):
+    writer.add(_entry('test parent'))
+    # As seen from a forked child: the buffer belongs to another process
+    writer._pid = -1
+
+    assert writer.pending() == 1
+    assert writer.flush() == 0
+    assert writer.pending() == 0
@@ -0,0 +1,94 @@
+"""Tests for sessions, signed tokens and role checks"""
+
+import pytest
+
+import auth
+from conftest import ADMIN, VIEWER, login
+
+
+@pytest.fixture
+def signed(monkeypatch):
+    monkeypatch.setattr(auth, 'AUTH_TOKEN_MODE', 'signed')
+
+
+def test_login_issues_signed_token(signed, client):
+    response = login(client)
+
+    assert response.status_code == 200
+    assert auth.is_signed_token(response.get_json()['session_token'])
+    assert client.get('/api/auth/validate').status_code == 200
+
+
+def test_signed_token_rejected_after_password_change(signed, client, app):
+    old_token = login(client).get_json()['session_token']
+
+    response = client.post('/api/auth/change-password',
+                           json={'current_password': ADMIN[1], 'new_password': 'Changed@2025'})
+    assert response.status_code == 200
+
+    # The caller got a fresh token; the old one is dead even with a cold session cache
+    assert client.get('/api/auth/validate').status_code == 200
+    auth._session_cache.clear()
+    other = app.test_client()
+    other.set_cookie('session_token', old_token)
+    assert other.get('/api/auth/validate').status_code == 401
+    assert other.get('/api/vehicles/summary').status_code == 401
+
+
+def test_signed_token_rejected_after_revocation_by_another_worker(signed, client, app):
+    token = login(client).get_json()['session_token']
+    other = app.test_client()
+    other.set_cookie('session_token', token)
+    assert other.get('/api/vehicles/summary').status_code == 200
+
+    client.post('/api/auth/logout')
+    # Simulate a worker that did not perform the logout
+    auth._revoked_jtis.clear()
+    auth._session_cache.clear()
+
+    assert other.get('/api/vehicles/summary').status_code == 401
+
+
+@pytest.mark.parametrize('cookie', [
+    'v1.',
+    'v1.abc',
+    'v1.abc.def',
+    'v1.éé.é',
+    'v1.W10.xyz',
+    'not-a-token',
+])
+def test_malformed_cookie_is_rejected_not_500(signed, client, cookie):
+    client.set_cookie('session_token', cookie)
+
+    assert client.get('/api/auth/validate').status_code == 401
+    assert client.get('/api/vehicles/summary').status_code == 401
+
+
+def test_forged_signature_is_rejected(signed, client):
+    token = login(client).get_json()['session_token']
+    payload, signature = token[len(auth.SIGNED_TOKEN_PREFIX):].split('.')
+
+    assert auth.verify_signed_token(token) is not None
+    assert auth.verify_signed_token(f'{auth.SIGNED_TOKEN_PREFIX}{payload}.{signature[::-1]}') is None
+
+
+def test_database_session_logout(client):
+    login(client)
+    assert client.get('/api/auth/validate').status_code == 200
+
+    client.post('/api/auth/logout')
+    assert client.get('/api/auth/validate').status_code == 401
+
+
+@pytest.mark.parametrize('path', ['/api/system/import-report', '/api/system/http-metrics'])
+def test_admin_only_routes_reject_other_roles(client, path):
+    login(client, VIEWER)
+
+    assert client.get(path).status_code == 403
+
+
+@pytest.mark.parametrize('path', ['/api/system/import-report', '/api/system/http-metrics'])
+def test_admin_only_routes_allow_admin(client, path):
+    login(client)
+
+    assert client.get(path).status_code == 200
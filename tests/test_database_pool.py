@@ -0,0 +1,49 @@
+"""Tests for the pooled database connections"""
+
+import threading
+
+import database_adapter
+
+
+def test_pooled_connection_commits_and_reuses(db):
+    with database_adapter.pooled_connection() as conn:
+        conn.execute("INSERT INTO buildings (building_number, name) VALUES ('P1', 'Pool')")
+    with database_adapter.pooled_connection() as conn:
+        row = conn.execute("SELECT COUNT(*) FROM buildings WHERE building_number = 'P1'").fetchone()
+
+    assert row[0] == 1
+    stats = database_adapter.get_pool().get_stats()
+    assert stats['reused'] >= 1
+    assert stats['idle'] >= 1
+
+
+def test_pooled_connection_rolls_back_on_error(db):
+    try:
+        with database_adapter.pooled_connection() as conn:
+            conn.execute("INSERT INTO buildings (building_number, name) VALUES ('P2', 'Pool')")
+            raise RuntimeError('boom')
+    except RuntimeError:
+        pass
+
+    with database_adapter.pooled_connection() as conn:
+        row = conn.execute("SELECT COUNT(*) FROM buildings WHERE building_number = 'P2'").fetchone()
+    assert row[0] == 0
+
+
+def test_pool_counters_are_exact_under_concurrency(db):
+    pool = database_adapter.ConnectionPool(size=2)
+    rounds = 50
+
+    def worker():
+        for _ in range(rounds):
+            pool.release(pool.acquire())
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    pool.close_all()
+
+    stats = pool.get_stats()
+    assert stats['created'] + stats['reused'] == 8 * rounds
@@ -0,0 +1,70 @@
+"""Tests for synchronous and background exports"""
+
+import os
+import time
+
+import pytest
+
+import export_jobs
+from conftest import login
+
+
+@pytest.fixture
+def export_folder(tmp_path, monkeypatch):
+    monkeypatch.setitem(export_jobs._state, 'folder', None)
+    monkeypatch.setitem(export_jobs._state, 'last_cleanup', 0.0)
+    export_jobs.init(str(tmp_path))
+    return tmp_path
+
+
+def _age(path, seconds):
+    past = time.time() - seconds
+    os.utime(path, (past, past))
+
+
+def test_synchronous_export_file_is_removed_after_sending(client, export_folder):
+    login(client)
+
+    response = client.get('/api/plate-recognizer/export-excel')
+    assert response.status_code == 200
+    assert response.data[:2] == b'PK'
+    response.close()
+
+    assert os.listdir(export_folder / 'tmp') == []
+
+
+def test_background_export_completes(client, export_folder):
+    login(client)
+
+    response = client.get('/api/plate-recognizer/export-excel?async=true')
+    assert response.status_code == 202
+    job_id = response.get_json()['job']['id']
+
+    for _ in range(100):
+        job = client.get(f'/api/exports/{job_id}').get_json()['job']
+        if job['status'] in ('done', 'failed'):
+            break
+        time.sleep(0.05)
+
+    assert job['status'] == 'done'
+    download = client.get(job['download_url'])
+    assert download.status_code == 200
+    assert download.data[:2] == b'PK'
+
+
+def test_cleanup_only_touches_files_it_owns(export_folder):
+    ttl = export_jobs.EXPORT_JOB_TTL_SECONDS
+    unrelated = export_folder / 'report.xlsx'
+    old_scratch = export_folder / 'tmp' / 'abc_old.xlsx'
+    new_scratch = export_folder / 'tmp' / 'abc_new.xlsx'
+    old_job = export_folder / 'jobs' / 'job.json'
+    for path in (unrelated, old_scratch, new_scratch, old_job):
+        path.write_text('x')
+    for path in (unrelated, old_scratch, old_job):
+        _age(path, ttl + 60)
+
+    assert export_jobs.cleanup_expired(force=True) == 2
+    assert unrelated.exists()
+    assert new_scratch.exists()
+    assert not old_scratch.exists()
+    assert not old_job.exists()
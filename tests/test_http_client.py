@@ -0,0 +1,148 @@
+"""Tests for the shared HTTP client: retries, backoff and the circuit breaker"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+import http_client
+
+
+class ScriptedHandler(BaseHTTPRequestHandler):
+    """Answers with the next (status, headers, delay) of the server's script"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _respond(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        server = self.server
+        with server.lock:
+            server.requests.append((self.command, body))
+            status, headers, delay = server.script.pop(0) if server.script else (200, {}, 0)
+        if delay:
+            time.sleep(delay)
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'ok')
+
+    do_GET = do_POST = _respond
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setattr(http_client, 'HTTP_RETRY_BACKOFF_SECONDS', 0.0)
+    monkeypatch.setattr(http_client, '_circuits', {})
+    monkeypatch.setattr(http_client, '_metrics', {})
+
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), ScriptedHandler)
+    httpd.script, httpd.requests, httpd.lock = [], [], threading.Lock()
+    httpd.url = f'http://127.0.0.1:{httpd.server_address[1]}/'
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_retries_transient_statuses_and_resends_body(server):
+    server.script = [(503, {}, 0), (502, {}, 0), (200, {}, 0)]
+
+    response = http_client.post(server.url, endpoint='api', files={'upload': ('a.jpg', b'image-bytes')})
+
+    assert response.status_code == 200
+    assert len(server.requests) == 3
+    assert all(b'image-bytes' in body for _, body in server.requests)
+    assert http_client.get_metrics()['api']['retries'] == 2
+
+
+def test_gives_up_after_max_retries(server):
+    server.script = [(503, {}, 0)] * 5
+
+    response = http_client.get(server.url, endpoint='api', retries=1)
+
+    assert response.status_code == 503
+    assert len(server.requests) == 2
+
+
+def test_retry_after_is_honoured(server):
+    server.script = [(429, {'Retry-After': '0.3'}, 0), (200, {}, 0)]
+
+    started = time.monotonic()
+    response = http_client.get(server.url, endpoint='api')
+
+    assert response.status_code == 200
+    assert time.monotonic() - started >= 0.3
+
+
+def test_client_errors_are_not_retried(server):
+    server.script = [(402, {}, 0)]
+
+    assert http_client.get(server.url, endpoint='api').status_code == 402
+    assert len(server.requests) == 1
+
+
+def test_read_timeout_is_retried_for_get_only(server):
+    server.script = [(200, {}, 0.5), (200, {}, 0)]
+    assert http_client.get(server.url, endpoint='get', timeout=0.2).status_code == 200
+
+    server.script = [(200, {}, 0.5), (200, {}, 0)]
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        http_client.post(server.url, endpoint='post', timeout=0.2, data=b'x')
+    assert [method for method, _ in server.requests].count('POST') == 1
+
+
+def test_circuit_opens_fails_fast_and_recovers(server, monkeypatch):
+    monkeypatch.setattr(http_client, 'HTTP_CIRCUIT_FAILURE_THRESHOLD', 3)
+    monkeypatch.setattr(http_client, 'HTTP_CIRCUIT_RESET_SECONDS', 0.2)
+    server.script = [(500, {}, 0)] * 3
+
+    for _ in range(3):
+        assert http_client.get(server.url, endpoint='svc', retries=0).status_code == 500
+    assert http_client.get_metrics()['svc']['circuit'] == 'open'
+
+    with pytest.raises(http_client.CircuitOpenError):
+        http_client.get(server.url, endpoint='svc', retries=0)
+    assert len(server.requests) == 3
+    assert http_client.get_metrics()['svc']['rejected'] == 1
+
+    # After the reset time one trial call goes through and closes the circuit
+    time.sleep(0.25)
+    assert http_client.get(server.url, endpoint='svc', retries=0).status_code == 200
+    assert http_client.get_metrics()['svc']['circuit'] == 'closed'
+
+
+def test_failed_trial_reopens_circuit(server, monkeypatch):
+    monkeypatch.setattr(http_client, 'HTTP_CIRCUIT_FAILURE_THRESHOLD', 1)
+    monkeypatch.setattr(http_client, 'HTTP_CIRCUIT_RESET_SECONDS', 0.2)
+    server.script = [(500, {}, 0), (500, {}, 0)]
+
+    http_client.get(server.url, endpoint='svc', retries=0)
+    time.sleep(0.25)
+    assert http_client.get(server.url, endpoint='svc', retries=0).status_code == 500
+
+    with pytest.raises(http_client.CircuitOpenError):
+        http_client.get(server.url, endpoint='svc', retries=0)
+
+
+def test_connection_errors_are_retried_then_raised(monkeypatch):
+    monkeypatch.setattr(http_client, 'HTTP_RETRY_BACKOFF_SECONDS', 0.0)
+    monkeypatch.setattr(http_client, '_circuits', {})
+    monkeypatch.setattr(http_client, '_metrics', {})
+    probe = ThreadingHTTPServer(('127.0.0.1', 0), ScriptedHandler)
+    url = f'http://127.0.0.1:{probe.server_address[1]}/'
+    probe.server_close()
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        http_client.get(url, endpoint='down', retries=2)
+
+    metrics = http_client.get_metrics()['down']
+    assert metrics['calls'] == 3
+    assert metrics['errors'] == 3
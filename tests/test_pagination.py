@@ -0,0 +1,112 @@
+"""Tests for keyset pagination, sorting and search"""
+
+import pytest
+
+import database
+import pagination
+from conftest import login
+
+
+@pytest.fixture
+def stickers(db):
+    """Stickers with and without expiry dates, some with LIKE wildcards in their numbers"""
+    with database.pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO residents (name, national_id, phone, is_active)
+            VALUES ('Sticker Owner', '3000000001', '0500000003', 1)
+        ''')
+        resident_id = cursor.lastrowid
+        rows = [
+            ('S-001', '2027-01-01'), ('S-002', None), ('S-003', '2026-05-01'),
+            ('S_004', None), ('S%005', '2026-12-31'), ('S-006', '2026-05-01'), ('S-007', None),
+        ]
+        for number, expiry in rows:
+            cursor.execute('''
+                INSERT INTO stickers (sticker_number, resident_id, plate_number, issue_date, expiry_date)
+                VALUES (?, ?, ?, '2025-01-01', ?)
+            ''', (number, resident_id, f'P{number}', expiry))
+    return rows
+
+
+def _pages(client, **params):
+    numbers, cursor = [], None
+    while True:
+        query = dict(params, limit=2)
+        if cursor:
+            query['cursor'] = cursor
+        body = client.get('/api/stickers', query_string=query).get_json()
+        assert body['success'], body
+        numbers += [row['sticker_number'] for row in body['data']]
+        cursor = body['pagination']['next_cursor']
+        if not cursor:
+            return numbers
+
+
+@pytest.mark.parametrize('order', ['asc', 'desc'])
+def test_expiry_sort_pages_through_missing_dates(client, stickers, order):
+    everything = client.get('/api/stickers', query_string={'sort': 'expiry', 'order': order}).get_json()['data']
+    expected = [row['sticker_number'] for row in everything]
+
+    assert sorted(expected) == sorted(number for number, _ in stickers)
+    assert _pages(client, sort='expiry', order=order) == expected
+    # Stickers without an expiry date sort before every dated one
+    undated = {number for number, expiry in stickers if expiry is None}
+    ends = expected[:3] if order == 'asc' else expected[-3:]
+    assert set(ends) == undated
+
+
+@pytest.mark.parametrize('q, expected', [
+    ('S_0', ['S_004']),
+    ('S%', ['S%005']),
+    ('-00', ['S-001', 'S-002', 'S-003', 'S-006', 'S-007']),
+])
+def test_search_matches_wildcards_literally(client, stickers, q, expected):
+    body = client.get('/api/stickers', query_string={'q': q, 'limit': 50}).get_json()
+
+    assert [row['sticker_number'] for row in body['data']] == expected
+
+
+def test_invalid_arguments_are_rejected(client, stickers):
+    assert client.get('/api/stickers?sort=nope').status_code == 400
+    assert client.get('/api/stickers?limit=0').status_code == 400
+    assert client.get('/api/stickers?cursor=garbage').status_code == 400
+
+
+def test_escape_like():
+    assert pagination.escape_like('50%_off\\') == '50\\%\\_off\\\\'
+
+
+def test_cursor_round_trip():
+    values = ['2026-05-01', 7, None, 'مبنى']
+
+    assert pagination.decode_cursor(pagination.encode_cursor(values), 4) == values
+    with pytest.raises(pagination.PaginationError):
+        pagination.decode_cursor(pagination.encode_cursor(values), 3)
+
+
+def test_limit_is_capped():
+    assert pagination.parse_limit({'limit': '100000'}) == pagination.MAX_PAGE_SIZE
+    assert pagination.parse_limit({'limit': 'all'}) is None
+    assert pagination.parse_limit({}) is None
+
+
+def test_plate_prefix_filter_is_case_insensitive(client, db):
+    import server
+
+    with database.pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO residents (name, national_id, phone, is_active)
+            VALUES ('Plate Owner', '3000000002', '0500000004', 1)
+        ''')
+        owner_id = cursor.lastrowid
+        for plate in ('QRS1234', 'QRS9999', 'QRT1000', 'QR1000'):
+            cursor.execute('INSERT INTO vehicles (plate_number, owner_id, is_active) VALUES (?, ?, 1)', (plate, owner_id))
+
+    login(client)
+    body = client.get('/api/vehicles/summary', query_string={'plate': 'qrs', 'limit': 50}).get_json()
+
+    assert [row['plate_number'] for row in body['vehicles']] == ['QRS1234', 'QRS9999']
+    assert server.plate_prefix(' abz') == ('ABZ', 'AB[')
+    assert client.get('/api/vehicles/summary', query_string={'plate': '  '}).status_code == 400
@@ -0,0 +1,171 @@
+"""Tests for the single-image and batch plate recognition endpoints (offline stub engine)"""
+
+import io
+import json
+
+import pytest
+
+import database
+import plate_recognizer
+import recognition_engines
+import stub_recognition_server
+from conftest import login
+
+
+def _images_with_plates(count):
+    """Distinct images for which the stub engine reports a plate, with that plate"""
+    images = []
+    index = 0
+    while len(images) < count:
+        image = f'test-image-{index}'.encode()
+        results = stub_recognition_server.stub_api_response(image)['results']
+        if results:
+            images.append((image, results[0]['plate'].upper()))
+        index += 1
+    return images
+
+
+def _upload(images):
+    return {'images': [(io.BytesIO(image), f'car{index}.jpg') for index, image in enumerate(images)]}
+
+
+def _add_vehicle(plate):
+    with database.pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO residents (name, national_id, phone, is_active)
+            VALUES ('Plate Owner', ?, '0500000005', 1)
+        ''', ('4' + plate.encode().hex()[:9],))
+        cursor.execute('INSERT INTO vehicles (plate_number, owner_id, is_active) VALUES (?, ?, 1)',
+                       (plate, cursor.lastrowid))
+        return cursor.lastrowid
+
+
+def _logged_plates():
+    with database.pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT plate_number, vehicle_id FROM plate_recognition_log ORDER BY id')
+        return [(row['plate_number'], row['vehicle_id']) for row in cursor.fetchall()]
+
+
+def _audit_actions():
+    with database.pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT action FROM audit_log WHERE action LIKE '%plate recognition%'")
+        return [row['action'] for row in cursor.fetchall()]
+
+
+@pytest.fixture
+def stub_engine(monkeypatch):
+    monkeypatch.setattr(recognition_engines, 'RECOGNITION_ENGINE', 'stub')
+
+
+@pytest.fixture
+def log_calls(monkeypatch):
+    calls = []
+    log_plate_recognitions = plate_recognizer.log_plate_recognitions
+
+    def counting(entries):
+        entries = list(entries)
+        calls.append(entries)
+        return log_plate_recognitions(entries)
+
+    monkeypatch.setattr(plate_recognizer, 'log_plate_recognitions', counting)
+    return calls
+
+
+def test_batch_streams_one_line_per_image_and_a_summary(client, stub_engine):
+    login(client)
+    images = [image for image, _ in _images_with_plates(3)]
+
+    response = client.post('/api/plate-recognizer/recognize-batch', data=_upload(images),
+                           content_type='multipart/form-data')
+
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert len(lines) == 4
+    assert sorted(line['index'] for line in lines[:3]) == [0, 1, 2]
+    assert {line['filename'] for line in lines[:3]} == {'car0.jpg', 'car1.jpg', 'car2.jpg'}
+    assert all(line['success'] and line['engine'] == 'stub' for line in lines[:3])
+    assert lines[3] == {'done': True, 'success': True, 'total': 3, 'succeeded': 3, 'failed': 0}
+
+
+def test_batch_rejects_missing_and_too_many_images(client, stub_engine, monkeypatch):
+    login(client)
+    monkeypatch.setattr(plate_recognizer, 'BATCH_MAX_IMAGES', 2)
+
+    missing = client.post('/api/plate-recognizer/recognize-batch', data={}, content_type='multipart/form-data')
+    too_many = client.post('/api/plate-recognizer/recognize-batch', data=_upload([b'a', b'b', b'c']),
+                           content_type='multipart/form-data')
+
+    assert missing.status_code == 400
+    assert missing.get_json()['success'] is False
+    assert too_many.status_code == 400
+    assert 'at most 2' in too_many.get_json()['error']
+
+
+def test_batch_matches_vehicles_and_logs_once(client, stub_engine, log_calls):
+    login(client)
+    (known, known_plate), (unknown, unknown_plate) = _images_with_plates(2)
+    vehicle_id = _add_vehicle(known_plate)
+
+    response = client.post('/api/plate-recognizer/recognize-batch', data=_upload([known, unknown]),
+                           content_type='multipart/form-data')
+    lines = {line['index']: line for line in map(json.loads, response.get_data(as_text=True).splitlines())
+             if 'index' in line}
+
+    assert lines[0]['results'][0]['vehicle_info']['id'] == vehicle_id
+    assert lines[1]['results'][0]['vehicle_info'] is None
+    assert len(log_calls) == 1
+    assert sorted(_logged_plates()) == sorted([(known_plate, vehicle_id), (unknown_plate, None)])
+    assert _audit_actions() == ['Batch plate recognition performed (2 plates in 2 images)']
+
+
+def test_batch_logs_when_the_stream_is_closed_early(client, stub_engine, log_calls):
+    login(client)
+    images = [image for image, _ in _images_with_plates(3)]
+
+    response = client.post('/api/plate-recognizer/recognize-batch', data=_upload(images),
+                           content_type='multipart/form-data', buffered=False)
+    first = json.loads(next(iter(response.response)))
+    response.close()
+
+    assert len(log_calls) == 1
+    assert [plate for plate, _ in _logged_plates()] == [first['results'][0]['plate']]
+    assert _audit_actions() == ['Batch plate recognition performed (1 plates in 3 images)']
+
+
+def test_single_image_matches_vehicle_and_logs(client, stub_engine, log_calls):
+    login(client)
+    [(image, plate)] = _images_with_plates(1)
+    vehicle_id = _add_vehicle(plate)
+
+    response = client.post('/api/plate-recognizer/recognize',
+                           data={'image': (io.BytesIO(image), 'car.jpg')}, content_type='multipart/form-data')
+    body = response.get_json()
+
+    assert body['success'] is True
+    assert body['results'][0]['vehicle_info']['id'] == vehicle_id
+    assert _logged_plates() == [(plate, vehicle_id)]
+    assert _audit_actions() == ['Plate recognition performed']
+
+
+def test_find_vehicles_by_plates_is_case_insensitive(db):
+    vehicle_id = _add_vehicle('XYZ4321')
+
+    vehicles = plate_recognizer.find_vehicles_by_plates(['xyz4321', 'NOPE000', ''])
+
+    assert list(vehicles) == ['XYZ4321']
+    assert vehicles['XYZ4321']['id'] == vehicle_id
+    assert plate_recognizer.find_vehicle_by_plate('xyz4321')['id'] == vehicle_id
+
+
+def test_engine_without_recognize_cannot_be_instantiated():
+    class Incomplete(recognition_engines.RecognitionEngine):
+        name = 'incomplete'
+        label = 'Incomplete'
+
+    with pytest.raises(TypeError):
+        Incomplete()
+    assert {engine['name'] for engine in recognition_engines.available_engines()} == set(recognition_engines.ENGINES)
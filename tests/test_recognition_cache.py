@@ -0,0 +1,115 @@
+"""Tests for the plate recognition result cache"""
+
+import sqlite3
+import threading
+import time
+
+import pytest
+
+import plate_recognizer
+import recognition_cache
+import recognition_governor
+import stub_recognition_server
+
+
+@pytest.fixture(autouse=True)
+def cache_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(recognition_cache, 'RECOGNITION_CACHE_PATH', str(tmp_path / 'recognition_cache.db'))
+    monkeypatch.setattr(recognition_cache, 'RECOGNITION_CACHE_TTL_SECONDS', 3600)
+    monkeypatch.setattr(recognition_cache, 'RECOGNITION_CACHE_MAX_ENTRIES', 100)
+    monkeypatch.setattr(recognition_cache, '_state', {'initialized': False})
+    return tmp_path / 'recognition_cache.db'
+
+
+@pytest.fixture
+def stub_api(monkeypatch, tmp_path):
+    monkeypatch.setattr(recognition_governor, 'RECOGNITION_GOVERNOR_PATH', str(tmp_path / 'governor.json'))
+    monkeypatch.setattr(recognition_governor, 'RECOGNITION_RATE_PER_SECOND', 100.0)
+    monkeypatch.setattr(recognition_governor, 'RECOGNITION_RATE_BURST', 100.0)
+    monkeypatch.setattr(recognition_governor, 'RECOGNITION_STATS_REFRESH_SECONDS', 3600)
+
+    server = stub_recognition_server.create_server(port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base = f'http://127.0.0.1:{server.server_address[1]}'
+    monkeypatch.setattr(plate_recognizer, 'API_TOKEN', 'test-token')
+    monkeypatch.setattr(plate_recognizer, 'API_URL', f'{base}/v1/plate-reader/')
+    monkeypatch.setattr(plate_recognizer, 'STATS_URL', f'{base}/v1/statistics/')
+    # Statistics loaded up front, so no background refresh runs during the test
+    assert plate_recognizer.refresh_statistics() is True
+    yield
+    server.shutdown()
+    server.server_close()
+
+
+def _api_calls():
+    with stub_recognition_server._usage_lock:
+        return stub_recognition_server._usage['calls']
+
+
+def test_repeated_image_is_answered_from_cache(stub_api):
+    calls = _api_calls()
+
+    first = plate_recognizer.recognize_plate_from_bytes(b'cached image', ['sa'])
+    second = plate_recognizer.recognize_plate_from_bytes(b'cached image', ['sa'])
+
+    assert first['success'] is True and first['cache_hit'] is False
+    assert second['cache_hit'] is True
+    assert second['results'] == first['results']
+    assert _api_calls() == calls + 1
+
+
+def test_other_regions_are_a_miss(stub_api):
+    calls = _api_calls()
+
+    plate_recognizer.recognize_plate_from_bytes(b'regional image', ['sa'])
+    other = plate_recognizer.recognize_plate_from_bytes(b'regional image', ['ae'])
+
+    assert other['cache_hit'] is False
+    assert _api_calls() == calls + 2
+
+
+def test_key_depends_on_image_and_regions_only():
+    key = recognition_cache.cache_key(b'image', ['sa', 'ae'])
+
+    assert key == recognition_cache.cache_key(b'image', ['ae', 'sa'])
+    assert key != recognition_cache.cache_key(b'image', ['sa'])
+    assert key != recognition_cache.cache_key(b'other image', ['sa', 'ae'])
+    assert recognition_cache.cache_key(b'image') == recognition_cache.cache_key(b'image', [])
+
+
+def test_entries_expire_after_ttl(cache_file):
+    recognition_cache.put('key', {'success': True, 'results': []})
+    assert recognition_cache.get('key') == {'success': True, 'results': []}
+
+    conn = sqlite3.connect(str(cache_file))
+    conn.execute('UPDATE recognition_cache SET created_at = created_at - ?',
+                 (recognition_cache.RECOGNITION_CACHE_TTL_SECONDS + 1,))
+    conn.commit()
+    conn.close()
+
+    assert recognition_cache.get('key') is None
+
+
+def test_least_recently_used_entry_is_evicted(monkeypatch):
+    monkeypatch.setattr(recognition_cache, 'RECOGNITION_CACHE_MAX_ENTRIES', 2)
+
+    recognition_cache.put('a', {'value': 'a'})
+    time.sleep(0.01)
+    recognition_cache.put('b', {'value': 'b'})
+    time.sleep(0.01)
+    assert recognition_cache.get('a') == {'value': 'a'}
+    time.sleep(0.01)
+    recognition_cache.put('c', {'value': 'c'})
+
+    assert recognition_cache.get('b') is None
+    assert recognition_cache.get('a') == {'value': 'a'}
+    assert recognition_cache.get('c') == {'value': 'c'}
+
+
+def test_disabled_cache_stores_nothing(monkeypatch):
+    monkeypatch.setattr(recognition_cache, 'RECOGNITION_CACHE_TTL_SECONDS', 0)
+
+    recognition_cache.put('key', {'value': 1})
+
+    assert recognition_cache.get('key') is None
@@ -0,0 +1,171 @@
+"""Tests for the Plate Recognizer rate limit and credit governor"""
+
+import os
+import threading
+import time
+from datetime import date, timedelta
+
+import pytest
+
+import plate_recognizer
+import recognition_cache
+import recognition_governor as governor
+import stub_recognition_server
+
+
+@pytest.fixture(autouse=True)
+def state_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(governor, 'RECOGNITION_GOVERNOR_PATH', str(tmp_path / 'governor.json'))
+    monkeypatch.setattr(governor, 'RECOGNITION_RATE_PER_SECOND', 100.0)
+    monkeypatch.setattr(governor, 'RECOGNITION_RATE_BURST', 100.0)
+    monkeypatch.setattr(governor, 'RECOGNITION_CREDIT_RESERVE', 0)
+    monkeypatch.setattr(governor, 'RECOGNITION_STATS_REFRESH_SECONDS', 900)
+    monkeypatch.setattr(governor, '_stats', dict.fromkeys(governor._stats, 0))
+    return tmp_path / 'governor.json'
+
+
+def _credits():
+    return governor.get_credits()
+
+
+def test_reserve_is_a_single_locked_update(monkeypatch):
+    cycles = []
+    shared_state = governor._shared_state
+
+    def counting():
+        cycles.append(1)
+        return shared_state()
+
+    monkeypatch.setattr(governor, '_shared_state', counting)
+    reservation = governor.reserve_call()
+    assert len(cycles) == 1
+
+    monkeypatch.setattr(governor, '_shared_state', shared_state)
+    assert reservation['allowed'] is True
+    assert _credits()['used'] == 1
+
+
+def test_busy_queue_is_refused_without_reserving(monkeypatch):
+    monkeypatch.setattr(governor, 'RECOGNITION_RATE_PER_SECOND', 1.0)
+    monkeypatch.setattr(governor, 'RECOGNITION_RATE_BURST', 1.0)
+
+    assert governor.reserve_call(max_wait=0)['allowed'] is True
+    second = governor.reserve_call(max_wait=0)
+
+    assert second == {'allowed': False, 'reason': 'busy', 'wait': 0.0, 'refresh_statistics': False}
+    assert _credits()['used'] == 1
+    assert governor.get_state()['stats']['rejected'] == 1
+
+
+def test_burst_queues_calls(monkeypatch):
+    monkeypatch.setattr(governor, 'RECOGNITION_RATE_PER_SECOND', 10.0)
+    monkeypatch.setattr(governor, 'RECOGNITION_RATE_BURST', 1.0)
+
+    waits = [governor.reserve_call(max_wait=1)['wait'] for _ in range(3)]
+
+    assert waits[0] == 0
+    assert 0 < waits[1] <= 0.1 + 1e-6
+    assert governor.get_state()['stats']['queued'] == 2
+
+
+def test_quota_and_reserve_stop_calls(monkeypatch):
+    monkeypatch.setattr(governor, 'RECOGNITION_CREDIT_RESERVE', 1)
+    governor.record_statistics({'calls': 7}, 10)
+
+    assert governor.reserve_call()['allowed'] is True
+    assert governor.reserve_call()['allowed'] is True
+    assert governor.reserve_call()['reason'] == 'credits'
+    assert _credits()['remaining'] == 1
+
+
+def test_released_calls_are_not_counted():
+    governor.reserve_call()
+    governor.reserve_call()
+    governor.release_call()
+
+    assert _credits()['used'] == 1
+
+
+def test_missing_quota_does_not_block():
+    governor.record_statistics({'calls': 123}, None)
+
+    credits = _credits()
+    assert credits['quota'] is None
+    assert credits['exhausted'] is False
+    assert governor.reserve_call()['allowed'] is True
+
+
+def test_exhaustion_triggers_refresh_after_interval(monkeypatch):
+    monkeypatch.setattr(governor, 'RECOGNITION_STATS_REFRESH_SECONDS', 0.3)
+    governor.record_statistics({'calls': 10}, 1000)
+    governor.reserve_call()
+    governor.release_call(exhausted=True)
+
+    blocked = governor.reserve_call()
+    assert blocked['reason'] == 'credits'
+    assert blocked['refresh_statistics'] is False
+
+    time.sleep(0.35)
+    blocked = governor.reserve_call()
+    assert blocked['reason'] == 'credits'
+    assert blocked['refresh_statistics'] is True
+    # Only one caller gets the refresh
+    assert governor.reserve_call()['refresh_statistics'] is False
+
+    # The account was topped up in the meantime
+    governor.record_statistics({'calls': 10}, 5000)
+    assert governor.reserve_call()['allowed'] is True
+
+
+def test_period_follows_resets_on():
+    tomorrow = (date.today() + timedelta(days=1)).isoformat()
+    governor.record_statistics({'calls': 40, 'resets_on': f'{tomorrow}T00:00:00Z'}, 50)
+    with governor._shared_state() as state:
+        # A calendar month change alone does not start a new period
+        state['credits']['month'] = '2000-01'
+    assert _credits()['used'] == 40
+    assert _credits()['resets_on'] == tomorrow
+
+    with governor._shared_state() as state:
+        state['credits']['resets_on'] = date.today().isoformat()
+    credits = _credits()
+    assert credits['used'] == 0
+    assert credits['resets_on'] is None
+
+
+def test_shared_between_threads():
+    threads = [threading.Thread(target=governor.reserve_call) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert _credits()['used'] == 20
+
+
+@pytest.fixture
+def stub_api(monkeypatch, tmp_path):
+    server = stub_recognition_server.create_server(port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base = f'http://127.0.0.1:{server.server_address[1]}'
+    monkeypatch.setattr(plate_recognizer, 'API_TOKEN', 'test-token')
+    monkeypatch.setattr(plate_recognizer, 'API_URL', f'{base}/v1/plate-reader/')
+    monkeypatch.setattr(plate_recognizer, 'STATS_URL', f'{base}/v1/statistics/')
+    monkeypatch.setattr(recognition_cache, 'RECOGNITION_CACHE_TTL_SECONDS', 0)
+    yield base
+    server.shutdown()
+    server.server_close()
+
+
+def test_recognition_counts_one_call_after_loading_statistics(stub_api):
+    assert plate_recognizer.refresh_statistics() is True
+    credits = _credits()
+    assert credits['quota'] == stub_recognition_server.STUB_RECOGNITION_MONTHLY_CALLS
+    assert credits['resets_on'] is not None
+    used = credits['used']
+
+    result = plate_recognizer.recognize_plate_from_bytes(os.urandom(64), ['sa'])
+
+    assert result['success'] is True
+    assert _credits()['used'] == used + 1
@@ -0,0 +1,51 @@
+"""Tests for ETags and cached responses of read-mostly endpoints"""
+
+import data_cache
+import database
+import response_cache
+
+
+def _add_building(number):
+    with database.pooled_connection() as conn:
+        conn.cursor().execute(
+            "INSERT INTO buildings (name, building_number) VALUES (?, ?)", (f'Building {number}', number))
+    data_cache.mark_tables_changed('buildings')
+
+
+def test_not_modified_and_cache_hit(client):
+    first = client.get('/api/buildings')
+    assert first.status_code == 200
+    assert first.is_streamed
+    body = first.get_data()
+    etag = first.headers['ETag']
+
+    assert client.get('/api/buildings', headers={'If-None-Match': etag}).status_code == 304
+
+    hits = response_cache.get_stats()['hits']
+    second = client.get('/api/buildings')
+    assert second.get_data() == body
+    assert response_cache.get_stats()['hits'] == hits + 1
+
+
+def test_local_write_changes_etag_at_once(client):
+    etag = client.get('/api/buildings').headers['ETag']
+
+    _add_building('W-1')
+    response = client.get('/api/buildings', headers={'If-None-Match': etag})
+
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert 'W-1' in [row['building_number'] for row in response.get_json()['data']]
+
+
+def test_large_streamed_body_is_served_but_not_cached(client, monkeypatch):
+    monkeypatch.setattr(response_cache, 'RESPONSE_CACHE_MAX_BYTES', 64)
+
+    first = client.get('/api/buildings').get_json()
+    misses = response_cache.get_stats()['misses']
+    second = client.get('/api/buildings').get_json()
+
+    assert first == second
+    assert first['success'] and first['data']
+    assert response_cache.get_stats()['misses'] == misses + 1
+    assert response_cache.get_stats()['cached_responses'] == 0
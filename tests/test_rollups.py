@@ -0,0 +1,97 @@
+"""Tests for the trigger-maintained rollup counters"""
+
+import database
+import rollups
+
+
+def _live_counts(cursor):
+    """Every counter computed from the underlying tables"""
+    counts = {}
+    for table, (_, keys) in rollups.ROLLUP_DEFINITIONS.items():
+        for key in keys:
+            cursor.execute(f'SELECT k, COUNT(*) AS value FROM (SELECT {key.format(row="r")} AS k FROM {table} r) t '
+                           f'WHERE k IS NOT NULL GROUP BY k')
+            counts.update({row['k']: row['value'] for row in cursor.fetchall()})
+    return counts
+
+
+def _stored_counts(cursor):
+    cursor.execute('SELECT metric, value FROM rollup_counts WHERE value <> 0')
+    return {row['metric']: row['value'] for row in cursor.fetchall()}
+
+
+def _assert_counts_match():
+    with database.pooled_connection() as conn:
+        cursor = conn.cursor()
+        assert _stored_counts(cursor) == _live_counts(cursor)
+
+
+def test_counters_match_after_backfill(db):
+    _assert_counts_match()
+
+
+def test_violation_writes_keep_counters(db):
+    with database.pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO residents (name, national_id, phone, building_id, is_active)
+            VALUES ('Rollup Resident', '5000000001', '0500000006', 1, 1)
+        ''')
+        cursor.execute("INSERT INTO vehicles (plate_number, owner_id, is_active) VALUES ('RLP1000', ?, 1)",
+                       (cursor.lastrowid,))
+        vehicle_id = cursor.lastrowid
+        ids = []
+        for violation_type in ('parking', 'parking', 'speeding'):
+            cursor.execute('''
+                INSERT INTO traffic_violations (vehicle_id, violation_type, violation_date, status)
+                VALUES (?, ?, '2026-10-01', 'pending')
+            ''', (vehicle_id, violation_type))
+            ids.append(cursor.lastrowid)
+        counts = rollups.read_counts(cursor, ['traffic_violations'])
+        assert rollups.count(counts, 'traffic_violations', 'violation_type', ('speeding',)) >= 1
+    _assert_counts_match()
+
+    with database.pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("UPDATE traffic_violations SET status = 'paid' WHERE id = ?", (ids[0],))
+        cursor.execute("UPDATE traffic_violations SET violation_type = 'speeding' WHERE id = ?", (ids[1],))
+        cursor.execute("UPDATE traffic_violations SET status = 'cancelled', violation_type = 'noise' WHERE id = ?",
+                       (ids[2],))
+        # An update of a column no counter depends on
+        cursor.execute("UPDATE traffic_violations SET location = 'Gate 2' WHERE id = ?", (ids[0],))
+    _assert_counts_match()
+
+    with database.pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM traffic_violations WHERE id = ?', (ids[1],))
+        counts = rollups.read_counts(cursor, ['traffic_violations'])
+        assert rollups.count(counts, 'traffic_violations', 'status', ('cancelled',)) >= 1
+    _assert_counts_match()
+
+
+def test_resident_and_occupancy_writes_keep_counters(db):
+    with database.pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO residents (name, national_id, phone, building_id, is_active)
+            VALUES ('Moving Resident', '5000000002', '0500000007', 1, 1)
+        ''')
+        resident_id = cursor.lastrowid
+        cursor.execute('UPDATE residents SET building_id = 2 WHERE id = ?', (resident_id,))
+        cursor.execute('UPDATE residents SET is_active = 0 WHERE id = ?', (resident_id,))
+        cursor.execute('UPDATE apartments SET is_occupied = 1 WHERE id IN (SELECT MIN(id) FROM apartments)')
+        cursor.execute('UPDATE parking_spots SET is_occupied = 1 WHERE id IN (SELECT MAX(id) FROM parking_spots)')
+    _assert_counts_match()
+
+    with database.pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM residents WHERE id = ?', (resident_id,))
+    _assert_counts_match()
+
+
+def test_rebuild_matches_triggers(db):
+    with database.pooled_connection() as conn:
+        cursor = conn.cursor()
+        before = _stored_counts(cursor)
+        rollups.rebuild_rollups(cursor)
+        assert _stored_counts(cursor) == before
@@ -0,0 +1,103 @@
+"""Tests for the stored monthly trend buckets"""
+
+from datetime import date
+
+import database
+import trends
+
+TODAY = date(2026, 10, 18)
+
+
+def _occupied(cursor):
+    return trends.get_trends(cursor, ['residents_occupied'], months=4, today=TODAY)['residents_occupied']
+
+
+def _stored_months(cursor, series):
+    cursor.execute('SELECT month FROM monthly_buckets WHERE series = ? ORDER BY month', (series,))
+    return [row['month'] for row in cursor.fetchall()]
+
+
+def _add_resident(cursor, national_id, move_in_date):
+    cursor.execute('''
+        INSERT INTO residents (name, national_id, phone, move_in_date, is_active)
+        VALUES ('Trend Resident', ?, '0500000000', ?, 1)
+    ''', (national_id, move_in_date))
+
+
+def _add_complaint(cursor, created_at):
+    cursor.execute('''
+        INSERT INTO complaints (resident_id, category, title, description, created_at)
+        VALUES ((SELECT MAX(id) FROM residents), 'maintenance', 'Leak', 'Water leak', ?)
+    ''', (created_at,))
+    return cursor.lastrowid
+
+
+def test_closed_months_are_stored(db):
+    with database.pooled_connection() as conn:
+        cursor = conn.cursor()
+        first = _occupied(cursor)
+        assert _stored_months(cursor, 'residents_occupied') == ['2026-07', '2026-08', '2026-09']
+    with database.pooled_connection() as conn:
+        assert _occupied(conn.cursor()) == first
+
+
+def test_backdated_resident_changes_stored_trend(db):
+    with database.pooled_connection() as conn:
+        before = _occupied(conn.cursor())
+
+    with database.pooled_connection() as conn:
+        _add_resident(conn.cursor(), '2000000001', '2026-08-10')
+
+    with database.pooled_connection() as conn:
+        after = _occupied(conn.cursor())
+
+    # July unchanged; August onwards includes the new resident
+    assert after[0] == before[0]
+    assert after[1:] == [value + 1 for value in before[1:]]
+
+
+def test_backdated_move_out_changes_stored_trend(db):
+    with database.pooled_connection() as conn:
+        _add_resident(conn.cursor(), '2000000002', '2026-01-01')
+    with database.pooled_connection() as conn:
+        before = _occupied(conn.cursor())
+
+    with database.pooled_connection() as conn:
+        conn.cursor().execute(
+            "UPDATE residents SET move_out_date = '2026-09-05', is_active = 0 WHERE national_id = '2000000002'")
+    with database.pooled_connection() as conn:
+        after = _occupied(conn.cursor())
+
+    assert after[:2] == before[:2]
+    assert after[2:] == [value - 1 for value in before[2:]]
+
+
+def test_current_month_writes_keep_closed_buckets(db):
+    with database.pooled_connection() as conn:
+        cursor = conn.cursor()
+        trends.get_trends(cursor, ['complaints_new', 'complaints_resolved', 'residents_occupied'],
+                          months=4, today=TODAY)
+        _add_resident(cursor, '2000000003', '2026-10-01')
+        complaint_id = _add_complaint(cursor, '2026-10-02 09:00:00')
+        cursor.execute("UPDATE complaints SET status = 'resolved', resolved_at = '2026-10-03 10:00:00' WHERE id = ?",
+                       (complaint_id,))
+        cursor.execute("UPDATE residents SET phone = '0599999999' WHERE national_id = '2000000003'")
+
+        for series in ('complaints_new', 'complaints_resolved', 'residents_occupied'):
+            assert _stored_months(cursor, series) == ['2026-07', '2026-08', '2026-09']
+
+
+def test_backdated_write_drops_only_its_month(db):
+    with database.pooled_connection() as conn:
+        cursor = conn.cursor()
+        _add_resident(cursor, '2000000004', '2026-01-01')
+        before = trends.get_trends(cursor, ['complaints_new', 'complaints_resolved'], months=4, today=TODAY)
+        _add_complaint(cursor, '2026-08-20 22:00:00')
+        assert _stored_months(cursor, 'complaints_new') == ['2026-07', '2026-09']
+        assert _stored_months(cursor, 'complaints_resolved') == ['2026-07', '2026-08', '2026-09']
+
+        after = trends.get_trends(cursor, ['complaints_new', 'complaints_resolved'], months=4, today=TODAY)
+
+    assert after['complaints_new'] == [before['complaints_new'][0], before['complaints_new'][1] + 1,
+                                       *before['complaints_new'][2:]]
+    assert after['complaints_resolved'] == before['complaints_resolved']
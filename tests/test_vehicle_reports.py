@@ -0,0 +1,52 @@
+"""Tests for the vehicle report loaders"""
+
+import database
+import database_adapter
+import vehicle_report_exporter
+
+
+def _add_vehicle(plate):
+    with database.pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO residents (name, national_id, phone, is_active)
+            VALUES ('Vehicle Owner', ?, '0500000004', 1)
+        ''', (f'ID-{plate}',))
+        cursor.execute('INSERT INTO vehicles (plate_number, owner_id, is_active) VALUES (?, ?, 1)',
+                       (plate, cursor.lastrowid))
+        vehicle_id = cursor.lastrowid
+        cursor.execute('''
+            INSERT INTO traffic_violations (vehicle_id, violation_type, violation_date, status)
+            VALUES (?, 'parking', '2026-03-01', 'pending')
+        ''', (vehicle_id,))
+    return vehicle_id
+
+
+def test_vehicles_page_and_single_vehicle(db):
+    vehicle_id = _add_vehicle('XYZ9876')
+
+    vehicles, page = vehicle_report_exporter.get_vehicles_page({'q': 'XYZ', 'limit': '10'})
+    assert [vehicle['plate_number'] for vehicle in vehicles] == ['XYZ9876']
+    assert len(vehicles[0]['violations']) == 1
+    assert page['has_more'] is False
+
+    vehicle = vehicle_report_exporter.get_vehicle_with_violations(vehicle_id)
+    assert vehicle['violation_count'] == 1
+    assert vehicle_report_exporter.get_vehicle_with_violations(vehicle_id + 1000) is None
+
+
+def test_connection_returned_to_pool_on_error(db, monkeypatch):
+    _add_vehicle('ERR0001')
+    pool = database_adapter.get_pool()
+    with database.pooled_connection():
+        pass
+    idle = pool.get_stats()['idle']
+
+    def fail(cursor, vehicle_ids):
+        raise RuntimeError('database went away')
+
+    monkeypatch.setattr(vehicle_report_exporter, 'load_violations', fail)
+    for _ in range(3):
+        assert vehicle_report_exporter.get_vehicles_page({}) == ([], None)
+
+    assert pool.get_stats()['idle'] == idle
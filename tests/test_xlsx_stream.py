@@ -0,0 +1,95 @@
+"""Tests for the constant-memory XLSX writer"""
+
+import io
+import math
+
+import pytest
+
+openpyxl = pytest.importorskip('openpyxl')
+
+import database  # noqa: E402
+import recognition_exporter  # noqa: E402
+from xlsx_stream import StreamingXlsxWriter  # noqa: E402
+
+STYLES = {
+    'header': {'bold': True, 'fill': '1F4E78', 'color': 'FFFFFF', 'align': 'center'},
+    'cell': {'align': 'right'},
+}
+
+
+def _write(rows, sheet_name='Sheet', **options):
+    output = io.BytesIO()
+    with StreamingXlsxWriter(output, sheet_name, [12, 30], STYLES, **options) as writer:
+        writer.write_row([('Name', 'header'), ('Value', 'header')])
+        writer.write_rows(rows)
+    output.seek(0)
+    return writer, openpyxl.load_workbook(output)
+
+
+def test_values_round_trip():
+    writer, workbook = _write([
+        [('text', 'cell'), (42, 'cell')],
+        [('عربي', 'cell'), (3.5, 'cell')],
+        [('<tag> & "quotes"', 'cell'), (None, 'cell')],
+        [('', 'cell'), (True, 'cell')],
+    ])
+    sheet = workbook.active
+
+    assert writer.rows_written == 5
+    assert [[cell.value for cell in row] for row in sheet.iter_rows()] == [
+        ['Name', 'Value'],
+        ['text', 42],
+        ['عربي', 3.5],
+        ['<tag> & "quotes"', None],
+        [None, 'True'],
+    ]
+
+
+def test_invalid_xml_characters_and_non_finite_numbers_become_text():
+    _, workbook = _write([[('bad\x00\x0bchars', 'cell'), (math.nan, 'cell')],
+                          [('inf', 'cell'), (math.inf, 'cell')]])
+    sheet = workbook.active
+
+    assert sheet['A2'].value == 'badchars'
+    assert sheet['B2'].value == 'nan'
+    assert sheet['B3'].value == 'inf'
+
+
+def test_styles_widths_and_frozen_header():
+    _, workbook = _write([[('a', 'cell'), ('b', 'cell')]], sheet_name='x' * 40)
+    sheet = workbook.active
+
+    assert sheet.title == 'x' * 31
+    assert sheet['A1'].font.b is True
+    assert sheet['A1'].fill.fgColor.rgb == 'FF1F4E78'
+    assert sheet['A2'].alignment.horizontal == 'right'
+    assert sheet.column_dimensions['B'].width == 30
+    assert sheet.freeze_panes == 'A2'
+
+
+def test_header_can_stay_unfrozen():
+    _, workbook = _write([], freeze_header=False)
+
+    assert workbook.active.freeze_panes is None
+
+
+def test_recognition_history_export(db):
+    with database.pooled_connection() as conn:
+        cursor = conn.cursor()
+        for plate, recognized_at in [('AAA1111', '2026-01-10 08:00:00'), ('BBB2222', '2026-02-10 08:00:00')]:
+            cursor.execute('''
+                INSERT INTO plate_recognition_log (user_id, plate_number, confidence, recognized_at)
+                VALUES (1, ?, 0.9, ?)
+            ''', (plate, recognized_at))
+
+    output = io.BytesIO()
+    progress = []
+    count = recognition_exporter.export_recognition_history_excel(
+        output, start_date='2026-02-01', progress=progress.append)
+    output.seek(0)
+    sheet = openpyxl.load_workbook(output).active
+
+    assert count == 1
+    assert sheet.max_row == 2
+    assert 'BBB2222' in [cell.value for cell in sheet[2]]
+    assert progress and progress[-1] == 100
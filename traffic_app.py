@@ -10,7 +10,7 @@ import sqlite3
 import os
 from datetime import datetime
 from werkzeug.utils import secure_filename
-import requests
+import http_client
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -55,15 +55,16 @@ def recognize_plate_from_file(image_path):
             files = {'upload': image_file}
             data = {'regions': ['sa']}  # Saudi Arabia region
             
-            response = requests.post(
+            response = http_client.post(
                 PLATE_RECOGNIZER_API_URL,
+                endpoint='plate_recognizer.plate_reader',
                 headers=headers,
                 files=files,
                 data=data,
                 timeout=30
             )
             
-            if response.status_code == 200:
+            if response.status_code in (200, 201):  # plate-reader answers 201 Created
                 result = response.json()
                 if result.get('results'):
                     plate_data = result['results'][0]
@@ -283,8 +284,9 @@ def plate_recognizer_status():
     
     try:
         headers = {'Authorization': f'Token {PLATE_RECOGNIZER_API_TOKEN}'}
-        response = requests.get(
+        response = http_client.get(
             'https://api.platerecognizer.com/v1/statistics/',
+            endpoint='plate_recognizer.statistics',
             headers=headers,
             timeout=10
         )
@@ -0,0 +1,252 @@
+"""
+Monthly trend buckets for comprehensive reports
+تجميعات شهرية لاتجاهات التقارير الشاملة
+
+Each series is a count per calendar month, computed with a range query on an
+indexed date column. A closed month's value is stored in monthly_buckets the
+first time it is needed; only the current month is recomputed on every
+request. Triggers on the source tables drop the stored buckets of the months
+a written row falls in, whoever makes the change (API, imports, backdated
+edits), so only those months are recomputed on next use.
+"""
+
+from datetime import date
+
+import database_adapter
+
+MONTHLY_BUCKETS_DDL = '''
+CREATE TABLE IF NOT EXISTS monthly_buckets (
+    series TEXT NOT NULL,
+    month TEXT NOT NULL,
+    value INTEGER NOT NULL DEFAULT 0,
+    computed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (series, month)
+)
+'''
+
+# series -> (count query, bound parameters). Bounds are the first day of the
+# month ('start') and the first day of the following month ('end').
+SERIES = {
+    # Incidents reported during the month
+    'security_incidents': (
+        'SELECT COUNT(*) AS value FROM security_incidents WHERE incident_date >= ? AND incident_date < ?',
+        ('start', 'end')
+    ),
+    # Complaints opened / resolved during the month
+    'complaints_new': (
+        'SELECT COUNT(*) AS value FROM complaints WHERE created_at >= ? AND created_at < ?',
+        ('start', 'end')
+    ),
+    'complaints_resolved': (
+        'SELECT COUNT(*) AS value FROM complaints WHERE resolved_at >= ? AND resolved_at < ?',
+        ('start', 'end')
+    ),
+    # Residents living in housing at the end of the month. Inactive residents
+    # without a move-out date are left out since their departure is unknown.
+    'residents_occupied': (
+        '''SELECT COUNT(*) AS value FROM residents
+           WHERE COALESCE(move_in_date, created_at) < ?
+             AND (move_out_date IS NULL OR move_out_date >= ?)
+             AND (is_active = 1 OR move_out_date IS NOT NULL)''',
+        ('end', 'end')
+    ),
+}
+
+# source table -> [(series, columns, date, scope)]: updates of the columns can
+# move the series' counts. The date expression uses {row} for the row
+# reference (NEW/OLD in triggers). 'month' drops only the bucket of the row's
+# month; 'since' drops that month and every later one, for running counts
+# such as occupancy.
+BUCKET_SOURCES = {
+    'security_incidents': [
+        ('security_incidents', ('incident_date',), '{row}.incident_date', 'month'),
+    ],
+    'complaints': [
+        ('complaints_new', ('created_at',), '{row}.created_at', 'month'),
+        ('complaints_resolved', ('resolved_at',), '{row}.resolved_at', 'month'),
+    ],
+    'residents': [
+        ('residents_occupied', ('move_in_date', 'move_out_date', 'is_active', 'created_at'),
+         'COALESCE({row}.move_in_date, {row}.created_at)', 'since'),
+    ],
+}
+
+ARABIC_MONTHS = ['يناير', 'فبراير', 'مارس', 'أبريل', 'مايو', 'يونيو',
+                 'يوليو', 'أغسطس', 'سبتمبر', 'أكتوبر', 'نوفمبر', 'ديسمبر']
+
+
+def _add_months(month_start, count):
+    index = month_start.year * 12 + month_start.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def last_months(months, today=None):
+    """First day of each of the last N months, oldest first (current month last)"""
+    current = (today or date.today()).replace(day=1)
+    return [_add_months(current, offset) for offset in range(1 - months, 1)]
+
+
+def month_label(month_start):
+    """Arabic month name for a chart label"""
+    return ARABIC_MONTHS[month_start.month - 1]
+
+
+def _count(cursor, series, month_start):
+    sql, bounds = SERIES[series]
+    values = {'start': month_start.isoformat(), 'end': _add_months(month_start, 1).isoformat()}
+    cursor.execute(database_adapter.adapt_placeholders(sql), [values[bound] for bound in bounds])
+    return cursor.fetchone()['value'] or 0
+
+
+def get_trends(cursor, series_names, months=7, today=None):
+    """
+    Get monthly values for several series
+    الحصول على القيم الشهرية لعدة سلاسل
+
+    Returns {'months': [date, ...], <series>: [value, ...]} with one value per
+    month. Missing closed months are computed once and stored.
+    """
+    month_starts = last_months(months, today)
+    current = month_starts[-1]
+    closed_keys = [m.strftime('%Y-%m') for m in month_starts[:-1]]
+
+    stored = {}
+    if closed_keys:
+        series_marks = ', '.join(['?'] * len(series_names))
+        month_marks = ', '.join(['?'] * len(closed_keys))
+        cursor.execute(database_adapter.adapt_placeholders(
+            f'SELECT series, month, value FROM monthly_buckets '
+            f'WHERE series IN ({series_marks}) AND month IN ({month_marks})'
+        ), list(series_names) + closed_keys)
+        stored = {(row['series'], row['month']): row['value'] for row in cursor.fetchall()}
+
+    upsert_sql = database_adapter.adapt_placeholders('''
+        INSERT INTO monthly_buckets (series, month, value) VALUES (?, ?, ?)
+        ON CONFLICT (series, month) DO UPDATE SET value = excluded.value, computed_at = CURRENT_TIMESTAMP
+    ''')
+
+    result = {'months': month_starts}
+    for series in series_names:
+        values = []
+        for month_start in month_starts:
+            key = month_start.strftime('%Y-%m')
+            if month_start == current:
+                values.append(_count(cursor, series, month_start))
+            elif (series, key) in stored:
+                values.append(stored[(series, key)])
+            else:
+                value = _count(cursor, series, month_start)
+                cursor.execute(upsert_sql, (series, key, value))
+                values.append(value)
+        result[series] = values
+
+    return result
+
+
+def invalidate_buckets(cursor, series=None, since=None):
+    """
+    Drop stored buckets so they are recomputed on next use
+    حذف التجميعات المخزنة لإعادة حسابها
+
+    Row writes are already handled by the triggers; this is for changes they
+    cannot see, such as a changed SERIES query.
+    ``since`` is a date; buckets for its month and later are dropped.
+    """
+    sql = 'DELETE FROM monthly_buckets WHERE 1 = 1'
+    params = []
+    if series:
+        sql += ' AND series = ?'
+        params.append(series)
+    if since:
+        sql += ' AND month >= ?'
+        params.append(since.strftime('%Y-%m'))
+    cursor.execute(database_adapter.adapt_placeholders(sql), params)
+
+
+# ==================== Invalidation triggers ====================
+
+def _source_columns(table):
+    columns = []
+    for _, target_columns, _, _ in BUCKET_SOURCES[table]:
+        columns.extend(column for column in target_columns if column not in columns)
+    return columns
+
+
+def _changed(columns, distinct):
+    return ' OR '.join(f'OLD.{column} {distinct} NEW.{column}' for column in columns)
+
+
+def _invalidate_statements(table, row, db_type, distinct=None):
+    """DELETEs for the buckets a row falls in; with ``distinct``, only for series whose columns changed"""
+    statements = []
+    for series, columns, date_expr, scope in BUCKET_SOURCES[table]:
+        value = date_expr.format(row=row)
+        month = f"to_char({value}, 'YYYY-MM')" if db_type == 'postgresql' else f'substr({value}, 1, 7)'
+        if scope == 'since':
+            # Without a date the row may count in any month
+            condition = f"month >= COALESCE({month}, '')"
+        else:
+            condition = f'month = {month}'
+        if distinct:
+            condition += f' AND ({_changed(columns, distinct)})'
+        statements.append(f"DELETE FROM monthly_buckets WHERE series = '{series}' AND {condition}")
+    return statements
+
+
+def sqlite_trigger_sql(table):
+    """Build the SQLite INSERT/UPDATE/DELETE triggers dropping a table's affected buckets"""
+    columns = _source_columns(table)
+
+    def trigger(event, body, when=''):
+        body_sql = ';\n    '.join(body)
+        return (f'CREATE TRIGGER IF NOT EXISTS trg_buckets_{table}_{event.split()[0].lower()} '
+                f'AFTER {event} ON {table} FOR EACH ROW {when}BEGIN\n    {body_sql};\nEND')
+
+    return [
+        trigger('INSERT', _invalidate_statements(table, 'NEW', 'sqlite')),
+        trigger('DELETE', _invalidate_statements(table, 'OLD', 'sqlite')),
+        trigger(
+            f"UPDATE OF {', '.join(columns)}",
+            _invalidate_statements(table, 'OLD', 'sqlite', 'IS NOT')
+            + _invalidate_statements(table, 'NEW', 'sqlite', 'IS NOT'),
+            when=f"WHEN {_changed(columns, 'IS NOT')} "
+        ),
+    ]
+
+
+def postgresql_trigger_sql(table):
+    """Build the PostgreSQL trigger function and trigger dropping a table's affected buckets"""
+    columns = _source_columns(table)
+    distinct = 'IS DISTINCT FROM'
+    old_body = ';\n        '.join(_invalidate_statements(table, 'OLD', 'postgresql', distinct))
+    new_body = ';\n        '.join(_invalidate_statements(table, 'NEW', 'postgresql', distinct))
+    inserted = ';\n        '.join(_invalidate_statements(table, 'NEW', 'postgresql'))
+    deleted = ';\n        '.join(_invalidate_statements(table, 'OLD', 'postgresql'))
+
+    return [
+        f'''CREATE OR REPLACE FUNCTION trend_buckets_{table}() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        {inserted};
+    ELSIF TG_OP = 'DELETE' THEN
+        {deleted};
+    ELSIF {_changed(columns, distinct)} THEN
+        {old_body};
+        {new_body};
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql''',
+        f'DROP TRIGGER IF EXISTS trg_buckets_{table} ON {table}',
+        f"CREATE TRIGGER trg_buckets_{table} AFTER INSERT OR DELETE OR UPDATE OF {', '.join(columns)} "
+        f'ON {table} FOR EACH ROW EXECUTE PROCEDURE trend_buckets_{table}()',
+    ]
+
+
+def install_bucket_triggers(cursor, db_type):
+    """Install the invalidation triggers and drop buckets stored without them"""
+    for table in BUCKET_SOURCES:
+        statements = postgresql_trigger_sql(table) if db_type == 'postgresql' else sqlite_trigger_sql(table)
+        for sql in statements:
+            cursor.execute(sql)
+    invalidate_buckets(cursor)
@@ -11,8 +11,10 @@ This module provides comprehensive export functionality for vehicle reports:
 
 import os
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import database
+import database_adapter
+import pagination
 from io import BytesIO
 from PIL import Image
 
@@ -29,112 +31,36 @@ def get_vehicle_with_violations(vehicle_id: int) -> Optional[Dict]:
         Dict with vehicle and violations data
     """
     try:
-        conn = database.get_db_connection()
-        cursor = conn.cursor()
-        
-        # Get vehicle details
-        cursor.execute('''
-            SELECT 
-                v.*,
-                r.name as owner_name,
-                r.national_id as owner_national_id,
-                r.phone as owner_phone,
-                r.email as owner_email,
-                r.department,
-                r.job_title,
-                r.unit_number,
-                b.name as building_name,
-                b.building_number
-            FROM vehicles v
-            LEFT JOIN residents r ON v.owner_id = r.id
-            LEFT JOIN buildings b ON r.building_id = b.id
-            WHERE v.id = ?
-        ''', (vehicle_id,))
-        
-        vehicle_row = cursor.fetchone()
-        if not vehicle_row:
-            conn.close()
-            return None
-        
-        vehicle = dict(vehicle_row)
-        
-        # Get violations for this vehicle
-        cursor.execute('''
-            SELECT 
-                tv.*,
-                u.name as reported_by_name
-            FROM traffic_violations tv
-            LEFT JOIN users u ON tv.reported_by = u.id
-            WHERE tv.vehicle_id = ?
-            ORDER BY tv.violation_date DESC
-        ''', (vehicle_id,))
-        
-        violations = [dict(row) for row in cursor.fetchall()]
-        vehicle['violations'] = violations
-        vehicle['violation_count'] = len(violations)
-        
-        # Get car images if available
-        cursor.execute('''
-            SELECT ci.*, ca.plate_confidence, ca.vehicle_type as detected_type, ca.vehicle_color as detected_color
-            FROM car_images ci
-            LEFT JOIN car_analysis ca ON ci.id = ca.car_image_id
-            WHERE ca.vehicle_id = ?
-            ORDER BY ci.uploaded_at DESC
-            LIMIT 5
-        ''', (vehicle_id,))
-        
-        images = [dict(row) for row in cursor.fetchall()]
-        vehicle['images'] = images
-        
-        conn.close()
-        return vehicle
-        
-    except Exception as e:
-        print(f"Error getting vehicle with violations: {str(e)}")
-        return None
-
-
-def get_all_vehicles_with_violations() -> List[Dict]:
-    """
-    Get all vehicles with their violations
-    الحصول على جميع السيارات مع مخالفاتها
-    
-    Returns:
-        List of vehicles with violations
-    """
-    try:
-        conn = database.get_db_connection()
-        cursor = conn.cursor()
-        
-        # Get all active vehicles
-        cursor.execute('''
-            SELECT 
-                v.*,
-                r.name as owner_name,
-                r.national_id as owner_national_id,
-                r.phone as owner_phone,
-                r.email as owner_email,
-                r.department,
-                r.job_title,
-                r.unit_number,
-                b.name as building_name,
-                b.building_number,
-                COUNT(tv.id) as violation_count
-            FROM vehicles v
-            LEFT JOIN residents r ON v.owner_id = r.id
-            LEFT JOIN buildings b ON r.building_id = b.id
-            LEFT JOIN traffic_violations tv ON v.id = tv.vehicle_id
-            WHERE v.is_active = 1
-            GROUP BY v.id
-            ORDER BY v.plate_number
-        ''')
-        
-        vehicles = []
-        for row in cursor.fetchall():
-            vehicle = dict(row)
+        with database.pooled_connection() as conn:
+            cursor = conn.cursor()
+            
+            # Get vehicle details
+            database._execute_query(cursor, '''
+                SELECT 
+                    v.*,
+                    r.name as owner_name,
+                    r.national_id as owner_national_id,
+                    r.phone as owner_phone,
+                    r.email as owner_email,
+                    r.department,
+                    r.job_title,
+                    r.unit_number,
+                    b.name as building_name,
+                    b.building_number
+                FROM vehicles v
+                LEFT JOIN residents r ON v.owner_id = r.id
+                LEFT JOIN buildings b ON r.building_id = b.id
+                WHERE v.id = ?
+            ''', (vehicle_id,))
+            
+            vehicle_row = cursor.fetchone()
+            if not vehicle_row:
+                return None
+            
+            vehicle = dict(vehicle_row)
             
-            # Get violations for each vehicle
-            cursor.execute('''
+            # Get violations for this vehicle
+            database._execute_query(cursor, '''
                 SELECT 
                     tv.*,
                     u.name as reported_by_name
@@ -142,31 +68,192 @@ def get_all_vehicles_with_violations() -> List[Dict]:
                 LEFT JOIN users u ON tv.reported_by = u.id
                 WHERE tv.vehicle_id = ?
                 ORDER BY tv.violation_date DESC
-            ''', (vehicle['id'],))
+            ''', (vehicle_id,))
             
-            vehicle['violations'] = [dict(v) for v in cursor.fetchall()]
+            violations = [dict(row) for row in cursor.fetchall()]
+            vehicle['violations'] = violations
+            vehicle['violation_count'] = len(violations)
             
-            # Get thumbnail if available
-            cursor.execute('''
-                SELECT ci.thumbnail_path
+            # Get car images if available
+            database._execute_query(cursor, '''
+                SELECT ci.*, ca.plate_confidence, ca.vehicle_type as detected_type, ca.vehicle_color as detected_color
                 FROM car_images ci
                 LEFT JOIN car_analysis ca ON ci.id = ca.car_image_id
                 WHERE ca.vehicle_id = ?
                 ORDER BY ci.uploaded_at DESC
-                LIMIT 1
-            ''', (vehicle['id'],))
+                LIMIT 5
+            ''', (vehicle_id,))
             
-            thumbnail_row = cursor.fetchone()
-            vehicle['thumbnail_path'] = thumbnail_row[0] if thumbnail_row else None
-            
-            vehicles.append(vehicle)
+            images = [dict(row) for row in cursor.fetchall()]
+            vehicle['images'] = images
+        
+        return vehicle
         
-        conn.close()
+    except Exception as e:
+        print(f"Error getting vehicle with violations: {str(e)}")
+        return None
+
+
+# Active vehicles with owner details, paginated with a keyset cursor
+VEHICLES_QUERY = pagination.ListQuery(
+    columns='''v.*,
+               r.name as owner_name,
+               r.national_id as owner_national_id,
+               r.phone as owner_phone,
+               r.email as owner_email,
+               r.department,
+               r.job_title,
+               r.unit_number,
+               b.name as building_name,
+               b.building_number,
+               (SELECT COUNT(*) FROM traffic_violations tv WHERE tv.vehicle_id = v.id) as violation_count''',
+    source='''vehicles v
+               LEFT JOIN residents r ON v.owner_id = r.id
+               LEFT JOIN buildings b ON r.building_id = b.id''',
+    where='v.is_active = 1',
+    id_column='v.id',
+    sorts={
+        'plate': ['v.plate_number'],
+        'owner': ["COALESCE(r.name, '')"],
+    },
+    default_sort='plate',
+    filters={
+        'building_id': ('r.building_id = ?', int),
+        'owner_id': ('v.owner_id = ?', int),
+        'vehicle_type': ('v.vehicle_type = ?', str),
+    },
+    search_columns=('v.plate_number', 'r.name', 'v.sticker_number')
+)
+
+
+# Ids per IN (...) list, below SQLite's historical 999-variable limit
+ID_CHUNK_SIZE = 900
+
+
+def _chunks(ids: List[int]):
+    for start in range(0, len(ids), ID_CHUNK_SIZE):
+        yield ids[start:start + ID_CHUNK_SIZE]
+
+
+def load_violations(cursor, vehicle_ids: List[int]) -> Dict[int, List[Dict]]:
+    """
+    Load the violations of many vehicles at once, newest first
+    تحميل مخالفات عدة سيارات باستعلام واحد
+    
+    Returns:
+        Dict of vehicle id -> list of violations
+    """
+    violations = {vehicle_id: [] for vehicle_id in vehicle_ids}
+    for chunk in _chunks(vehicle_ids):
+        marks = ', '.join(['?'] * len(chunk))
+        cursor.execute(database_adapter.adapt_placeholders(f'''
+            SELECT 
+                tv.*,
+                u.name as reported_by_name
+            FROM traffic_violations tv
+            LEFT JOIN users u ON tv.reported_by = u.id
+            WHERE tv.vehicle_id IN ({marks})
+            ORDER BY tv.vehicle_id, tv.violation_date DESC
+        '''), chunk)
+        for row in cursor.fetchall():
+            violation = dict(row)
+            violations[violation['vehicle_id']].append(violation)
+    return violations
+
+
+def load_latest_thumbnails(cursor, vehicle_ids: List[int]) -> Dict[int, str]:
+    """
+    Load the most recent analysed-image thumbnail of many vehicles at once
+    تحميل أحدث صورة مصغرة لعدة سيارات باستعلام واحد
+    
+    Returns:
+        Dict of vehicle id -> thumbnail path (vehicles without images are absent)
+    """
+    thumbnails = {}
+    for chunk in _chunks(vehicle_ids):
+        marks = ', '.join(['?'] * len(chunk))
+        cursor.execute(database_adapter.adapt_placeholders(f'''
+            SELECT vehicle_id, thumbnail_path FROM (
+                SELECT 
+                    ca.vehicle_id,
+                    ci.thumbnail_path,
+                    ROW_NUMBER() OVER (PARTITION BY ca.vehicle_id ORDER BY ci.uploaded_at DESC) AS position
+                FROM car_analysis ca
+                JOIN car_images ci ON ci.id = ca.car_image_id
+                WHERE ca.vehicle_id IN ({marks})
+            ) latest
+            WHERE position = 1
+        '''), chunk)
+        for row in cursor.fetchall():
+            thumbnails[row['vehicle_id']] = row['thumbnail_path']
+    return thumbnails
+
+
+def vehicles_from_rows(conn, rows, include_violations: bool = True) -> List[Dict]:
+    """
+    Build vehicle dicts from VEHICLES_QUERY rows
+    
+    Violations (unless include_violations is False) and the latest thumbnail
+    are loaded for all rows together rather than per vehicle. Takes the
+    connection so it can be used on batches of a streamed result.
+    """
+    vehicles = [pagination.row_to_dict(row) for row in rows]
+    if not vehicles:
         return vehicles
+    
+    cursor = conn.cursor()
+    vehicle_ids = [vehicle['id'] for vehicle in vehicles]
+    violations = load_violations(cursor, vehicle_ids) if include_violations else None
+    thumbnails = load_latest_thumbnails(cursor, vehicle_ids)
+    
+    for vehicle in vehicles:
+        if violations is not None:
+            vehicle['violations'] = violations[vehicle['id']]
+        vehicle['thumbnail_path'] = thumbnails.get(vehicle['id'])
+    return vehicles
+
+
+def get_all_vehicles_with_violations(include_violations: bool = True) -> List[Dict]:
+    """
+    Get all vehicles with their violations
+    الحصول على جميع السيارات مع مخالفاتها
+    
+    Args:
+        include_violations: False skips the violation rows (violation_count is
+                            always included) for a lightweight listing
+    
+    Returns:
+        List of vehicles with violations
+    """
+    vehicles, _ = get_vehicles_page({}, include_violations)
+    return vehicles
+
+
+def get_vehicles_page(args, include_violations: bool = True) -> Tuple[List[Dict], Optional[Dict]]:
+    """
+    Get one page of vehicles with their violations
+    الحصول على صفحة من السيارات مع مخالفاتها
+    
+    Args:
+        args: Request arguments (limit, cursor, sort, order, q and filters);
+              without limit/cursor every active vehicle is returned
+        include_violations: Whether to load each vehicle's violation rows
+    
+    Returns:
+        (vehicles, pagination info or None in "all" mode)
+    """
+    try:
+        with database.pooled_connection() as conn:
+            rows, page = VEHICLES_QUERY.fetch_page(conn.cursor(), args)
+            vehicles = vehicles_from_rows(conn, rows, include_violations)
+        
+        return vehicles, page
         
+    except pagination.PaginationError:
+        raise
     except Exception as e:
         print(f"Error getting all vehicles: {str(e)}")
-        return []
+        return [], None
 
 
 def export_vehicle_to_excel(vehicle: Dict, output_path: str) -> bool:
@@ -0,0 +1,212 @@
+"""
+Constant-memory XLSX writer for large exports
+كاتب ملفات Excel بذاكرة ثابتة للتصديرات الكبيرة
+
+openpyxl (even in write-only mode) and xlsxwriter build a Python cell object
+and an XML element per cell, which limits them to a few thousand rows per
+second. StreamingXlsxWriter writes the worksheet XML straight into the zip
+stream instead: each style is turned into a cell prefix once, and every row
+is a single string. Memory use does not depend on the number of rows.
+
+Supported: one worksheet, text and numbers, shared cell styles (font, fill,
+thin border, alignment), column widths and a frozen header row.
+"""
+
+import math
+import re
+import zipfile
+from decimal import Decimal
+from xml.sax.saxutils import escape, quoteattr
+
+MAIN_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+REL_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+PKG_REL_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+XML_HEADER = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+
+CONTENT_TYPES_XML = XML_HEADER + (
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+
+ROOT_RELS_XML = XML_HEADER + (
+    f'<Relationships xmlns="{PKG_REL_NS}">'
+    f'<Relationship Id="rId1" Type="{REL_NS}/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+WORKBOOK_RELS_XML = XML_HEADER + (
+    f'<Relationships xmlns="{PKG_REL_NS}">'
+    f'<Relationship Id="rId1" Type="{REL_NS}/worksheet" Target="worksheets/sheet1.xml"/>'
+    f'<Relationship Id="rId2" Type="{REL_NS}/styles" Target="styles.xml"/>'
+    '</Relationships>'
+)
+
+# Characters that are not allowed in XML 1.0 documents
+_INVALID_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+# Maximum Excel sheet name length
+_SHEET_NAME_LIMIT = 31
+
+
+def _font_xml(style):
+    parts = ['<font>']
+    if style.get('bold'):
+        parts.append('<b/>')
+    parts.append(f'<sz val="{style.get("size", 11)}"/>')
+    if style.get('color'):
+        parts.append(f'<color rgb="FF{style["color"]}"/>')
+    parts.append(f'<name val={quoteattr(style.get("font", "Calibri"))}/>')
+    parts.append('</font>')
+    return ''.join(parts)
+
+
+def _fill_xml(color):
+    return (f'<fill><patternFill patternType="solid"><fgColor rgb="FF{color}"/>'
+            '<bgColor indexed="64"/></patternFill></fill>')
+
+
+def build_styles_xml(styles):
+    """
+    Build xl/styles.xml and the cell format index of each named style
+    بناء ملف الأنماط وأرقام التنسيقات
+
+    Each style is a dict with optional keys: bold, size, color, font,
+    fill (RRGGBB), border (bool) and align ('center', 'right', 'left').
+    Returns (xml, {style name: cellXfs index}).
+    """
+    fonts = [_font_xml({})]
+    fills = ['<fill><patternFill patternType="none"/></fill>',
+             '<fill><patternFill patternType="gray125"/></fill>']
+    borders = ['<border><left/><right/><top/><bottom/><diagonal/></border>',
+               '<border>' + ''.join(f'<{side} style="thin"><color auto="1"/></{side}>'
+                                    for side in ('left', 'right', 'top', 'bottom')) + '<diagonal/></border>']
+    xfs = ['<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>']
+    indexes = {}
+
+    for name, style in styles.items():
+        font = _font_xml(style)
+        if font not in fonts:
+            fonts.append(font)
+        fill_id = 0
+        if style.get('fill'):
+            fill = _fill_xml(style['fill'])
+            if fill not in fills:
+                fills.append(fill)
+            fill_id = fills.index(fill)
+        border_id = 1 if style.get('border', True) else 0
+        alignment = (f'<alignment horizontal="{style.get("align", "left")}" '
+                     'vertical="center" wrapText="1"/>')
+        xfs.append(
+            f'<xf numFmtId="0" fontId="{fonts.index(font)}" fillId="{fill_id}" borderId="{border_id}" '
+            'xfId="0" applyFont="1" applyFill="1" applyBorder="1" applyAlignment="1">'
+            f'{alignment}</xf>'
+        )
+        indexes[name] = len(xfs) - 1
+
+    xml = XML_HEADER + (
+        f'<styleSheet xmlns="{MAIN_NS}">'
+        f'<fonts count="{len(fonts)}">{"".join(fonts)}</fonts>'
+        f'<fills count="{len(fills)}">{"".join(fills)}</fills>'
+        f'<borders count="{len(borders)}">{"".join(borders)}</borders>'
+        '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+        f'<cellXfs count="{len(xfs)}">{"".join(xfs)}</cellXfs>'
+        '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+        '</styleSheet>'
+    )
+    return xml, indexes
+
+
+class StreamingXlsxWriter:
+    """
+    Write a single-sheet workbook row by row
+    كتابة ملف Excel صفاً بصف
+
+    Usage:
+        with StreamingXlsxWriter(output, 'Sheet', widths, styles) as writer:
+            writer.write_rows([[('value', 'style'), ...], ...])
+    """
+
+    def __init__(self, output, sheet_name, column_widths, styles, freeze_header=True, compresslevel=1):
+        self._zip = zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED, compresslevel=compresslevel)
+        self._zip.writestr('[Content_Types].xml', CONTENT_TYPES_XML)
+        self._zip.writestr('_rels/.rels', ROOT_RELS_XML)
+        self._zip.writestr('xl/_rels/workbook.xml.rels', WORKBOOK_RELS_XML)
+        self._zip.writestr('xl/workbook.xml', XML_HEADER + (
+            f'<workbook xmlns="{MAIN_NS}" xmlns:r="{REL_NS}"><sheets>'
+            f'<sheet name={quoteattr(sheet_name[:_SHEET_NAME_LIMIT])} sheetId="1" r:id="rId1"/>'
+            '</sheets></workbook>'
+        ))
+
+        styles_xml, indexes = build_styles_xml(styles)
+        self._zip.writestr('xl/styles.xml', styles_xml)
+
+        # Per style: (prefix for numbers, prefix for text, empty cell)
+        self._cells = {
+            name: (f'<c s="{index}"><v>', f'<c s="{index}" t="inlineStr"><is><t xml:space="preserve">',
+                   f'<c s="{index}"/>')
+            for name, index in indexes.items()
+        }
+
+        self._sheet = self._zip.open('xl/worksheets/sheet1.xml', 'w')
+        pane = ('<pane ySplit="1" topLeftCell="A2" activePane="bottomLeft" state="frozen"/>'
+                if freeze_header else '')
+        cols = ''.join(f'<col min="{index}" max="{index}" width="{width}" customWidth="1"/>'
+                       for index, width in enumerate(column_widths, start=1))
+        self._write(XML_HEADER + (
+            f'<worksheet xmlns="{MAIN_NS}">'
+            f'<sheetViews><sheetView workbookViewId="0">{pane}</sheetView></sheetViews>'
+            f'<cols>{cols}</cols><sheetData>'
+        ))
+        self.rows_written = 0
+
+    def _write(self, text):
+        self._sheet.write(text.encode('utf-8'))
+
+    def _cell(self, value, style):
+        number, text, empty = self._cells[style]
+        if value is None or value == '':
+            return empty
+        if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+            if isinstance(value, float) and not math.isfinite(value):
+                value = str(value)
+            else:
+                return f'{number}{value}</v></c>'
+        value = _INVALID_XML_CHARS.sub('', str(value))
+        return f'{text}{escape(value)}</t></is></c>'
+
+    def write_rows(self, rows):
+        """Append rows; each row is a list of (value, style name) pairs"""
+        cell = self._cell
+        chunk = []
+        for row in rows:
+            chunk.append('<row>' + ''.join(cell(value, style) for value, style in row) + '</row>')
+        self._write(''.join(chunk))
+        self.rows_written += len(chunk)
+
+    def write_row(self, row):
+        """Append one row of (value, style name) pairs"""
+        self.write_rows([row])
+
+    def close(self):
+        """Finish the worksheet and the zip file"""
+        if self._sheet is None:
+            return
+        self._write('</sheetData></worksheet>')
+        self._sheet.close()
+        self._sheet = None
+        self._zip.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False